@@ -10,7 +10,12 @@ https://docs.djangoproject.com/en/4.0/howto/deployment/asgi/
 import os
 
 from django.core.asgi import get_asgi_application
+from django.urls import get_resolver
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
 
 application = get_asgi_application()
+
+# Import the URLconf, and every view with it, now rather than on the first
+# request, so a server preloading the app shares them with its workers.
+get_resolver().url_patterns
@@ -0,0 +1,119 @@
+"""Gunicorn configuration for the recipe API
+
+Used by scripts/run.sh, or directly with
+
+    gunicorn -c python:app.gunicorn_conf app.wsgi:application
+
+Tuned through environment variables:
+
+    GUNICORN_WORKER_CLASS  sync, gthread (default) or uvicorn. The uvicorn
+                           worker must be pointed at app.asgi:application
+    WEB_CONCURRENCY        number of worker processes, sized from the
+                           available CPUs when unset
+    GUNICORN_THREADS       threads per gthread worker (default 4)
+    GUNICORN_MAX_REQUESTS  recycle a worker after this many requests
+    GUNICORN_TIMEOUT       seconds before a silent worker is killed
+    GUNICORN_BIND          address to listen on (default 0.0.0.0:8000)
+    METRICS_DIR            directory shared by the workers' metrics files
+    DJANGO_SETTINGS_MODULE app.settings_api for API only workers
+"""
+import gc
+import os
+
+WORKER_CLASSES = {
+    'sync': 'sync',
+    'gthread': 'gthread',
+    'uvicorn': 'uvicorn.workers.UvicornWorker',
+}
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def _cpu_count():
+    """Return the CPUs this process may run on, honouring cpusets"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def default_workers(mode, cpus):
+    """Return a worker count suited to the worker class
+
+    Sync workers block on the database, so the classic 2 x CPUs + 1 keeps
+    the cores busy. Threaded and async workers overlap I/O within the
+    process, so one per core (plus one for gthread) is enough.
+    """
+    if mode == 'sync':
+        return 2 * cpus + 1
+    if mode == 'gthread':
+        return cpus + 1
+    return cpus
+
+
+worker_mode = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+worker_class = WORKER_CLASSES[worker_mode]
+workers = _env_int(
+    'WEB_CONCURRENCY', default_workers(worker_mode, _cpu_count())
+)
+threads = _env_int('GUNICORN_THREADS', 4) if worker_mode == 'gthread' else 1
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+
+# Import Django once in the master so workers share its pages copy on
+# write, see pre_fork.
+preload_app = True
+
+# Recycle workers to bound memory growth, with jitter so they don't all
+# restart at once.
+max_requests = _env_int('GUNICORN_MAX_REQUESTS', 2000)
+max_requests_jitter = max_requests // 10
+
+timeout = _env_int('GUNICORN_TIMEOUT', 30)
+# Workers get this long to finish in flight requests on SIGTERM, keep it
+# below the container stop grace period.
+graceful_timeout = _env_int('GUNICORN_GRACEFUL_TIMEOUT', 25)
+keepalive = 5
+
+# Heartbeat files on tmpfs, a disk backed /tmp can stall workers.
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+accesslog = '-'
+errorlog = '-'
+
+
+def on_starting(server):
+    # Counters restart with the server, drop the previous run's files.
+    metrics_dir = os.environ.get('METRICS_DIR')
+    if metrics_dir:
+        from core import metrics
+        os.makedirs(metrics_dir, exist_ok=True)
+        metrics.clear(metrics_dir)
+
+
+def child_exit(server, worker):
+    # Keep a recycled worker's counts without keeping its file around.
+    metrics_dir = os.environ.get('METRICS_DIR')
+    if metrics_dir:
+        from core import metrics
+        metrics.mark_process_dead(worker.pid, metrics_dir)
+
+
+def pre_fork(server, worker):
+    # Move everything loaded so far out of the collector's reach, so the
+    # garbage collector doesn't touch and copy the shared pages.
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Never share a database connection opened while preloading.
+    from django.db import connections
+    connections.close_all()
+
+
+def post_worker_init(worker):
+    # Background jobs die with recycled workers, the others resume them.
+    from core.jobs import start_sweeper
+    start_sweeper()
@@ -12,6 +12,24 @@ https://docs.djangoproject.com/en/4.0/ref/settings/
 import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
+
+def env_bool(name, default=False):
+    """Return an environment flag, set with 1, true, yes or on"""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def env_list(name, default=''):
+    """Return a comma separated environment variable as a list"""
+    return [
+        item.strip() for item in os.environ.get(name, default).split(',')
+        if item.strip()
+    ]
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -20,12 +38,17 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # See https://docs.djangoproject.com/en/4.0/howto/deployment/checklist/
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-q_jwgw0t6*38z0xr0t#)edmbscd4oz(!56q2b_39n=b^gmold7'
+SECRET_KEY = os.environ.get(
+    'SECRET_KEY',
+    'django-insecure-q_jwgw0t6*38z0xr0t#)edmbscd4oz(!56q2b_39n=b^gmold7',
+)
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# DEBUG also keeps every SQL query of a connection in memory, so it is off
+# unless DEBUG=1 is set, as docker-compose.yml does for development.
+DEBUG = env_bool('DEBUG')
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = env_list('ALLOWED_HOSTS')
 
 
 # Application definition
@@ -45,7 +68,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -54,6 +79,159 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Response compression, see core.middleware.CompressionMiddleware
+COMPRESSION_MIN_SIZE = 500
+COMPRESSION_ENCODINGS = ('zstd', 'br', 'gzip')
+COMPRESSION_CONTENT_TYPES = (
+    'application/json',
+    'application/javascript',
+    'text/*',
+)
+
+# Request instrumentation, see core.middleware.RequestTimingMiddleware
+SERVER_TIMING_HEADER = True
+# Flag requests running one query shape this many times, None disables
+N_PLUS_ONE_THRESHOLD = 10
+N_PLUS_ONE_RAISE = False
+
+# Metrics, see core.metrics. Preforked workers need a shared directory,
+# ideally on tmpfs, to be reported together.
+METRICS_DIR = os.environ.get('METRICS_DIR')
+METRICS_PATH_PREFIXES = ('/api/recipe/', '/api/user/', '/api/batch/')
+
+# Background jobs, see core.jobs. Workers check every
+# JOBS_SWEEP_INTERVAL seconds for jobs that made no progress for
+# JOBS_STALE_AFTER seconds, and run them again.
+JOBS_ALWAYS_EAGER = False
+JOBS_MAX_WORKERS = 2
+JOBS_SWEEP_INTERVAL = 60
+JOBS_STALE_AFTER = 600
+
+ACCOUNT_DELETION_BATCH_SIZE = 1000
+
+# Recipe imports, see core.importing
+IMPORT_BATCH_SIZE = 1000
+IMPORT_MAX_ERRORS = 100
+
+# Admin changelists, see core.admin.EstimatedCountPaginator
+ADMIN_ESTIMATED_COUNT_MIN = 10000
+ADMIN_COUNT_LIMIT = 10000
+
+# Rate limits, see core.throttling. Clients may send this many requests
+# at once, the rate in REST_FRAMEWORK refills them. Turn throttling off
+# with THROTTLE_ENABLED=0, for example for load tests.
+THROTTLE_ENABLED = env_bool('THROTTLE_ENABLED', True)
+THROTTLE_BURSTS = {
+    'anon': 20,
+    'user': 200,
+    'token': 5,
+    'register': 5,
+    'upload': 10,
+}
+
+# Similar recipes, see core.recommendations. Each recipe keeps its
+# RECOMMENDATIONS_TOP_K nearest, features of more recipes than
+# RECOMMENDATIONS_MAX_POSTINGS aren't used to compare them.
+RECOMMENDATIONS_TOP_K = 10
+RECOMMENDATIONS_MAX_POSTINGS = 1000
+RECOMMENDATIONS_BATCH_SIZE = 1000
+
+# Pantry coverage ranking, see core.pantry. Each process keeps the
+# indexes of PANTRY_INDEX_SIZE users, for PANTRY_INDEX_TTL seconds at
+# most.
+PANTRY_INDEX_SIZE = 1000
+PANTRY_INDEX_TTL = 3600
+
+# Shopping lists, see recipe.shopping. Plans of more distinct recipes
+# than SHOPPING_LIST_STREAM_MIN are streamed in chunks of rows.
+SHOPPING_LIST_MAX_RECIPES = 5000
+SHOPPING_LIST_STREAM_MIN = 100
+SHOPPING_LIST_CHUNK_SIZE = 500
+
+# Nested reads, see recipe.query. Each field selecting objects costs a
+# query, these bound the number of queries and rows of a request.
+QUERY_MAX_FIELDS = 100
+QUERY_MAX_DEPTH = 5
+QUERY_MAX_LIMIT = 500
+
+# Batched requests, see core.batch
+BATCH_PATH_PREFIXES = ('/api/recipe/', '/api/user/')
+BATCH_MAX_REQUESTS = 20
+BATCH_MAX_WORKERS = 4
+
+# Idempotency-Key replays, see core.idempotency. Responses are kept for
+# IDEMPOTENCY_TTL seconds, keys of requests still running for at most
+# IDEMPOTENCY_LOCK_TIMEOUT.
+IDEMPOTENCY_TTL = 24 * 3600
+IDEMPOTENCY_LOCK_TIMEOUT = 60
+
+# Public recipes, see recipe.views.public_recipe. The CDN keeps them for
+# PUBLIC_RECIPE_S_MAXAGE seconds, purged by surrogate key when they
+# change, browsers for PUBLIC_RECIPE_MAX_AGE. Missing recipes are kept
+# for PUBLIC_RECIPE_NOT_FOUND_MAX_AGE. CDN_PURGER names the core.cdn
+# class sending the purges.
+PUBLIC_RECIPE_MAX_AGE = 60
+PUBLIC_RECIPE_S_MAXAGE = 24 * 3600
+PUBLIC_RECIPE_NOT_FOUND_MAX_AGE = 60
+CDN_PURGER = os.environ.get('CDN_PURGER', 'core.cdn.LoggingPurger')
+
+# Caches. 'default' keeps a short lived copy of entries in process memory
+# ('local') in front of 'shared', which every worker sees: Redis or
+# Memcached from CACHE_URL, or a per process stand-in without it. Code
+# that needs one view across workers, such as locks and counters, uses
+# 'shared' directly. Bump CACHE_VERSION to drop every cached entry, for
+# example when the shape of cached data changes.
+CACHE_URL = os.environ.get('CACHE_URL', '')
+CACHE_VERSION = int(os.environ.get('CACHE_VERSION', '1'))
+CACHE_KEY_PREFIX = 'recipe'
+
+if CACHE_URL.startswith(('redis://', 'rediss://')):
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': CACHE_URL,
+    }
+elif CACHE_URL.startswith('memcached://'):
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+        'LOCATION': CACHE_URL[len('memcached://'):],
+    }
+elif CACHE_URL:
+    raise ImproperlyConfigured(
+        'CACHE_URL must start with redis://, rediss:// or memcached://'
+    )
+else:
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'shared',
+    }
+
+CACHES = {
+    'default': {
+        'BACKEND': 'core.cache_backends.TwoTierCache',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'LOCAL': 'local',
+            'SHARED': 'shared',
+            # Longest a worker may serve an entry changed by another one
+            'LOCAL_TIMEOUT': 5,
+        },
+    },
+    'local': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'local',
+        'TIMEOUT': 5,
+        'KEY_PREFIX': CACHE_KEY_PREFIX,
+        'VERSION': CACHE_VERSION,
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+    'shared': {
+        **SHARED_CACHE,
+        'TIMEOUT': 300,
+        'KEY_PREFIX': CACHE_KEY_PREFIX,
+        'VERSION': CACHE_VERSION,
+    },
+}
+
 ROOT_URLCONF = 'app.urls'
 
 TEMPLATES = [
@@ -135,3 +313,28 @@ STATIC_ROOT = '/vol/web/static'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'core.User'
+
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'core.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+    'DEFAULT_THROTTLE_CLASSES': (
+        'core.throttling.EndpointThrottle',
+        'core.throttling.ScopedThrottle',
+    ) if THROTTLE_ENABLED else (),
+    'DEFAULT_THROTTLE_RATES': {
+        # Per client and endpoint
+        'anon': '100/min',
+        'user': '1200/min',
+        # Per client, on the views and actions setting throttle_scope
+        'token': '10/min',
+        'register': '20/hour',
+        'upload': '60/hour',
+    },
+}
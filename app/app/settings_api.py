@@ -0,0 +1,48 @@
+"""
+API only settings for the recipe app.
+
+The API authenticates with tokens and speaks JSON, so API workers don't
+need the admin, sessions, messages, static files or the browsable API.
+Leaving them out shortens the middleware chain and the imports every
+worker pays for at startup. Select it with
+
+    DJANGO_SETTINGS_MODULE=app.settings_api
+
+The admin stays available from processes running app.settings. Compare
+the two profiles with `python -m benchmarks.bench_startup`.
+"""
+from app.settings import *  # noqa: F401,F403
+from app.settings import REST_FRAMEWORK
+
+INSTALLED_APPS = [
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'rest_framework',
+    'rest_framework.authtoken',
+    'core',
+    'user',
+    'recipe',
+]
+
+# No sessions means no CSRF or session authentication to check, and no
+# pages to frame.
+MIDDLEWARE = [
+    'core.middleware.RequestTimingMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'core.middleware.CompressionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+]
+
+ROOT_URLCONF = 'app.urls_api'
+
+TEMPLATES = []
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_AUTHENTICATION_CLASSES': (
+        'rest_framework.authentication.TokenAuthentication',
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'core.renderers.FastJSONRenderer',
+    ),
+}
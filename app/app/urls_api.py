@@ -0,0 +1,13 @@
+"""URL configuration of the API only settings, app.settings_api"""
+from django.urls import path, include
+from django.conf.urls.static import static
+from django.conf import settings
+
+from core import views as core_views
+
+urlpatterns = [
+    path('metrics', core_views.metrics, name='metrics'),
+    path('api/user/', include('user.urls')),
+    path('api/recipe/', include('recipe.urls')),
+    path('api/batch/', core_views.BatchView.as_view(), name='batch'),
+] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,81 @@
+"""Benchmarks for the recipe API
+
+Run a benchmark from the `app` directory against the configured database,
+for example inside the docker-compose container:
+
+    docker-compose run app sh -c "python -m benchmarks.bench_serializers"
+
+Benchmarks seed their own data inside a transaction that is rolled back
+once they finish, so they can be pointed at a development database.
+
+    datagen            seed N users x M recipes with bulk inserts
+    bench_queries      endpoint querysets, timed with their query counts
+    bench_serializers  DRF serializers against the fast serializers
+    bench_renderers    JSON rendering and parsing
+    loadtest           keep-alive HTTP load against single paths
+    scenario           HTTP load over every endpoint with query budgets
+    bench_startup      startup time and RSS of app.wsgi per settings profile
+    bench_throttle     cost of a rate limit check on the shared cache
+    bench_pantry       pantry coverage ranking with bitmaps and sets
+"""
+import os
+import statistics
+import time
+from contextlib import contextmanager
+
+
+def setup_django():
+    """Configure Django so benchmarks can run as plain scripts"""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+    import django
+    django.setup()
+
+
+class Rollback(Exception):
+    """Raised to discard the data seeded by a benchmark"""
+
+
+@contextmanager
+def rolled_back():
+    """Run the block in a transaction that is always rolled back"""
+    from django.db import transaction
+
+    try:
+        with transaction.atomic():
+            yield
+            raise Rollback
+    except Rollback:
+        pass
+
+
+def measure(func, number=10, repeat=5):
+    """Time `func` and return the per call timings of each repeat"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) / number)
+    return timings
+
+
+def percentile(values, pct):
+    """Return the pct percentile of already sorted values"""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, round(pct / 100 * (len(values) - 1)))
+    return values[index]
+
+
+def report(name, timings, items=None):
+    """Print best and median timing, with throughput when items given"""
+    best = min(timings)
+    median = statistics.median(timings)
+    line = (
+        f'{name:<40} best {best * 1000:9.3f} ms  '
+        f'median {median * 1000:9.3f} ms'
+    )
+    if items:
+        line += f'  {items / median:12,.0f} items/s'
+    print(line)
+    return median
@@ -0,0 +1,63 @@
+"""Pantry coverage ranking with core.pantry against a brute force loop
+
+Builds an index of synthetic rows, no database involved:
+
+    python -m benchmarks.bench_pantry --recipes 5000 --pantry 20
+"""
+import argparse
+import random
+
+from benchmarks import setup_django, measure, report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--recipes', type=int, default=5000)
+    parser.add_argument('--ingredients', type=int, default=300)
+    parser.add_argument('--pantry', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from core.pantry import PantryIndex
+
+    rng = random.Random(1)
+    # Popular ingredients are used by many recipes, as in seed_data.
+    weights = [1 / rank for rank in range(1, args.ingredients + 1)]
+    rows = sorted({
+        (recipe_id, ingredient_id)
+        for recipe_id in range(args.recipes)
+        for ingredient_id in rng.choices(
+            range(args.ingredients), weights, k=rng.randint(3, 12)
+        )
+    })
+    pantry = set(rng.sample(range(args.ingredients), args.pantry))
+    recipes = {}
+    for recipe_id, ingredient_id in rows:
+        recipes.setdefault(recipe_id, set()).add(ingredient_id)
+
+    def brute_force():
+        ranked = [
+            (recipe_id, len(needed & pantry), len(needed))
+            for recipe_id, needed in recipes.items() if needed & pantry
+        ]
+        ranked.sort(
+            key=lambda item: (-item[1] / item[2], -item[1], -item[0])
+        )
+        return ranked
+
+    report('build index', measure(
+        lambda: PantryIndex('bench', rows), number=1, repeat=args.repeat,
+    ), items=len(rows))
+    index = PantryIndex('bench', rows)
+    assert index.rank(pantry) == brute_force()
+    report('rank with bitmaps', measure(
+        lambda: index.rank(pantry), repeat=args.repeat,
+    ), items=args.recipes)
+    report('rank with sets', measure(
+        brute_force, repeat=args.repeat,
+    ), items=args.recipes)
+
+
+if __name__ == '__main__':
+    main()
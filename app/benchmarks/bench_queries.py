@@ -0,0 +1,79 @@
+"""Time the querysets behind the recipe endpoints, with their query counts
+
+Seeds --users users with --recipes recipes each, so every case runs
+against a table holding other users' rows too, then times what the list,
+filter and detail endpoints run for one of them.
+"""
+import argparse
+
+from benchmarks import setup_django, rolled_back, measure, report
+
+
+def cases(user):
+    """Return (name, func) pairs running the endpoint querysets of user"""
+    from core.models import Recipe, Tag, Ingredient
+    from recipe import serializers, queries
+
+    popular_tags = ','.join(
+        str(pk) for pk in Tag.objects.filter(user=user)
+        .order_by('id').values_list('id', flat=True)[:2]
+    )
+    popular_ingredients = ','.join(
+        str(pk) for pk in Ingredient.objects.filter(user=user)
+        .order_by('id').values_list('id', flat=True)[:2]
+    )
+    recipe = Recipe.objects.filter(user=user).order_by('id').first()
+
+    def recipes(params):
+        return serializers.FastRecipeSerializer(
+            queries.filter_recipes(Recipe.objects.all(), params, user)
+        ).data
+
+    def tags(params):
+        return serializers.FastTagSerializer(
+            queries.filter_attributes(Tag.objects.all(), params, user)
+        ).data
+
+    def detail():
+        return serializers.RecipeDetailSerializer(
+            Recipe.objects.get(user=user, pk=recipe.pk)
+        ).data
+
+    return (
+        ('recipe list', lambda: recipes({})),
+        ('recipes by tags', lambda: recipes({'tags': popular_tags})),
+        ('recipes by ingredients',
+         lambda: recipes({'ingredients': popular_ingredients})),
+        ('tag list', lambda: tags({})),
+        ('assigned tags', lambda: tags({'assigned_only': '1'})),
+        ('recipe detail', detail),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--recipes', type=int, default=500)
+    parser.add_argument('--number', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from benchmarks.datagen import generate
+
+    with rolled_back():
+        users = generate(args.users, args.recipes, prefix='bench-queries')
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        for name, func in cases(users[0]):
+            with CaptureQueriesContext(connection) as captured:
+                data = func()
+            items = len(data) if isinstance(data, list) else None
+            timings = measure(func, number=args.number, repeat=args.repeat)
+            report(f'{name} ({len(captured)} queries)', timings, items)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""Compare DRF's JSON renderer and parser with the orjson based pair"""
+import argparse
+import io
+
+from benchmarks import setup_django, measure, report
+
+
+def recipe_payload(rows, fan_out):
+    """Build a recipe list payload shaped like the list endpoint output"""
+    return [
+        {
+            'id': i,
+            'title': f'Recipe number {i} with crème fraîche',
+            'ingredients': list(range(i, i + fan_out)),
+            'tags': list(range(i, i + fan_out)),
+            'time_minutes': i % 90,
+            'price': f'{i % 100}.{i % 10}5',
+            'link': f'https://example.com/recipes/{i}',
+        }
+        for i in range(rows)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--fan-out', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from rest_framework.parsers import JSONParser
+    from rest_framework.renderers import JSONRenderer
+    from core.parsers import FastJSONParser
+    from core.renderers import FastJSONRenderer
+
+    data = recipe_payload(args.rows, args.fan_out)
+    body = JSONRenderer().render(data)
+    assert FastJSONRenderer().render(data) == body
+    print(f'payload {len(body):,} bytes\n')
+
+    for renderer in (JSONRenderer(), FastJSONRenderer()):
+        report(
+            f'render {type(renderer).__name__}',
+            measure(lambda: renderer.render(data), repeat=args.repeat),
+            args.rows,
+        )
+    for json_parser in (JSONParser(), FastJSONParser()):
+        report(
+            f'parse {type(json_parser).__name__}',
+            measure(
+                lambda: json_parser.parse(
+                    io.BytesIO(body), 'application/json', {}
+                ),
+                repeat=args.repeat,
+            ),
+            args.rows,
+        )
+
+
+if __name__ == '__main__':
+    main()
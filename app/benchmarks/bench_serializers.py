@@ -0,0 +1,85 @@
+"""Compare the DRF model serializers with the fast read-only serializers"""
+import argparse
+
+from benchmarks import setup_django, rolled_back, measure, report
+
+
+def seed(count, fan_out, email='bench@serializers.com'):
+    """Create a user with `count` recipes, tags and ingredients"""
+    from django.contrib.auth import get_user_model
+    from core.models import Recipe, Tag, Ingredient
+
+    user = get_user_model().objects.create_user(
+        email=email, password='benchpass', name='bench'
+    )
+    tags = Tag.objects.bulk_create(
+        Tag(user=user, name=f'tag {i}') for i in range(count)
+    )
+    ingredients = Ingredient.objects.bulk_create(
+        Ingredient(user=user, name=f'ingredient {i}') for i in range(count)
+    )
+    recipes = Recipe.objects.bulk_create(
+        Recipe(user=user, title=f'recipe {i}', time_minutes=i % 90,
+               price=f'{i % 100}.{i % 10}5')
+        for i in range(count)
+    )
+    Recipe.tags.through.objects.bulk_create(
+        Recipe.tags.through(recipe_id=recipe.id,
+                            tag_id=tags[(i + j) % count].id)
+        for i, recipe in enumerate(recipes) for j in range(fan_out)
+    )
+    Recipe.ingredients.through.objects.bulk_create(
+        Recipe.ingredients.through(
+            recipe_id=recipe.id,
+            ingredient_id=ingredients[(i + j) % count].id
+        )
+        for i, recipe in enumerate(recipes) for j in range(fan_out)
+    )
+    return user
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--fan-out', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from core.models import Recipe, Tag, Ingredient
+    from recipe import serializers
+
+    pairs = (
+        (Tag, serializers.TagSerializer, serializers.FastTagSerializer),
+        (Ingredient, serializers.IngredientSerializer,
+         serializers.FastIngredientSerializer),
+        (Recipe, serializers.RecipeSerializer,
+         serializers.FastRecipeSerializer),
+    )
+    with rolled_back():
+        user = seed(args.rows, args.fan_out)
+        for model, drf_class, fast_class in pairs:
+            queryset = model.objects.filter(user=user).order_by('-id')
+            if model is Recipe:
+                drf_queryset = queryset.prefetch_related('tags', 'ingredients')
+            else:
+                drf_queryset = queryset
+            assert fast_class(queryset).data == drf_class(
+                drf_queryset, many=True).data
+            drf = report(
+                drf_class.__name__,
+                measure(lambda: drf_class(drf_queryset, many=True).data,
+                        number=1, repeat=args.repeat),
+                args.rows,
+            )
+            fast = report(
+                fast_class.__name__,
+                measure(lambda: fast_class(queryset).data,
+                        number=1, repeat=args.repeat),
+                args.rows,
+            )
+            print(f'{"speedup":<40} {drf / fast:.1f}x\n')
+
+
+if __name__ == '__main__':
+    main()
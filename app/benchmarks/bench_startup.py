@@ -0,0 +1,110 @@
+"""Startup time and memory of app.wsgi for each settings profile
+
+Every run starts a fresh interpreter, imports app.wsgi, loads the
+URLconf and serves one request that needs no database, then reports how
+long that took and the process RSS:
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --importtime 15
+
+--importtime also lists the packages slowest to import in each profile,
+from `python -X importtime`.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import Counter
+
+PROFILES = ('app.settings', 'app.settings_api')
+
+# Runs in the child interpreter, prints its measurements as JSON. The
+# request is refused for lack of a token, without touching the database.
+CHILD = '''
+import json, resource, sys, time
+start = time.perf_counter()
+import app.wsgi
+from django.test import RequestFactory
+request = RequestFactory(SERVER_NAME='localhost').get('/api/recipe/tags/')
+statuses = []
+app.wsgi.application(
+    request.environ, lambda status, headers: statuses.append(status)
+)
+served = time.perf_counter()
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+try:
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                rss = int(line.split()[1])
+except OSError:
+    pass
+print(json.dumps({
+    'ready': served - start,
+    'rss_kb': rss,
+    'modules': len(sys.modules),
+    'status': statuses[0],
+}))
+'''
+
+
+def run_child(settings, args=()):
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings}
+    result = subprocess.run(
+        [sys.executable, *args, '-c', CHILD],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.splitlines()[-1]), result.stderr
+
+
+def import_time_by_package(importtime):
+    """Return (self time in us, package) sorted slowest first
+
+    Self times exclude nested imports, so adding them up per top level
+    package tells what each dependency costs, wherever it is imported.
+    """
+    totals = Counter()
+    for line in importtime.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        own, _, name = line[len('import time:'):].split('|')
+        totals[name.strip().split('.')[0]] += int(own)
+    return sorted(((time, name) for name, time in totals.items()),
+                  reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument('--settings', nargs='+', default=PROFILES)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--importtime', type=int, default=0, metavar='N',
+                        help='list the N packages slowest to import')
+    args = parser.parse_args()
+
+    for settings in args.settings:
+        # The first run warms the bytecode and file system caches.
+        run_child(settings)
+        runs = [run_child(settings)[0] for _ in range(args.runs)]
+        if not runs[0]['status'].startswith('401'):
+            raise SystemExit(f'{settings}: request got {runs[0]["status"]}')
+        ready = sorted(run['ready'] for run in runs)
+        rss = statistics.median(run['rss_kb'] for run in runs)
+        print(
+            f'{settings:<20} ready best {ready[0] * 1000:7.1f} ms  '
+            f'median {statistics.median(ready) * 1000:7.1f} ms  '
+            f'rss {rss / 1024:6.1f} MiB  {runs[0]["modules"]} modules'
+        )
+        if args.importtime:
+            _, stderr = run_child(settings, ('-X', 'importtime'))
+            for own, name in import_time_by_package(stderr)[
+                :args.importtime
+            ]:
+                print(f'    {own / 1000:8.1f} ms  {name}')
+
+
+if __name__ == '__main__':
+    main()
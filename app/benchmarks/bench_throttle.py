@@ -0,0 +1,40 @@
+"""Cost of a rate limit check against the configured shared cache
+
+Point CACHE_URL at the production cache kind to see its round trips:
+
+    CACHE_URL=redis://localhost:6379/0 python -m benchmarks.bench_throttle
+"""
+import argparse
+
+from benchmarks import setup_django, measure, report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--clients', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    setup_django()
+    from core.throttling import TokenBucketThrottle
+
+    throttle = TokenBucketThrottle()
+    clients = iter(range(10 ** 9))
+
+    report('new bucket', measure(
+        lambda: throttle.consume(f'bench:{next(clients)}', 20, 200),
+        number=args.clients, repeat=args.repeat,
+    ))
+    # Fast enough to run a full bucket down, only counting
+    report('allowed', measure(
+        lambda: throttle.consume('bench:busy', 1, 10 ** 7),
+        number=args.clients, repeat=args.repeat,
+    ))
+    report('refused', measure(
+        lambda: throttle.consume('bench:empty', 1e-6, 1),
+        number=args.clients, repeat=args.repeat,
+    ))
+
+
+if __name__ == '__main__':
+    main()
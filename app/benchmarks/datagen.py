@@ -0,0 +1,170 @@
+"""Seed users with recipes, tags and ingredients for benchmarks
+
+    python -m benchmarks.datagen --users 50 --recipes 200
+
+Every user gets their own tags and ingredients. Recipes pick them with a
+skewed popularity, a few staples show up in most recipes and the long
+tail rarely, like real recipe collections. Everything is inserted with
+bulk_create and the output is deterministic for a given --seed. Users
+are named `<prefix>-<n>@bench.recipe.app`, rerun with --delete to remove
+them.
+"""
+import argparse
+import random
+import time
+
+from benchmarks import setup_django
+from core.seeding import INGREDIENT_NAMES, TAG_NAMES, names
+
+EMAIL_DOMAIN = 'bench.recipe.app'
+PASSWORD = 'benchpass'
+
+
+def popularity(count):
+    """Return Zipf like weights for `count` items, most popular first"""
+    return [1 / rank for rank in range(1, count + 1)]
+
+
+def pick(rng, population, weights, count):
+    """Pick `count` distinct items, favouring the heavier ones"""
+    chosen = set()
+    while len(chosen) < min(count, len(population)):
+        chosen.add(rng.choices(population, weights)[0])
+    return chosen
+
+
+def generate(users, recipes, tags=20, ingredients=40, tags_per_recipe=(0, 4),
+             ingredients_per_recipe=(3, 12), seed=0, prefix='bench',
+             batch_size=2000):
+    """Create users x recipes with their tags and ingredients
+
+    Returns the created users. Fan-out per recipe is drawn uniformly from
+    the given (min, max) ranges.
+    """
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.hashers import make_password
+    from core.models import Recipe, Tag, Ingredient
+
+    rng = random.Random(seed)
+    # Hashing is deliberately slow, every user shares one password hash.
+    password = make_password(PASSWORD)
+    user_model = get_user_model()
+    created = user_model.objects.bulk_create(
+        (
+            user_model(
+                email=f'{prefix}-{i}@{EMAIL_DOMAIN}', name=f'{prefix} {i}',
+                password=password,
+            )
+            for i in range(users)
+        ),
+        batch_size=batch_size,
+    )
+
+    tag_names = names(TAG_NAMES, tags)
+    ingredient_names = names(INGREDIENT_NAMES, ingredients)
+    user_tags = Tag.objects.bulk_create(
+        (Tag(user=user, name=name)
+         for user in created for name in tag_names),
+        batch_size=batch_size,
+    )
+    user_ingredients = Ingredient.objects.bulk_create(
+        (Ingredient(user=user, name=name)
+         for user in created for name in ingredient_names),
+        batch_size=batch_size,
+    )
+    new_recipes = Recipe.objects.bulk_create(
+        (
+            Recipe(
+                user=user,
+                title=f'{rng.choice(ingredient_names)} '
+                      f'{rng.choice(("stew", "salad", "pie", "curry"))} {i}',
+                time_minutes=rng.randint(5, 180),
+                price=f'{rng.randint(1, 60)}.{rng.randint(0, 99):02}',
+                link=f'https://example.com/{user.pk}/{i}'
+                if rng.random() < 0.3 else '',
+            )
+            for user in created for i in range(recipes)
+        ),
+        batch_size=batch_size,
+    )
+
+    tag_weights = popularity(tags)
+    ingredient_weights = popularity(ingredients)
+    recipe_tags, recipe_ingredients = [], []
+    for index, recipe in enumerate(new_recipes):
+        user_index = index // recipes
+        own_tags = user_tags[user_index * tags:(user_index + 1) * tags]
+        own_ingredients = user_ingredients[
+            user_index * ingredients:(user_index + 1) * ingredients
+        ]
+        for tag in pick(rng, own_tags, tag_weights,
+                        rng.randint(*tags_per_recipe)):
+            recipe_tags.append(
+                Recipe.tags.through(recipe_id=recipe.pk, tag_id=tag.pk)
+            )
+        for ingredient in pick(rng, own_ingredients, ingredient_weights,
+                               rng.randint(*ingredients_per_recipe)):
+            recipe_ingredients.append(Recipe.ingredients.through(
+                recipe_id=recipe.pk, ingredient_id=ingredient.pk
+            ))
+    Recipe.tags.through.objects.bulk_create(
+        recipe_tags, batch_size=batch_size
+    )
+    Recipe.ingredients.through.objects.bulk_create(
+        recipe_ingredients, batch_size=batch_size
+    )
+    return created
+
+
+def delete(prefix='bench'):
+    """Delete the users created by `generate` with prefix, and their data"""
+    from django.contrib.auth import get_user_model
+    from core.models import Recipe, Tag, Ingredient
+
+    users = get_user_model().objects.filter(
+        email__startswith=f'{prefix}-', email__endswith=f'@{EMAIL_DOMAIN}'
+    )
+    # Delete bottom up, cascading from users collects every row first.
+    for model in (Recipe, Tag, Ingredient):
+        model.objects.filter(user__in=users).delete()
+    return users.delete()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--recipes', type=int, default=100,
+                        help='recipes per user')
+    parser.add_argument('--tags', type=int, default=20,
+                        help='tags per user')
+    parser.add_argument('--ingredients', type=int, default=40,
+                        help='ingredients per user')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--prefix', default='bench')
+    parser.add_argument('--delete', action='store_true',
+                        help='delete previously generated users instead')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import transaction
+
+    start = time.perf_counter()
+    if args.delete:
+        deleted = delete(args.prefix)
+        print(f'deleted {deleted:,} users')
+        return
+    with transaction.atomic():
+        generate(
+            args.users, args.recipes, tags=args.tags,
+            ingredients=args.ingredients, seed=args.seed, prefix=args.prefix,
+        )
+    print(
+        f'created {args.users:,} users x {args.recipes:,} recipes in '
+        f'{time.perf_counter() - start:.1f}s'
+    )
+
+
+if __name__ == '__main__':
+    main()
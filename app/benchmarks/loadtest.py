@@ -0,0 +1,175 @@
+"""HTTP load test for the recipe API
+
+Start a server with THROTTLE_ENABLED=0 first, for example one of:
+
+    uvicorn app.asgi:application --port 8000 --workers 1
+    python manage.py runserver 8000
+
+then seed a user and hammer one or more paths with keep-alive
+connections:
+
+    python -m benchmarks.loadtest --seed 500 \\
+        /api/recipe/recipies/ /api/recipe/async/recipies/
+
+Seeding creates (or reuses) a loadtest user owning the given number of
+recipes and prints its token, so later runs can pass --token instead.
+"""
+import argparse
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+from benchmarks import setup_django, percentile
+
+LOADTEST_EMAIL = 'loadtest@recipe.app'
+
+
+def seed_user(recipes, fan_out=4):
+    """Create the loadtest user with recipes and return its token key"""
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from rest_framework.authtoken.models import Token
+    from benchmarks.bench_serializers import seed
+
+    user = get_user_model().objects.filter(email=LOADTEST_EMAIL).first()
+    if user is not None and user.recipe_set.count() != recipes:
+        user.delete()
+        user = None
+    if user is None:
+        user = seed(recipes, fan_out, email=LOADTEST_EMAIL)
+    token, _ = Token.objects.get_or_create(user=user)
+    return token.key
+
+
+async def _read_response(reader):
+    """Read one HTTP/1.1 response and return (status, headers, body)"""
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split()[1])
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+    if 'content-length' in headers:
+        body = await reader.readexactly(int(headers['content-length']))
+    elif headers.get('transfer-encoding') == 'chunked':
+        chunks = []
+        while True:
+            size = int((await reader.readuntil(b'\r\n')).strip(), 16)
+            chunks.append(await reader.readexactly(size + 2))
+            if size == 0:
+                break
+        body = b''.join(chunk[:-2] for chunk in chunks)
+    else:
+        body = b''
+    return status, headers, body
+
+
+async def _client(host, port, request, count, results):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for _ in range(count):
+            start = time.perf_counter()
+            try:
+                writer.write(request)
+                status, headers, body = await _read_response(reader)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                # Recycled workers drop keep-alive connections, count the
+                # request as failed and reconnect.
+                status, headers = 0, {'connection': 'close'}
+            results.append((time.perf_counter() - start, status, headers))
+            if headers.get('connection') == 'close':
+                writer.close()
+                reader, writer = await asyncio.open_connection(host, port)
+    finally:
+        writer.close()
+
+
+async def run(url, token, concurrency, requests, accept_encoding=None):
+    """Send `requests` GETs to url over `concurrency` connections"""
+    parts = urlsplit(url)
+    path = parts.path + (f'?{parts.query}' if parts.query else '')
+    headers = [
+        f'GET {path} HTTP/1.1',
+        f'Host: {parts.netloc}',
+        'Connection: keep-alive',
+        'Accept: application/json',
+    ]
+    if token:
+        headers.append(f'Authorization: Token {token}')
+    if accept_encoding:
+        headers.append(f'Accept-Encoding: {accept_encoding}')
+    request = ('\r\n'.join(headers) + '\r\n\r\n').encode()
+
+    results = []
+    per_client, extra = divmod(requests, concurrency)
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        _client(
+            parts.hostname, parts.port or 80, request,
+            per_client + (1 if i < extra else 0), results,
+        )
+        for i in range(concurrency)
+    ))
+    return results, time.perf_counter() - start
+
+
+def summarize(name, results, elapsed):
+    """Print throughput and latency percentiles, return the summary"""
+    latencies = sorted(latency for latency, _, _ in results)
+    errors = sum(
+        1 for _, status, _ in results if status >= 400 or status == 0
+    )
+    summary = {
+        'requests': len(results),
+        'rps': len(results) / elapsed,
+        'p50': percentile(latencies, 50),
+        'p95': percentile(latencies, 95),
+        'p99': percentile(latencies, 99),
+        'errors': errors,
+    }
+    print(
+        f'{name:<45} {summary["rps"]:9,.0f} req/s  '
+        f'p50 {summary["p50"] * 1000:7.1f} ms  '
+        f'p95 {summary["p95"] * 1000:7.1f} ms  '
+        f'p99 {summary["p99"] * 1000:7.1f} ms  '
+        f'errors {errors}'
+    )
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument('paths', nargs='+')
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--token')
+    parser.add_argument('--seed', type=int, metavar='RECIPES')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--warmup', type=int, default=100)
+    parser.add_argument('--accept-encoding')
+    args = parser.parse_args()
+
+    token = args.token
+    if args.seed is not None:
+        token = seed_user(args.seed)
+        print(f'token {token}\n')
+
+    for path in args.paths:
+        url = args.base_url + path
+        asyncio.run(run(
+            url, token, args.concurrency, args.warmup, args.accept_encoding
+        ))
+        results, elapsed = asyncio.run(run(
+            url, token, args.concurrency, args.requests,
+            args.accept_encoding,
+        ))
+        summarize(path, results, elapsed)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""Repeatable HTTP load scenario with latency and query count budgets
+
+Start the server (DEBUG off and SERVER_TIMING_HEADER on), for example
+with docker-compose, then from the `app` directory:
+
+    python -m benchmarks.scenario --base-url http://127.0.0.1:8000
+
+The first run seeds --users users with --recipes recipes each through
+benchmarks.datagen, later runs with the same sizes reuse them. Every
+endpoint is loaded in turn with keep-alive connections and reported with
+p50/p95/p99 latencies. The Server-Timing header of every response is
+checked against the endpoint's query budget, the run exits with status 1
+when a budget is exceeded or a request fails. Pass --output to keep the
+numbers for comparing runs.
+"""
+import argparse
+import asyncio
+import json
+import re
+import sys
+
+from benchmarks import setup_django
+from benchmarks.loadtest import run, summarize
+
+PREFIX = 'scenario'
+
+# (name, path, queries allowed per request). Token authentication costs
+# one query, the rest must not grow with the number of rows returned.
+ENDPOINTS = (
+    ('recipe list', '/api/recipe/recipies/', 4),
+    ('recipes by tags', '/api/recipe/recipies/?tags={tags}', 4),
+    ('recipes by ingredients',
+     '/api/recipe/recipies/?ingredients={ingredients}', 4),
+    ('recipe detail', '/api/recipe/recipies/{recipe}/', 4),
+    ('tag list', '/api/recipe/tags/', 2),
+    ('assigned ingredients', '/api/recipe/ingredients/?assigned_only=1', 2),
+    ('async recipe list', '/api/recipe/async/recipies/', 4),
+    ('user profile', '/api/user/me/', 1),
+)
+
+QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+def _first_ids(queryset, count=2):
+    ids = queryset.order_by('id').values_list('id', flat=True)[:count]
+    return ','.join(map(str, ids))
+
+
+def prepare(users, recipes):
+    """Seed the scenario users if needed, return (token, path values)"""
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.db import transaction
+    from rest_framework.authtoken.models import Token
+    from core.models import Recipe, Tag, Ingredient
+    from benchmarks import datagen
+
+    first = f'{PREFIX}-0@{datagen.EMAIL_DOMAIN}'
+    existing = get_user_model().objects.filter(
+        email__startswith=f'{PREFIX}-', email__endswith=datagen.EMAIL_DOMAIN
+    )
+    user = existing.filter(email=first).first()
+    if existing.count() != users or user is None or \
+            user.recipe_set.count() != recipes:
+        datagen.delete(PREFIX)
+        with transaction.atomic():
+            user = datagen.generate(users, recipes, prefix=PREFIX)[0]
+
+    token, _ = Token.objects.get_or_create(user=user)
+    values = {
+        'tags': _first_ids(Tag.objects.filter(user=user)),
+        'ingredients': _first_ids(Ingredient.objects.filter(user=user)),
+        'recipe': _first_ids(Recipe.objects.filter(user=user), 1),
+    }
+    return token.key, values
+
+
+def query_counts(results):
+    """Return the query counts reported by the responses' Server-Timing"""
+    counts = []
+    for _, _, headers in results:
+        match = QUERIES.search(headers.get('server-timing', ''))
+        counts.append(int(match.group(1)) if match else None)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--recipes', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--warmup', type=int, default=100)
+    parser.add_argument('--output', help='write the results as JSON')
+    args = parser.parse_args()
+
+    token, values = prepare(args.users, args.recipes)
+
+    failures = []
+    summaries = {}
+    for name, template, budget in ENDPOINTS:
+        url = args.base_url + template.format(**values)
+        asyncio.run(run(url, token, args.concurrency, args.warmup))
+        results, elapsed = asyncio.run(
+            run(url, token, args.concurrency, args.requests)
+        )
+        summary = summarize(name, results, elapsed)
+        counts = query_counts(results)
+        if None in counts:
+            failures.append(f'{name}: responses without Server-Timing')
+        else:
+            summary['queries'] = max(counts)
+            if max(counts) > budget:
+                failures.append(
+                    f'{name}: {max(counts)} queries, budget {budget}'
+                )
+        if summary['errors']:
+            failures.append(f'{name}: {summary["errors"]} failed requests')
+        summaries[name] = summary
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(summaries, file, indent=2)
+    for failure in failures:
+        print(f'FAILED {failure}', file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,22 @@
+import pytest
+
+from django.core.cache import caches
+
+from core.caching import clear_local_caches
+from core.pantry import clear_indexes
+from core.testing import query_budget as _query_budget
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """Start every test with empty caches"""
+    for cache in caches.all():
+        cache.clear()
+    clear_local_caches()
+    clear_indexes()
+
+
+@pytest.fixture
+def query_budget():
+    """Return core.testing.query_budget, for use as a context manager"""
+    return _query_budget
@@ -1,13 +1,63 @@
+from django.conf import settings
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connection
+from django.utils.functional import cached_property
 
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.utils.translation import gettext as _
 from core import models
 
 
+def estimated_count(model):
+    """Return the planner's row estimate for model's table
+
+    Kept up to date by autovacuum, -1 (0 before Postgres 14) when the
+    table was never analyzed.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    return row[0] if row else -1
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that avoids COUNT(*) over large tables
+
+    Unfiltered lists of a table estimated above ADMIN_ESTIMATED_COUNT_MIN
+    rows use the estimate. Filtered lists are counted, but no further than
+    ADMIN_COUNT_LIMIT rows, so a broad search stops scanning there.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_count(queryset.model)
+            if estimate >= settings.ADMIN_ESTIMATED_COUNT_MIN:
+                return estimate
+            return queryset.count()
+        return queryset[:settings.ADMIN_COUNT_LIMIT].count()
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """ModelAdmin for tables too large to count or list in a select"""
+    paginator = EstimatedCountPaginator
+    # The "N total" link would run the unfiltered COUNT(*) again.
+    show_full_result_count = False
+    raw_id_fields = ('user', )
+    list_select_related = ('user', )
+
+
 class UserAdmin(BaseUserAdmin):
     ordering = ['id']
     list_display = ['email', 'name']
+    search_fields = ['^email']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     fieldsets = (
         (None, {'fields': ('email', 'password')}),
         (_('Personal Info'), {'fields': ('name',)}),
@@ -27,7 +77,23 @@ class UserAdmin(BaseUserAdmin):
     )
 
 
+class TagAdmin(LargeTableAdmin):
+    list_display = ['name', 'user']
+    search_fields = ['^name']
+
+
+class IngredientAdmin(LargeTableAdmin):
+    list_display = ['name', 'user']
+    search_fields = ['^name']
+
+
+class RecipeAdmin(LargeTableAdmin):
+    list_display = ['title', 'user', 'time_minutes', 'price']
+    search_fields = ['^title']
+    autocomplete_fields = ['tags', 'ingredients']
+
+
 admin.site.register(models.User, UserAdmin)
-admin.site.register(models.Tag)
-admin.site.register(models.Ingredient)
-admin.site.register(models.Recipe)
+admin.site.register(models.Tag, TagAdmin)
+admin.site.register(models.Ingredient, IngredientAdmin)
+admin.site.register(models.Recipe, RecipeAdmin)
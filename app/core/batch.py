@@ -0,0 +1,179 @@
+"""Several API requests served as one
+
+    POST /api/batch/
+    {"parallel": true, "requests": [
+        {"path": "/api/user/me/"},
+        {"path": "/api/recipe/tags/"},
+        {"method": "POST", "path": "/api/recipe/recipies/", "body": {...}}
+    ]}
+
+returns {"responses": [{"status": 200, "body": ...}, ...]} in the same
+order. The batch is authenticated once and each sub-request is passed to
+its view in process, as the same user, skipping the middleware. Only
+paths under BATCH_PATH_PREFIXES may be batched, throttles still apply to
+each sub-request.
+
+Requests run in order. With "parallel", consecutive GETs run together on
+a pool of BATCH_MAX_WORKERS threads, each with its own database
+connection. That helps slow reads, but costs a connection per thread
+unless CONN_MAX_AGE keeps them, and is skipped inside a transaction,
+whose writes the other connections could not see.
+"""
+import asyncio
+import contextvars
+import io
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import close_old_connections, connection
+from django.http import Http404
+from django.urls import resolve
+
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from core.renderers import FastJSONRenderer
+
+logger = logging.getLogger(__name__)
+
+METHODS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE')
+# Headers of the batch request that don't describe its sub-requests
+SKIPPED_META = (
+    'CONTENT_TYPE', 'CONTENT_LENGTH', 'HTTP_CONTENT_ENCODING',
+    'HTTP_IDEMPOTENCY_KEY',
+)
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.BATCH_MAX_WORKERS,
+            thread_name_prefix='batch',
+        )
+    return _executor
+
+
+class SubRequestSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(choices=METHODS, default='GET')
+    path = serializers.CharField()
+    body = serializers.JSONField(required=False)
+
+    def validate_path(self, path):
+        if not path.startswith(tuple(settings.BATCH_PATH_PREFIXES)):
+            raise serializers.ValidationError(
+                'Only paths under {} can be batched.'.format(
+                    ', '.join(settings.BATCH_PATH_PREFIXES)
+                )
+            )
+        return path
+
+
+class BatchSerializer(serializers.Serializer):
+    requests = SubRequestSerializer(many=True, allow_empty=False)
+    parallel = serializers.BooleanField(default=False)
+
+    def validate_requests(self, requests):
+        if len(requests) > settings.BATCH_MAX_REQUESTS:
+            raise serializers.ValidationError(
+                f'At most {settings.BATCH_MAX_REQUESTS} requests.'
+            )
+        return requests
+
+
+def sub_request(request, item):
+    """Return the Django request of a batch item, as the batch's user"""
+    path, _, query = item['path'].partition('?')
+    body = b''
+    if 'body' in item:
+        body = FastJSONRenderer().render(item['body'])
+    environ = {
+        name: value for name, value in request.META.items()
+        if name not in SKIPPED_META
+    }
+    environ.update({
+        'REQUEST_METHOD': item['method'],
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': io.BytesIO(body),
+    })
+    sub = WSGIRequest(environ)
+    # DRF's Request authenticates these instead of running the
+    # authentication classes again.
+    sub._force_auth_user = request.user
+    sub._force_auth_token = request.auth
+    return sub
+
+
+def _body(response):
+    if isinstance(response, Response):
+        return response.data
+    content = (
+        b''.join(response.streaming_content) if response.streaming
+        else response.content
+    )
+    if response.get('Content-Type', '').startswith('application/json'):
+        return json.loads(content) if content else None
+    return content.decode(response.charset)
+
+
+def dispatch(request, item):
+    """Serve one batch item, return its status and body"""
+    sub = sub_request(request, item)
+    try:
+        match = resolve(sub.path_info)
+        view = match.func
+        if asyncio.iscoroutinefunction(view):
+            view = async_to_sync(view)
+        response = view(sub, *match.args, **match.kwargs)
+    except Http404:
+        return {'status': 404, 'body': {'detail': 'Not found.'}}
+    except Exception:
+        logger.exception('Batch request to %s failed', item['path'])
+        return {'status': 500, 'body': {'detail': 'Server error.'}}
+    return {'status': response.status_code, 'body': _body(response)}
+
+
+def _dispatch_in_pool(request, item):
+    # Pool threads outlive the batch, release their connection the way
+    # request_finished does.
+    close_old_connections()
+    try:
+        return dispatch(request, item)
+    finally:
+        close_old_connections()
+
+
+def run_batch(request, items, parallel=False):
+    """Serve the batch items, return their responses in order"""
+    parallel = parallel and not connection.in_atomic_block
+    responses = []
+    start = 0
+    while start < len(items):
+        end = start + 1
+        if parallel and items[start]['method'] == 'GET':
+            while end < len(items) and items[end]['method'] == 'GET':
+                end += 1
+        if end - start > 1:
+            # Each read runs in a copy of this context, so the request's
+            # instrumentation counts its queries.
+            futures = [
+                _get_executor().submit(
+                    contextvars.copy_context().run,
+                    _dispatch_in_pool, request, item,
+                )
+                for item in items[start:end]
+            ]
+            responses.extend(future.result() for future in futures)
+        else:
+            responses.append(dispatch(request, items[start]))
+        start = end
+    return responses
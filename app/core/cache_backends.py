@@ -0,0 +1,120 @@
+"""Cache backends, configured through CACHES in app/settings.py"""
+from django.core.cache import caches
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+
+from core import metrics
+
+_MISSING = object()
+
+
+class TwoTierCache(BaseCache):
+    """A per process cache in front of a cache shared by every process
+
+        'default': {
+            'BACKEND': 'core.cache_backends.TwoTierCache',
+            'OPTIONS': {'LOCAL': 'local', 'SHARED': 'shared',
+                        'LOCAL_TIMEOUT': 5},
+        }
+
+    LOCAL and SHARED name two other CACHES entries, which apply their own
+    KEY_PREFIX and VERSION. Reads are answered by the local cache while
+    it holds the key, then by the shared one, whose hits are copied to
+    the local cache for LOCAL_TIMEOUT seconds. Writes go to both. Another
+    process only sees a write or delete once its local copy expires, so
+    LOCAL_TIMEOUT bounds how stale a read can be. `add` and `incr` are
+    decided by the shared cache alone, so they are safe across processes.
+    """
+
+    def __init__(self, server, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.local_alias = options.get('LOCAL', 'local')
+        self.shared_alias = options.get('SHARED', 'shared')
+        self.local_timeout = options.get('LOCAL_TIMEOUT', 5)
+
+    @property
+    def local(self):
+        return caches[self.local_alias]
+
+    @property
+    def shared(self):
+        return caches[self.shared_alias]
+
+    def _timeouts(self, timeout):
+        """Return the (shared, local) timeouts of a write"""
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return None, self.local_timeout
+        return timeout, min(timeout, self.local_timeout)
+
+    def get(self, key, default=None, version=None):
+        value = self.local.get(key, _MISSING, version)
+        metrics.record_cache_access(self.local_alias, value is not _MISSING)
+        if value is not _MISSING:
+            return value
+        value = self.shared.get(key, _MISSING, version)
+        metrics.record_cache_access(self.shared_alias, value is not _MISSING)
+        if value is _MISSING:
+            return default
+        self.local.set(key, value, self.local_timeout, version)
+        return value
+
+    def get_many(self, keys, version=None):
+        found = self.local.get_many(keys, version)
+        missing = [key for key in keys if key not in found]
+        if missing:
+            shared = self.shared.get_many(missing, version)
+            if shared:
+                self.local.set_many(shared, self.local_timeout, version)
+            found.update(shared)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        shared_timeout, local_timeout = self._timeouts(timeout)
+        self.shared.set(key, value, shared_timeout, version)
+        self.local.set(key, value, local_timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        shared_timeout, local_timeout = self._timeouts(timeout)
+        failed = self.shared.set_many(data, shared_timeout, version)
+        self.local.set_many(
+            {key: value for key, value in data.items() if key not in failed},
+            local_timeout, version,
+        )
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        shared_timeout, local_timeout = self._timeouts(timeout)
+        added = self.shared.add(key, value, shared_timeout, version)
+        if added:
+            self.local.set(key, value, local_timeout, version)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        shared_timeout, _ = self._timeouts(timeout)
+        # The local copy is refreshed from the shared cache when read.
+        self.local.delete(key, version)
+        return self.shared.touch(key, shared_timeout, version)
+
+    def incr(self, key, delta=1, version=None):
+        self.local.delete(key, version)
+        return self.shared.incr(key, delta, version)
+
+    def has_key(self, key, version=None):
+        return (
+            self.local.has_key(key, version)  # noqa: W601
+            or self.shared.has_key(key, version)  # noqa: W601
+        )
+
+    def delete(self, key, version=None):
+        self.local.delete(key, version)
+        return self.shared.delete(key, version)
+
+    def delete_many(self, keys, version=None):
+        self.local.delete_many(keys, version)
+        self.shared.delete_many(keys, version)
+
+    def clear(self):
+        self.local.clear()
+        self.shared.clear()
@@ -0,0 +1,219 @@
+"""Caching of values that are costly to compute and read concurrently
+
+    details = HotCache('recipe_detail', ttl=300)
+    data = details.get(recipe.pk, lambda: serialize(recipe))
+    details.invalidate(recipe.pk)
+
+Entries live in the 'shared' cache, which every worker sees, behind a
+small LRU of the hottest values in each process. When an entry is
+missing only one worker computes it, holding a lock taken with
+`cache.add`, while the others wait for its result instead of piling on
+the database. Entries are refreshed before they expire with a
+probability that rises as expiry nears and with the time the value took
+to compute (XFetch), so hot keys are rarely found missing. Past expiry
+an entry is still served for `stale_ttl` seconds while one worker
+refreshes it in the background.
+
+Each key also has a generation, bumped by `invalidate`. A computed
+value is only kept if the generation read before computing it hasn't
+moved, so a worker that read the data before a change can't store its
+stale value after the change invalidated the key.
+"""
+import math
+import random
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.core.cache import caches
+
+from core import metrics
+from core.jobs import enqueue
+
+_MISSING = object()
+_hot_caches = []
+
+
+class LRUCache:
+    """Thread safe store of the `size` most recently used values
+
+    Values are kept as they are, not copied, so they must not be changed
+    by the code reading them, and for `ttl` seconds at most.
+    """
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return _MISSING
+            value, expires = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return _MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class HotCache:
+    """Cache of computed values with stampede protection
+
+    name prefixes the keys and labels the hit and miss counts. Values are
+    fresh for `ttl` seconds and served stale for `stale_ttl` more while
+    they are refreshed. `beta` above 1 refreshes earlier. Other processes
+    may serve an invalidated value from their LRU for `local_ttl` seconds.
+    """
+
+    def __init__(self, name, ttl, stale_ttl=None, beta=1.0, local_size=1000,
+                 local_ttl=1, lock_timeout=10, poll_interval=0.05,
+                 cache='shared'):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = ttl if stale_ttl is None else stale_ttl
+        self.beta = beta
+        self.lock_timeout = lock_timeout
+        self.poll_interval = poll_interval
+        self.cache_alias = cache
+        self.local = LRUCache(local_size, local_ttl)
+        # Lock tokens by key, the refresh may run in a job thread
+        self._tokens = {}
+        _hot_caches.append(self)
+
+    @property
+    def cache(self):
+        return caches[self.cache_alias]
+
+    def _key(self, key):
+        return f'{self.name}:{key}'
+
+    def get(self, key, compute):
+        """Return the value of key, calling compute() when it's needed"""
+        value = self.local.get(key)
+        if value is not _MISSING:
+            metrics.record_cache_access(self.name, True)
+            return value
+
+        entry = self.cache.get(self._key(key))
+        metrics.record_cache_access(self.name, entry is not None)
+        if entry is None:
+            return self._compute_once(key, compute)
+
+        value, delta, expires = entry
+        now = time.time()
+        if now >= expires:
+            if self._lock(key):
+                enqueue(self._refresh, key, compute)
+        elif now - delta * self.beta * math.log(1 - random.random()) \
+                >= expires:
+            if self._lock(key):
+                value = self._refresh(key, compute)
+        self.local.set(key, value)
+        return value
+
+    def invalidate(self, *keys):
+        """Drop keys, the next read computes them again
+
+        Values being computed for the keys are dropped too.
+        """
+        # Bumped before the delete, see _store.
+        for key in keys:
+            self._bump_generation(key)
+            self.local.delete(key)
+        self.cache.delete_many([self._key(key) for key in keys])
+
+    def _compute_once(self, key, compute):
+        if self._lock(key):
+            return self._refresh(key, compute)
+
+        # Another worker is computing the value, wait for its result.
+        deadline = time.monotonic() + self.lock_timeout
+        while time.monotonic() < deadline:
+            time.sleep(self.poll_interval)
+            entry = self.cache.get(self._key(key))
+            if entry is not None:
+                self.local.set(key, entry[0])
+                return entry[0]
+            if self.cache.get(self._lock_key(key)) is None:
+                # It failed, the error is ours to raise too.
+                break
+        return self._store(key, compute)
+
+    def _refresh(self, key, compute):
+        try:
+            return self._store(key, compute)
+        finally:
+            self._unlock(key)
+
+    def _store(self, key, compute):
+        generation = self.cache.get(self._generation_key(key))
+        start = time.perf_counter()
+        value = compute()
+        delta = time.perf_counter() - start
+        if self.cache.get(self._generation_key(key)) != generation:
+            return value
+        self.cache.set(
+            self._key(key), (value, delta, time.time() + self.ttl),
+            self.ttl + self.stale_ttl,
+        )
+        # An invalidation between the check and the set bumped the
+        # generation before deleting, so one of them drops the value.
+        if self.cache.get(self._generation_key(key)) != generation:
+            self.cache.delete(self._key(key))
+            return value
+        self.local.set(key, value)
+        return value
+
+    def _generation_key(self, key):
+        return f'{self.name}:{key}:generation'
+
+    def _bump_generation(self, key):
+        # Kept as long as entries, longer than any compute.
+        timeout = self.ttl + self.stale_ttl
+        try:
+            self.cache.incr(self._generation_key(key))
+        except ValueError:
+            if not self.cache.add(self._generation_key(key), 1, timeout):
+                self.cache.incr(self._generation_key(key))
+
+    def _lock_key(self, key):
+        return f'{self.name}:{key}:lock'
+
+    def _lock(self, key):
+        token = uuid.uuid4().hex
+        if self.cache.add(self._lock_key(key), token, self.lock_timeout):
+            self._tokens[key] = token
+            return True
+        return False
+
+    def _unlock(self, key):
+        token = self._tokens.pop(key, None)
+        # Leave a lock that expired and was taken by another worker.
+        if token is not None and self.cache.get(self._lock_key(key)) == token:
+            self.cache.delete(self._lock_key(key))
+
+
+def clear_local_caches():
+    """Empty the per process LRUs of every HotCache, for tests"""
+    for hot_cache in _hot_caches:
+        hot_cache.local.clear()
@@ -0,0 +1,69 @@
+"""Purging of CDN cached responses by surrogate key
+
+Public responses name what they were built from in a Surrogate-Key
+header, such as `recipe-12 tag-3`. When one of those rows changes, call
+`purge(['recipe-12'])` and the CDN_PURGER class drops every cached
+response tagged with the key, once the transaction commits, from a
+background job. LoggingPurger, the default, only logs the keys; set
+CDN_PURGER to a class calling the CDN's purge API in production.
+"""
+import logging
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from core.jobs import enqueue
+
+logger = logging.getLogger(__name__)
+
+_purger = None
+
+
+class BasePurger:
+    """Interface of CDN_PURGER classes"""
+
+    def purge(self, keys):
+        """Drop the responses tagged with any of keys from the CDN"""
+        raise NotImplementedError
+
+
+class LoggingPurger(BasePurger):
+    """Stand-in for a CDN, logs the keys it is asked to purge"""
+
+    def purge(self, keys):
+        logger.info('CDN purge: %s', ' '.join(keys))
+
+
+class MemoryPurger(BasePurger):
+    """Keeps the purged keys in `purged`, for tests"""
+
+    def __init__(self):
+        self.purged = []
+
+    def purge(self, keys):
+        self.purged.extend(keys)
+
+
+def get_purger():
+    """Return the CDN_PURGER instance"""
+    global _purger
+    if _purger is None:
+        _purger = import_string(settings.CDN_PURGER)()
+    return _purger
+
+
+@receiver(setting_changed)
+def _reset_purger(setting, **kwargs):
+    global _purger
+    if setting == 'CDN_PURGER':
+        _purger = None
+
+
+def purge(keys):
+    """Purge keys from the CDN once the current transaction commits"""
+    keys = sorted(set(keys))
+    if keys:
+        transaction.on_commit(lambda: enqueue(get_purger().purge, keys))
@@ -0,0 +1,164 @@
+import logging
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import F
+from django.dispatch import Signal
+from django.utils import timezone
+
+from rest_framework.authtoken.models import Token
+
+from core.jobs import enqueue, resumable
+from core.models import (
+    AccountDeletion, Recipe, RecipeSimilarity, Tag, Ingredient, RecipeImport
+)
+
+logger = logging.getLogger(__name__)
+
+# Sent with the (id, slug) rows of ever published recipes deleted by a
+# batch, which the raw SQL deletes without model signals.
+recipes_deleted = Signal()
+
+
+def _table(model):
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def deletion_steps():
+    """Return (name, model, where clause) deletes in dependency order
+
+    Where clauses take the user id as the `user` parameter. Through rows
+    go first, including rows on other users' recipes that point at this
+    user's tags and ingredients, then the rows they reference.
+    """
+    recipes = f'SELECT id FROM {_table(Recipe)} WHERE user_id = %(user)s'
+    tags = f'SELECT id FROM {_table(Tag)} WHERE user_id = %(user)s'
+    ingredients = \
+        f'SELECT id FROM {_table(Ingredient)} WHERE user_id = %(user)s'
+    recipe_tags = Recipe.tags.through
+    recipe_ingredients = Recipe.ingredients.through
+    return (
+        # Similar recipes are always of the same library.
+        ('similarities', RecipeSimilarity, f'recipe_id IN ({recipes})'),
+        ('recipe_tags', recipe_tags, f'recipe_id IN ({recipes})'),
+        ('recipe_ingredients', recipe_ingredients,
+         f'recipe_id IN ({recipes})'),
+        ('tag_uses', recipe_tags,
+         f'tag_id IN ({tags}) AND recipe_id NOT IN ({recipes})'),
+        ('ingredient_uses', recipe_ingredients,
+         f'ingredient_id IN ({ingredients}) '
+         f'AND recipe_id NOT IN ({recipes})'),
+        ('recipes', Recipe, 'user_id = %(user)s'),
+        ('tags', Tag, 'user_id = %(user)s'),
+        ('ingredients', Ingredient, 'user_id = %(user)s'),
+    )
+
+
+def start_account_deletion(user):
+    """Deactivate user and queue the deletion of their account
+
+    The user can no longer authenticate once this returns, the rows are
+    removed by `delete_account` running as a background job.
+    """
+    with transaction.atomic():
+        user.is_active = False
+        user.save(update_fields=['is_active'])
+        Token.objects.filter(user=user).delete()
+        deletion = AccountDeletion.objects.create(user_id=user.pk)
+        transaction.on_commit(lambda: enqueue(delete_account, deletion.pk))
+    return deletion
+
+
+@resumable(AccountDeletion)
+def delete_account(deletion_id):
+    """Delete a user's library in bounded batches, then the user
+
+    Every batch is a set based DELETE committed on its own, so locks are
+    short and an interrupted job resumes where it stopped. Progress is
+    recorded after each batch, image files are removed by separate jobs.
+    """
+    deletion = AccountDeletion.objects.get(pk=deletion_id)
+    if deletion.status == AccountDeletion.DONE:
+        return deletion
+
+    batch_size = settings.ACCOUNT_DELETION_BATCH_SIZE
+    steps = deletion_steps()
+    if not deletion.totals:
+        with connection.cursor() as cursor:
+            for name, model, where in steps:
+                cursor.execute(
+                    f'SELECT count(*) FROM {_table(model)} WHERE {where}',
+                    {'user': deletion.user_id},
+                )
+                deletion.totals[name] = cursor.fetchone()[0]
+    deletion.status = AccountDeletion.RUNNING
+    deletion.save(update_fields=['status', 'totals', 'updated_at'])
+
+    try:
+        for name, model, where in steps:
+            _delete_in_batches(deletion, name, model, where, batch_size)
+        uploads = [
+            name for name in RecipeImport.objects.filter(
+                user_id=deletion.user_id
+            ).values_list('file', flat=True) if name
+        ]
+        get_user_model().objects.filter(pk=deletion.user_id).delete()
+        if uploads:
+            enqueue(delete_files, deletion.pk, uploads)
+    except Exception as exc:
+        deletion.status = AccountDeletion.FAILED
+        deletion.error = str(exc)
+        deletion.save(update_fields=['status', 'error', 'updated_at'])
+        raise
+
+    deletion.status = AccountDeletion.DONE
+    deletion.error = ''
+    deletion.save(update_fields=['status', 'error', 'updated_at'])
+    return deletion
+
+
+def _delete_in_batches(deletion, name, model, where, batch_size):
+    table = _table(model)
+    returning = 'id, slug, image' if model is Recipe else 'id'
+    sql = (
+        f'DELETE FROM {table} WHERE id IN '
+        f'(SELECT id FROM {table} WHERE {where} LIMIT %(limit)s) '
+        f'RETURNING {returning}'
+    )
+    while True:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                sql, {'user': deletion.user_id, 'limit': batch_size}
+            )
+            rows = cursor.fetchall()
+            deletion.progress[name] = deletion.progress.get(name, 0) + \
+                len(rows)
+            AccountDeletion.objects.filter(pk=deletion.pk).update(
+                progress=deletion.progress, updated_at=timezone.now()
+            )
+        if model is Recipe:
+            images = [image for _, _, image in rows if image]
+            if images:
+                enqueue(delete_files, deletion.pk, images)
+            published = [(pk, slug) for pk, slug, _ in rows if slug]
+            if published:
+                recipes_deleted.send(sender=Recipe, rows=published)
+        if len(rows) < batch_size:
+            return
+
+
+def delete_files(deletion_id, names):
+    """Remove image and import files left behind by an account deletion"""
+    storage = Recipe._meta.get_field('image').storage
+    deleted = 0
+    for name in names:
+        try:
+            storage.delete(name)
+        except OSError:
+            logger.warning('Could not delete file %s', name)
+            continue
+        deleted += 1
+    AccountDeletion.objects.filter(pk=deletion_id).update(
+        files_deleted=F('files_deleted') + deleted
+    )
@@ -0,0 +1,141 @@
+"""Replay of POST responses for requests sent with an Idempotency-Key
+
+    class RecipeViewSet(viewsets.ModelViewSet):
+        @idempotent
+        def create(self, request, *args, **kwargs):
+            return super().create(request, *args, **kwargs)
+
+Clients send a unique Idempotency-Key header with a request and the same
+key when they retry it. The first request runs and its response is kept
+in the 'shared' cache for IDEMPOTENCY_TTL seconds, retries get it back
+without running the view again. Keys are scoped to the view and user.
+
+A retry arriving while the first request still runs gets a 409, and one
+reusing a key for a different request body gets a 422. Only responses
+below 500 returned by the handler are kept: retrying a server error, or
+an error raised as an exception such as a validation error, runs the
+view again.
+"""
+import functools
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.uploadedfile import UploadedFile
+
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+
+HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+MAX_KEY_LENGTH = 255
+
+
+class RequestInProgress(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'A request with this Idempotency-Key is in progress.'
+    default_code = 'idempotency_in_progress'
+
+
+class KeyReused(APIException):
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = (
+        'This Idempotency-Key was used for a different request.'
+    )
+    default_code = 'idempotency_key_reused'
+
+
+def _update(digest, value):
+    if isinstance(value, UploadedFile):
+        digest.update(f'file:{value.name}:{value.size}:'.encode())
+        for chunk in value.chunks():
+            digest.update(chunk)
+        value.seek(0)
+    else:
+        digest.update(json.dumps(value, sort_keys=True, default=str).encode())
+
+
+def fingerprint(request):
+    """Return a digest of the request method, path and parsed data"""
+    digest = hashlib.sha256(f'{request.method} {request.path}'.encode())
+    data = request.data
+    if hasattr(data, 'getlist'):
+        # Form data, uploaded files are hashed from their temporary copy.
+        for name in sorted(data):
+            for value in data.getlist(name):
+                _update(digest, name)
+                _update(digest, value)
+    else:
+        _update(digest, data)
+    return digest.hexdigest()
+
+
+def _replay(entry):
+    response = Response(entry['data'], status=entry['status'])
+    for name, value in entry['headers'].items():
+        response[name] = value
+    response[REPLAYED_HEADER] = 'true'
+    return response
+
+
+def idempotent(handler):
+    """Make a view handler replay its response to repeated requests"""
+
+    @functools.wraps(handler)
+    def wrapper(view, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return handler(view, request, *args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            raise ValidationError({
+                HEADER: f'Must be 1 to {MAX_KEY_LENGTH} characters long.'
+            })
+
+        user = request.user.pk if request.user.is_authenticated else 'anon'
+        key_digest = hashlib.sha256(key.encode()).hexdigest()
+        cache_key = (
+            f'idempotency:{type(view).__name__}.{handler.__name__}:'
+            f'{user}:{key_digest}'
+        )
+        cache = caches['shared']
+        request_fingerprint = fingerprint(request)
+
+        # Mark the key as taken while the handler runs, long enough to
+        # outlast it; a crashed worker frees the key when this expires.
+        pending = {'fingerprint': request_fingerprint, 'status': None}
+        lock_timeout = settings.IDEMPOTENCY_LOCK_TIMEOUT
+        if not cache.add(cache_key, pending, lock_timeout):
+            entry = cache.get(cache_key)
+            if entry is not None:
+                if entry['fingerprint'] != request_fingerprint:
+                    raise KeyReused
+                if entry['status'] is None:
+                    raise RequestInProgress
+                return _replay(entry)
+            # It expired since, the retry runs as the first request unless
+            # another retry took the key in between.
+            if not cache.add(cache_key, pending, lock_timeout):
+                raise RequestInProgress
+
+        try:
+            response = handler(view, request, *args, **kwargs)
+        except Exception:
+            cache.delete(cache_key)
+            raise
+        if response.status_code >= 500:
+            cache.delete(cache_key)
+            return response
+        cache.set(cache_key, {
+            'fingerprint': request_fingerprint,
+            'status': response.status_code,
+            'data': response.data,
+            'headers': {
+                name: response[name] for name in ('Location',)
+                if response.has_header(name)
+            },
+        }, settings.IDEMPOTENCY_TTL)
+        return response
+
+    return wrapper
@@ -0,0 +1,247 @@
+import csv
+import io
+import json
+import logging
+from itertools import islice
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core.jobs import enqueue, resumable
+from core.models import RecipeImport, Recipe, Tag, Ingredient
+from core.pantry import invalidate_pantry
+
+logger = logging.getLogger(__name__)
+
+RECIPE_FIELDS = ('title', 'time_minutes', 'price', 'link')
+# Tags and ingredients in a CSV cell are separated by this
+CSV_LIST_SEPARATOR = ';'
+
+
+class InvalidRecord(Exception):
+    """Raised for a record that can't be imported, the row is skipped"""
+
+
+class ImportTakenOver(Exception):
+    """Raised when another run of the import committed the same batch"""
+
+
+def read_csv(stream):
+    """Yield records from a binary CSV stream with a header row"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    for row in csv.DictReader(text):
+        for name in ('tags', 'ingredients'):
+            value = row.get(name) or ''
+            row[name] = [
+                item for item in value.split(CSV_LIST_SEPARATOR) if item
+            ]
+        yield row
+
+
+def read_ndjson(stream):
+    """Yield records from a binary stream of one JSON object per line"""
+    text = io.TextIOWrapper(stream, encoding='utf-8')
+    for line in text:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            yield InvalidRecord(f'Invalid JSON: {exc}')
+            continue
+        if not isinstance(record, dict):
+            yield InvalidRecord('Expected a JSON object')
+            continue
+        yield record
+
+
+READERS = {
+    RecipeImport.CSV: read_csv,
+    RecipeImport.NDJSON: read_ndjson,
+}
+
+
+def clean_record(record):
+    """Return (recipe field values, tag names, ingredient names)
+
+    Values go through the model fields' own validation, so the rules
+    match the API without running a serializer per row.
+    """
+    if isinstance(record, InvalidRecord):
+        raise record
+    values = {}
+    for name in RECIPE_FIELDS:
+        field = Recipe._meta.get_field(name)
+        value = record.get(name)
+        if value is None or value == '':
+            if not field.blank:
+                raise InvalidRecord(f'{name}: This field is required.')
+            value = ''
+        try:
+            values[name] = field.clean(value, None)
+        except ValidationError as exc:
+            raise InvalidRecord(f'{name}: {" ".join(exc.messages)}')
+
+    names = []
+    for name in ('tags', 'ingredients'):
+        items = record.get(name) or []
+        if not isinstance(items, list) or \
+                not all(isinstance(item, str) for item in items):
+            raise InvalidRecord(f'{name}: Expected a list of names.')
+        cleaned = {item.strip() for item in items if item.strip()}
+        if any(len(item) > 255 for item in cleaned):
+            raise InvalidRecord(f'{name}: Names are limited to 255 chars.')
+        names.append(cleaned)
+    return values, names[0], names[1]
+
+
+class NameResolver:
+    """Map a user's tag or ingredient names to ids, creating missing ones
+
+    The user's existing names are loaded once, names seen for the first
+    time are created with one bulk insert per batch.
+    """
+
+    def __init__(self, model, user):
+        self.model = model
+        self.user = user
+        self.ids = {}
+        for pk, name in model.objects.filter(user=user) \
+                .order_by('id').values_list('id', 'name'):
+            self.ids.setdefault(name, pk)
+
+    def resolve(self, names):
+        """Create the names not seen yet, then return their ids"""
+        missing = sorted(set(names) - self.ids.keys())
+        if missing:
+            created = self.model.objects.bulk_create(
+                self.model(user=self.user, name=name) for name in missing
+            )
+            for obj in created:
+                self.ids[obj.name] = obj.pk
+        return self.ids
+
+
+def start_import(user, file, format):
+    """Record an uploaded import and queue it once the upload commits"""
+    with transaction.atomic():
+        recipe_import = RecipeImport.objects.create(
+            user=user, file=file, format=format
+        )
+        transaction.on_commit(
+            lambda: enqueue(run_import, recipe_import.pk)
+        )
+    return recipe_import
+
+
+@resumable(RecipeImport)
+def run_import(import_id):
+    """Import a file's recipes in batches, resuming after the checkpoint
+
+    Every batch creates its missing tags and ingredients, recipes and
+    through rows, and advances `rows_processed`, in one transaction, so a
+    failed import can be run again without duplicating anything. A run
+    finding its checkpoint moved by another run of the import stops.
+    """
+    recipe_import = RecipeImport.objects.select_related('user') \
+        .get(pk=import_id)
+    if recipe_import.status == RecipeImport.DONE:
+        return recipe_import
+    recipe_import.status = RecipeImport.RUNNING
+    recipe_import.error = ''
+    recipe_import.save(update_fields=['status', 'error', 'updated_at'])
+
+    try:
+        _import_batches(recipe_import)
+    except ImportTakenOver:
+        logger.info('Recipe import %s is run by another job', import_id)
+        recipe_import.refresh_from_db()
+        return recipe_import
+    except Exception as exc:
+        logger.exception('Recipe import %s failed', import_id)
+        RecipeImport.objects.filter(pk=import_id).update(
+            status=RecipeImport.FAILED, error=str(exc),
+            updated_at=timezone.now(),
+        )
+        raise
+
+    RecipeImport.objects.filter(pk=import_id).update(
+        status=RecipeImport.DONE, updated_at=timezone.now()
+    )
+    recipe_import.refresh_from_db()
+    return recipe_import
+
+
+def _import_batches(recipe_import):
+    user = recipe_import.user
+    batch_size = settings.IMPORT_BATCH_SIZE
+    tags = NameResolver(Tag, user)
+    ingredients = NameResolver(Ingredient, user)
+    done = recipe_import.rows_processed
+
+    with recipe_import.file.open('rb') as stream:
+        records = READERS[recipe_import.format](stream)
+        # Records before the checkpoint were committed by an earlier run.
+        records = islice(records, done, None)
+        while True:
+            batch = list(islice(records, batch_size))
+            if not batch:
+                return
+            with transaction.atomic():
+                created, errors = _import_batch(
+                    user, batch, done, tags, ingredients
+                )
+                _checkpoint(recipe_import, done, len(batch), created, errors)
+                done += len(batch)
+
+
+def _import_batch(user, batch, offset, tags, ingredients):
+    rows, errors = [], []
+    for number, record in enumerate(batch, offset + 1):
+        try:
+            rows.append(clean_record(record))
+        except InvalidRecord as exc:
+            errors.append({'row': number, 'error': str(exc)})
+
+    tag_ids = tags.resolve(
+        name for _, names, _ in rows for name in names
+    )
+    ingredient_ids = ingredients.resolve(
+        name for _, _, names in rows for name in names
+    )
+    recipes = Recipe.objects.bulk_create(
+        Recipe(user=user, **values) for values, _, _ in rows
+    )
+    Recipe.tags.through.objects.bulk_create(
+        Recipe.tags.through(recipe_id=recipe.pk, tag_id=tag_ids[name])
+        for recipe, (_, names, _) in zip(recipes, rows) for name in names
+    )
+    Recipe.ingredients.through.objects.bulk_create(
+        Recipe.ingredients.through(
+            recipe_id=recipe.pk, ingredient_id=ingredient_ids[name]
+        )
+        for recipe, (_, _, names) in zip(recipes, rows) for name in names
+    )
+    invalidate_pantry(user.pk)
+    return len(recipes), errors
+
+
+def _checkpoint(recipe_import, done, processed, created, errors):
+    updates = {
+        'rows_processed': F('rows_processed') + processed,
+        'recipes_created': F('recipes_created') + created,
+        'rows_failed': F('rows_failed') + len(errors),
+        'updated_at': timezone.now(),
+    }
+    room = settings.IMPORT_MAX_ERRORS - len(recipe_import.errors)
+    if errors and room > 0:
+        recipe_import.errors.extend(errors[:room])
+        updates['errors'] = recipe_import.errors
+    # Only advance from the checkpoint this batch started at.
+    if not RecipeImport.objects.filter(
+        pk=recipe_import.pk, rows_processed=done
+    ).update(**updates):
+        raise ImportTakenOver()
@@ -0,0 +1,135 @@
+"""Per request timing of database queries and serialization
+
+The request being measured is tracked in a context variable, so the
+query recorder, installed on every connection, also sees queries run in
+sync_to_async threads. Outside a measured request everything here is a
+pass through.
+"""
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+_current = ContextVar('request_metrics', default=None)
+
+# `IN (%s, %s, ...)` lists vary in length with the data, not the code
+_IN_LIST = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+
+
+class NPlusOneError(Exception):
+    """Raised when a request repeats a query shape too many times"""
+
+
+class RequestMetrics:
+    """Timings collected while serving one request"""
+
+    def __init__(self, record_shapes=False):
+        self.start = time.perf_counter()
+        self.db_time = 0.0
+        self.queries = 0
+        self.timings = Counter()
+        self.shapes = Counter() if record_shapes else None
+        self._active = set()
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def repeated_shapes(self, threshold):
+        """Return (shape, count) for shapes run at least threshold times"""
+        if not self.shapes:
+            return []
+        return [
+            (shape, count) for shape, count in self.shapes.most_common()
+            if count >= threshold
+        ]
+
+
+def current_metrics():
+    """Return the metrics of the request being served, if any"""
+    return _current.get()
+
+
+@contextmanager
+def measure_request(record_shapes=False):
+    """Collect metrics for the code run inside the block"""
+    metrics = RequestMetrics(record_shapes)
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def timer(name):
+    """Add the time spent in the block to the current request's `name`
+
+    Nested blocks with the same name are only counted once.
+    """
+    metrics = _current.get()
+    if metrics is None or name in metrics._active:
+        yield
+        return
+    metrics._active.add(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.timings[name] += time.perf_counter() - start
+        metrics._active.discard(name)
+
+
+def query_shape(sql):
+    """Return sql with variable length IN lists collapsed"""
+    return _IN_LIST.sub('(...)', sql)
+
+
+def record_query(execute, sql, params, many, context):
+    """Connection execute wrapper timing queries of measured requests"""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_time += time.perf_counter() - start
+        metrics.queries += 1
+        if metrics.shapes is not None:
+            metrics.shapes[query_shape(sql)] += 1
+
+
+def install(connection):
+    """Add the query recorder to connection, once"""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def install_all():
+    """Add the query recorder to this thread's connections"""
+    for connection in connections.all():
+        install(connection)
+
+
+def _connection_created(sender, connection, **kwargs):
+    install(connection)
+
+
+# Connections are per thread, so also cover the ones opened later by
+# thread pools, e.g. for the async views.
+connection_created.connect(
+    _connection_created, dispatch_uid='core.instrumentation'
+)
+
+
+class TimedSerializerMixin:
+    """Count a serializer's to_representation as serializer time"""
+
+    def to_representation(self, instance):
+        with timer('serializer'):
+            return super().to_representation(instance)
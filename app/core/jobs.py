@@ -0,0 +1,107 @@
+"""Background jobs run on a thread pool of the web worker
+
+Jobs die with the worker, for example when gunicorn recycles it, so
+long running jobs record their progress on a model with `status` and
+`updated_at` fields, bumping `updated_at` as they go, and register with
+`resumable`. Every worker runs a sweeper thread that queues the jobs of
+rows left pending or running without a bump for JOBS_STALE_AFTER seconds
+again, resuming them from their progress.
+"""
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+# (model, job) pairs, see resumable
+_resumable = []
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.JOBS_MAX_WORKERS,
+            thread_name_prefix='jobs',
+        )
+    return _executor
+
+
+def _run(func, args, kwargs):
+    try:
+        return func(*args, **kwargs)
+    except Exception:
+        logger.exception('Background job %s failed', func.__qualname__)
+    finally:
+        # Connections are per thread, close the ones this job opened.
+        connections.close_all()
+
+
+def enqueue(func, *args, **kwargs):
+    """Run func in a background thread of the process wide job pool
+
+    With JOBS_ALWAYS_EAGER the job runs inline, which is what tests want.
+    Jobs must be safe to run again, long running work should record its
+    progress in the database so it can be resumed after a restart.
+    """
+    if settings.JOBS_ALWAYS_EAGER:
+        return func(*args, **kwargs)
+    return _get_executor().submit(_run, func, args, kwargs)
+
+
+def resumable(model):
+    """Register a job taking a model row's pk as the one finishing it"""
+    def decorator(func):
+        _resumable.append((model, func))
+        return func
+    return decorator
+
+
+def resume_stale_jobs():
+    """Queue the jobs of rows left pending or running again
+
+    Rows are claimed by bumping `updated_at`, so a row is only resumed by
+    one of the workers sweeping at once. Returns how many were queued.
+    """
+    queued = 0
+    for model, func in _resumable:
+        cutoff = timezone.now() - timedelta(seconds=settings.JOBS_STALE_AFTER)
+        stale = model.objects.filter(
+            status__in=(model.PENDING, model.RUNNING), updated_at__lt=cutoff,
+        ).values_list('pk', flat=True)
+        for pk in stale:
+            claimed = model.objects.filter(
+                pk=pk, updated_at__lt=cutoff
+            ).update(updated_at=timezone.now())
+            if claimed:
+                logger.warning('Resuming %s %s', model.__name__, pk)
+                enqueue(func, pk)
+                queued += 1
+    return queued
+
+
+def _sweep():
+    while True:
+        # Jittered so the workers' sweeps spread out.
+        time.sleep(settings.JOBS_SWEEP_INTERVAL * random.uniform(0.5, 1.5))
+        try:
+            resume_stale_jobs()
+        except Exception:
+            logger.exception('Resuming stale jobs failed')
+        finally:
+            connections.close_all()
+
+
+def start_sweeper():
+    """Resume stale jobs every JOBS_SWEEP_INTERVAL seconds, in a thread"""
+    thread = threading.Thread(target=_sweep, name='jobs-sweeper', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from core.models import Recipe
+from core.recommendations import build_recommendations
+
+
+class Command(BaseCommand):
+    """Django command to rebuild the similar recipes of libraries."""
+
+    help = 'Score similar recipes for every library, or the given users'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, action='append', dest='users',
+            help='Only rebuild this user id, may be repeated',
+        )
+
+    def handle(self, *args, **options):
+        users = options['users']
+        if not users:
+            users = Recipe.objects.order_by('user_id').values_list(
+                'user_id', flat=True
+            ).distinct().iterator()
+        built = failed = similarities = 0
+        for user_id in users:
+            try:
+                similarities += build_recommendations(user_id)
+            except Exception as exc:
+                # Recipes deleted during the build, for example, the
+                # next run catches up.
+                self.stderr.write(f'Failed for user {user_id}: {exc}')
+                failed += 1
+                continue
+            built += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Done: {similarities} similar recipes for {built} users, '
+            f'{failed} failed'
+        ))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from core.deletion import delete_account
+from core.models import AccountDeletion
+
+
+class Command(BaseCommand):
+    """Django command to finish account deletions left unfinished."""
+
+    help = 'Run pending, interrupted and failed account deletions'
+
+    def handle(self, *args, **options):
+        deletions = AccountDeletion.objects.exclude(
+            status=AccountDeletion.DONE
+        ).order_by('created_at')
+        for deletion in deletions:
+            self.stdout.write(f'Deleting account {deletion.user_id}...')
+            try:
+                delete_account(deletion.pk)
+            except Exception as exc:
+                self.stderr.write(f'Failed: {exc}')
+                continue
+            self.stdout.write(self.style.SUCCESS('Done'))
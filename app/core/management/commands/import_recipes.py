@@ -0,0 +1,70 @@
+import os
+
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importing import run_import
+from core.models import RecipeImport
+
+
+class Command(BaseCommand):
+    """Django command to import a recipe archive or resume imports."""
+
+    help = (
+        'Import recipes from a CSV or NDJSON file for a user, or resume '
+        'unfinished imports with --resume'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('email', nargs='?')
+        parser.add_argument('path', nargs='?')
+        parser.add_argument(
+            '--format', choices=[RecipeImport.CSV, RecipeImport.NDJSON]
+        )
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Run pending, interrupted and failed imports instead',
+        )
+
+    def handle(self, *args, **options):
+        if options['resume']:
+            imports = RecipeImport.objects.exclude(
+                status=RecipeImport.DONE
+            ).order_by('created_at')
+            for recipe_import in imports:
+                self._run(recipe_import)
+            return
+
+        if not options['email'] or not options['path']:
+            raise CommandError('Give a user email and a file to import')
+        try:
+            user = get_user_model().objects.get(email=options['email'])
+        except get_user_model().DoesNotExist:
+            raise CommandError(f'No user with email {options["email"]}')
+        path = options['path']
+        file_format = options['format'] or \
+            os.path.splitext(path)[1].lstrip('.').lower()
+        if file_format == 'jsonl':
+            file_format = RecipeImport.NDJSON
+        if file_format not in (RecipeImport.CSV, RecipeImport.NDJSON):
+            raise CommandError('Give the file --format')
+
+        with open(path, 'rb') as source:
+            recipe_import = RecipeImport(user=user, format=file_format)
+            recipe_import.file.save(
+                os.path.basename(path), File(source), save=True
+            )
+        self._run(recipe_import)
+
+    def _run(self, recipe_import):
+        self.stdout.write(f'Importing {recipe_import.pk}...')
+        try:
+            recipe_import = run_import(recipe_import.pk)
+        except Exception as exc:
+            self.stderr.write(f'Failed: {exc}')
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'Done: {recipe_import.recipes_created} recipes created, '
+            f'{recipe_import.rows_failed} rows skipped'
+        ))
@@ -0,0 +1,235 @@
+import io
+import random
+import time
+from bisect import bisect
+from itertools import accumulate
+from multiprocessing import get_context
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+
+from core.models import Recipe, Tag, Ingredient
+from core.seeding import INGREDIENT_NAMES, TAG_NAMES, names
+
+EMAIL_DOMAIN = 'seed.recipe.app'
+
+DISHES = ('stew', 'salad', 'pie', 'curry', 'soup', 'bake', 'stir fry')
+
+
+def _table(model):
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def reserve_ids(model, count):
+    """Reserve `count` consecutive ids of model, return the first one
+
+    The table is locked while the sequence is advanced, so no concurrent
+    insert can take an id from the middle of the range.
+    """
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'LOCK TABLE {_table(model)} IN SHARE ROW EXCLUSIVE MODE'
+        )
+        cursor.execute(
+            'SELECT setval(pg_get_serial_sequence(%(table)s, \'id\'), '
+            'nextval(pg_get_serial_sequence(%(table)s, \'id\')) '
+            '+ %(count)s - 1)',
+            {'table': model._meta.db_table, 'count': count},
+        )
+        return cursor.fetchone()[0] - count + 1
+
+
+def _pick(rng, cumulative, count):
+    """Pick up to `count` distinct indexes with Zipf like popularity"""
+    if not cumulative:
+        return set()
+    total = cumulative[-1]
+    chosen = set()
+    for _ in range(count * 3):
+        chosen.add(bisect(cumulative, rng.random() * total))
+        if len(chosen) == count:
+            break
+    return chosen
+
+
+def generate_shard(plan, first, last):
+    """Write the COPY text of users first..last-1, return the buffers
+
+    Every user gets its own random generator seeded from --seed and the
+    user's index, so the data doesn't depend on shard or worker counts.
+    """
+    out = {key: io.StringIO() for key in (
+        'users', 'tags', 'ingredients', 'recipes', 'recipe_tags',
+        'recipe_ingredients',
+    )}
+    tags, ingredients, recipes = \
+        plan['tags'], plan['ingredients'], plan['recipes']
+    tag_names = names(TAG_NAMES, tags)
+    ingredient_names = names(INGREDIENT_NAMES, ingredients)
+    # Titles name an ingredient, the user may have none.
+    title_names = ingredient_names or INGREDIENT_NAMES
+    tag_weights = list(accumulate(1 / rank for rank in range(1, tags + 1)))
+    ingredient_weights = list(
+        accumulate(1 / rank for rank in range(1, ingredients + 1))
+    )
+    prefix, password = plan['prefix'], plan['password']
+
+    for index in range(first, last):
+        rng = random.Random(plan['seed'] * 1_000_003 + index)
+        user_id = plan['user_start'] + index
+        out['users'].write(
+            f'{user_id}\t{password}\tf\t{prefix}{index}@{EMAIL_DOMAIN}\t'
+            f'{prefix} {index}\tt\tf\n'
+        )
+        tag_start = plan['tag_start'] + index * tags
+        for offset, name in enumerate(tag_names):
+            out['tags'].write(f'{tag_start + offset}\t{name}\t{user_id}\n')
+        ingredient_start = plan['ingredient_start'] + index * ingredients
+        for offset, name in enumerate(ingredient_names):
+            out['ingredients'].write(
+                f'{ingredient_start + offset}\t{name}\t{user_id}\n'
+            )
+
+        recipe_start = plan['recipe_start'] + index * recipes
+        for recipe_id in range(recipe_start, recipe_start + recipes):
+            link = f'https://example.com/r/{recipe_id}' \
+                if rng.random() < 0.3 else ''
+            out['recipes'].write(
+                f'{recipe_id}\t{user_id}\t'
+                f'{rng.choice(title_names)} {rng.choice(DISHES)}\t'
+                f'{rng.randint(5, 180)}\t'
+                f'{rng.randint(1, 60)}.{rng.randint(0, 99):02}\t{link}\tf\n'
+            )
+            for offset in _pick(rng, tag_weights, rng.randint(0, 4)):
+                out['recipe_tags'].write(
+                    f'{recipe_id}\t{tag_start + offset}\n'
+                )
+            for offset in _pick(rng, ingredient_weights,
+                                rng.randint(3, 12)):
+                out['recipe_ingredients'].write(
+                    f'{recipe_id}\t{ingredient_start + offset}\n'
+                )
+    return out
+
+
+def copy_statements():
+    """Return (buffer key, COPY statement) in foreign key order"""
+    user_table = _table(get_user_model())
+    return (
+        ('users', f'COPY {user_table} (id, password, is_superuser, email, '
+                  f'name, is_active, is_staff) FROM STDIN'),
+        ('tags', f'COPY {_table(Tag)} (id, name, user_id) FROM STDIN'),
+        ('ingredients',
+         f'COPY {_table(Ingredient)} (id, name, user_id) FROM STDIN'),
+        ('recipes', f'COPY {_table(Recipe)} (id, user_id, title, '
+                    f'time_minutes, price, link, is_public) FROM STDIN'),
+        ('recipe_tags', f'COPY {_table(Recipe.tags.through)} '
+                        f'(recipe_id, tag_id) FROM STDIN'),
+        ('recipe_ingredients',
+         f'COPY {_table(Recipe.ingredients.through)} '
+         f'(recipe_id, ingredient_id) FROM STDIN'),
+    )
+
+
+def seed_shard(plan, first, last):
+    """Generate and COPY one shard of users in a single transaction"""
+    buffers = generate_shard(plan, first, last)
+    with transaction.atomic(), connection.cursor() as cursor:
+        for key, sql in copy_statements():
+            buffers[key].seek(0)
+            cursor.copy_expert(sql, buffers[key])
+    return last - first
+
+
+def _seed_shard(args):
+    return seed_shard(*args)
+
+
+class Command(BaseCommand):
+    """Django command to bulk load synthetic users and recipe libraries."""
+
+    help = (
+        'Create users with tags, ingredients and recipes for staging and '
+        'performance testing, loaded with COPY by parallel workers'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=100,
+                            help='Recipes per user')
+        parser.add_argument('--tags', type=int, default=20,
+                            help='Tags per user')
+        parser.add_argument('--ingredients', type=int, default=40,
+                            help='Ingredients per user')
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--shard-size', type=int, default=200,
+                            help='Users loaded per transaction')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='seed',
+                            help='Emails are <prefix><n>@' + EMAIL_DOMAIN)
+        parser.add_argument('--password', default='seedpass')
+
+    def handle(self, *args, **options):
+        users = options['users']
+        recipes, tags, ingredients = \
+            options['recipes'], options['tags'], options['ingredients']
+        prefix = options['prefix']
+        if get_user_model().objects.filter(
+            email__startswith=prefix, email__endswith=f'@{EMAIL_DOMAIN}'
+        ).exists():
+            raise CommandError(
+                f'Users with the prefix "{prefix}" exist, pick another '
+                f'--prefix'
+            )
+        if users < 1:
+            return
+
+        plan = {
+            'recipes': recipes,
+            'tags': tags,
+            'ingredients': ingredients,
+            'seed': options['seed'],
+            'prefix': prefix,
+            # Hashing is deliberately slow, every user shares one hash.
+            'password': make_password(options['password']),
+            'user_start': reserve_ids(get_user_model(), users),
+            'tag_start': reserve_ids(Tag, max(users * tags, 1)),
+            'ingredient_start': reserve_ids(
+                Ingredient, max(users * ingredients, 1)
+            ),
+            'recipe_start': reserve_ids(Recipe, max(users * recipes, 1)),
+        }
+        shard_size = options['shard_size']
+        shards = [
+            (plan, first, min(first + shard_size, users))
+            for first in range(0, users, shard_size)
+        ]
+
+        start = time.perf_counter()
+        done = 0
+        workers = min(options['workers'], len(shards))
+        if workers <= 1:
+            results = map(_seed_shard, shards)
+            pool = None
+        else:
+            # Forked workers must open their own connections.
+            connections.close_all()
+            pool = get_context('fork').Pool(workers)
+            results = pool.imap_unordered(_seed_shard, shards)
+        try:
+            for count in results:
+                done += count
+                self.stdout.write(f'{done:,}/{users:,} users')
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {users:,} users and {users * recipes:,} recipes in '
+            f'{elapsed:.1f}s ({users * recipes / elapsed * 60:,.0f} '
+            f'recipes/min)'
+        ))
@@ -0,0 +1,364 @@
+"""In-process metrics with Prometheus text exposition
+
+Every process writes its samples to its own memory mapped file in
+METRICS_DIR, so updating a metric is a dict lookup and a struct write,
+with no locking between processes. The /metrics view sums the files of
+all workers. When a worker exits the gunicorn master folds its file into
+an archive with `mark_process_dead`, so counters never go backwards.
+Without METRICS_DIR samples live in anonymous memory and only the
+serving process is reported.
+"""
+import bisect
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+
+_HEADER = struct.Struct('<I4x')
+_LENGTH = struct.Struct('<I')
+_VALUE = struct.Struct('<d')
+_INITIAL_SIZE = 64 * 1024
+ARCHIVE = 'metrics_archive.db'
+
+DEFAULT_BUCKETS = (
+    .005, .01, .025, .05, .075, .1, .25, .5, .75, 1, 2.5, 5, 7.5, 10,
+)
+
+
+def _padded(length):
+    """Return the entry length, keeping values 8 byte aligned"""
+    return length + (8 - (_LENGTH.size + length) % 8) % 8
+
+
+class ValueFile:
+    """Float values keyed by string in a growable memory map
+
+    Entries are appended as (key length, key, padding, float64). Values
+    are only written by the owning process, readers parse the whole file.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._positions = {}
+        self._lock = threading.Lock()
+        if path is None:
+            self._file = None
+            self._map = mmap.mmap(-1, _INITIAL_SIZE)
+            self._used = _HEADER.size
+        else:
+            self._file = open(path, 'a+b')
+            size = max(os.fstat(self._file.fileno()).st_size, _INITIAL_SIZE)
+            self._file.truncate(size)
+            self._map = mmap.mmap(self._file.fileno(), size)
+            self._used = _HEADER.unpack_from(self._map)[0] or _HEADER.size
+            for key, _, position in _entries(self._map, self._used):
+                self._positions[key] = position
+        _HEADER.pack_into(self._map, 0, self._used)
+
+    def _grow(self, needed):
+        size = len(self._map)
+        while size < needed:
+            size *= 2
+        if self._file is None:
+            grown = mmap.mmap(-1, size)
+            grown[:self._used] = self._map[:self._used]
+        else:
+            self._file.truncate(size)
+            grown = mmap.mmap(self._file.fileno(), size)
+        self._map.close()
+        self._map = grown
+
+    def _position(self, key):
+        encoded = key.encode()
+        length = _padded(len(encoded))
+        end = self._used + _LENGTH.size + length + _VALUE.size
+        if end > len(self._map):
+            self._grow(end)
+        _LENGTH.pack_into(self._map, self._used, len(encoded))
+        start = self._used + _LENGTH.size
+        self._map[start:start + len(encoded)] = encoded
+        position = start + length
+        _VALUE.pack_into(self._map, position, 0.0)
+        self._used = end
+        _HEADER.pack_into(self._map, 0, self._used)
+        self._positions[key] = position
+        return position
+
+    def add(self, key, amount):
+        with self._lock:
+            position = self._positions.get(key)
+            if position is None:
+                position = self._position(key)
+            value = _VALUE.unpack_from(self._map, position)[0]
+            _VALUE.pack_into(self._map, position, value + amount)
+
+    def items(self):
+        with self._lock:
+            return [
+                (key, _VALUE.unpack_from(self._map, position)[0])
+                for key, position in self._positions.items()
+            ]
+
+    def close(self):
+        self._map.close()
+        if self._file is not None:
+            self._file.close()
+
+
+def _entries(buffer, used):
+    position = _HEADER.size
+    while position < used:
+        length = _LENGTH.unpack_from(buffer, position)[0]
+        start = position + _LENGTH.size
+        key = bytes(buffer[start:start + length]).decode()
+        value_position = start + _padded(length)
+        yield key, _VALUE.unpack_from(buffer, value_position)[0], \
+            value_position
+        position = value_position + _VALUE.size
+
+
+def read_file(path):
+    """Return the (key, value) pairs stored in a metrics file"""
+    with open(path, 'rb') as file:
+        data = file.read()
+    if len(data) < _HEADER.size:
+        return []
+    used = _HEADER.unpack_from(data)[0]
+    return [(key, value) for key, value, _ in _entries(data, used)]
+
+
+_values = None
+_values_lock = threading.Lock()
+
+
+def _process_values():
+    global _values
+    if _values is None:
+        with _values_lock:
+            if _values is None:
+                directory = settings.METRICS_DIR
+                path = None
+                if directory:
+                    path = os.path.join(
+                        directory, f'metrics_{os.getpid()}.db'
+                    )
+                _values = ValueFile(path)
+    return _values
+
+
+def _reset_after_fork():
+    # A forked worker must not write to its parent's file.
+    global _values, _values_lock
+    _values = None
+    _values_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def mark_process_dead(pid, directory=None):
+    """Fold an exited worker's samples into the archive file
+
+    Only call this from one process at a time, the gunicorn master.
+    """
+    directory = directory or settings.METRICS_DIR
+    path = os.path.join(directory, f'metrics_{pid}.db')
+    if not os.path.exists(path):
+        return
+    archive = ValueFile(os.path.join(directory, ARCHIVE))
+    try:
+        for key, value in read_file(path):
+            archive.add(key, value)
+    finally:
+        archive.close()
+    os.remove(path)
+
+
+def clear(directory=None):
+    """Remove all metrics files, call before workers start"""
+    directory = directory or settings.METRICS_DIR
+    for path in glob.glob(os.path.join(directory, 'metrics_*.db')):
+        os.remove(path)
+
+
+class Metric:
+    """Base class for metrics registered in REGISTRY"""
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._keys = {}
+        REGISTRY[name] = self
+
+    def _key(self, suffix, labelvalues):
+        cache_key = (suffix, labelvalues)
+        key = self._keys.get(cache_key)
+        if key is None:
+            key = json.dumps(
+                [self.name, suffix, [str(value) for value in labelvalues]]
+            )
+            self._keys[cache_key] = key
+        return key
+
+    def samples(self, values):
+        """Yield (name, labels, value) for the summed values of this metric
+
+        values maps (sample suffix, label values) to their total.
+        """
+        for (suffix, labelvalues), value in sorted(values.items()):
+            yield self.name + suffix, \
+                dict(zip(self.labelnames, labelvalues)), value
+
+
+class Counter(Metric):
+    """A value that only goes up"""
+    type = 'counter'
+
+    def inc(self, *labelvalues, amount=1):
+        _process_values().add(self._key('_total', labelvalues), amount)
+
+
+class Histogram(Metric):
+    """Observations counted into buckets"""
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(),
+                 buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labelvalues):
+        values = _process_values()
+        # Buckets are stored individually and made cumulative on export.
+        index = bisect.bisect_left(self.buckets, value)
+        values.add(self._key(f'_bucket{index}', labelvalues), 1)
+        values.add(self._key('_sum', labelvalues), value)
+
+    def samples(self, values):
+        series = defaultdict(dict)
+        for (suffix, labelvalues), value in values.items():
+            series[labelvalues][suffix] = value
+        bounds = [*map(_format_value, self.buckets), '+Inf']
+        for labelvalues in sorted(series):
+            found = series[labelvalues]
+            labels = dict(zip(self.labelnames, labelvalues))
+            total = 0.0
+            for index, bound in enumerate(bounds):
+                total += found.get(f'_bucket{index}', 0.0)
+                yield f'{self.name}_bucket', {**labels, 'le': bound}, total
+            yield f'{self.name}_count', labels, total
+            yield f'{self.name}_sum', labels, found.get('_sum', 0.0)
+
+
+REGISTRY = {}
+
+HTTP_REQUESTS = Counter(
+    'http_requests', 'Requests served, by view, method and status',
+    ('view', 'method', 'status'),
+)
+HTTP_REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds', 'Time to serve a request, by view',
+    ('view', 'method'),
+)
+DB_QUERIES = Counter(
+    'db_queries', 'Database queries run by requests, by view', ('view',),
+)
+DB_QUERY_SECONDS = Counter(
+    'db_query_seconds', 'Time requests spent in database queries',
+    ('view',),
+)
+CACHE_REQUESTS = Counter(
+    'cache_requests', 'Cache lookups, by cache and hit or miss',
+    ('cache', 'result'),
+)
+THROTTLED_REQUESTS = Counter(
+    'throttled_requests', 'Requests refused by rate limits, by scope',
+    ('scope',),
+)
+IMAGE_UPLOAD_BYTES = Histogram(
+    'recipe_image_upload_bytes', 'Size of uploaded recipe images',
+    buckets=tuple(2 ** power for power in range(14, 25)),
+)
+
+
+def record_cache_access(cache, hit):
+    """Count a cache lookup for the hit ratio"""
+    CACHE_REQUESTS.inc(cache, 'hit' if hit else 'miss')
+
+
+def _files():
+    directory = settings.METRICS_DIR
+    if not directory:
+        return None
+    return glob.glob(os.path.join(directory, 'metrics_*.db'))
+
+
+def collect():
+    """Return {metric name: {(sample suffix, label values): total}}"""
+    files = _files()
+    if files is None:
+        items = _process_values().items()
+    else:
+        items = [item for path in files for item in read_file(path)]
+
+    totals = defaultdict(lambda: defaultdict(float))
+    for key, value in items:
+        name, suffix, labelvalues = json.loads(key)
+        totals[name][suffix, tuple(labelvalues)] += value
+    return totals
+
+
+def db_connection_samples():
+    """Yield database connections by state, read from pg_stat_activity"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT coalesce(state, \'unknown\'), count(*) '
+            'FROM pg_stat_activity WHERE datname = current_database() '
+            'GROUP BY 1 ORDER BY 1'
+        )
+        for state, count in cursor.fetchall():
+            yield 'db_connections', {'state': state}, count
+
+
+def _format_value(value):
+    if value == int(value):
+        return str(int(value)) if abs(value) < 1e15 else repr(float(value))
+    return repr(float(value))
+
+
+def _escape(value):
+    return value.replace('\\', r'\\').replace('\n', r'\n') \
+        .replace('"', r'\"')
+
+
+def _line(name, labels, value):
+    if labels:
+        pairs = ','.join(
+            f'{label}="{_escape(str(label_value))}"'
+            for label, label_value in labels.items()
+        )
+        name = f'{name}{{{pairs}}}'
+    return f'{name} {_format_value(value)}'
+
+
+def exposition():
+    """Render all metrics in the Prometheus text format"""
+    totals = collect()
+    lines = []
+    for metric in REGISTRY.values():
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.type}')
+        for sample in metric.samples(totals.get(metric.name, {})):
+            lines.append(_line(*sample))
+    lines.append('# HELP db_connections Database connections by state')
+    lines.append('# TYPE db_connections gauge')
+    lines.extend(_line(*sample) for sample in db_connection_samples())
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,309 @@
+import asyncio
+import logging
+import zlib
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+from core import instrumentation, metrics as app_metrics
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+
+class GzipCompressor:
+    """Incremental gzip compressor"""
+
+    def __init__(self):
+        self._compressor = zlib.compressobj(
+            6, zlib.DEFLATED, 16 + zlib.MAX_WBITS
+        )
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class BrotliCompressor:
+    """Incremental brotli compressor"""
+
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=5)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class ZstdCompressor:
+    """Incremental zstandard compressor"""
+
+    def __init__(self):
+        self._compressor = zstandard.ZstdCompressor(level=3).compressobj()
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+COMPRESSORS = {'gzip': GzipCompressor}
+if brotli is not None:
+    COMPRESSORS['br'] = BrotliCompressor
+if zstandard is not None:
+    COMPRESSORS['zstd'] = ZstdCompressor
+
+
+@lru_cache(maxsize=256)
+def negotiate_encoding(accept_encoding, preference):
+    """Return the preferred available encoding the client accepts
+
+    The client's q-values win, ties are broken by the server `preference`
+    order. Returns None when nothing acceptable is available.
+    """
+    weights = {}
+    for part in accept_encoding.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        weight = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        if coding:
+            weights[coding] = weight
+
+    best, best_weight = None, 0.0
+    for coding in preference:
+        if coding not in COMPRESSORS:
+            continue
+        weight = weights.get(coding, weights.get('*', 0.0))
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+def content_type_allowed(content_type, allowed):
+    """Return True if the response media type is in the allowlist"""
+    media_type = content_type.split(';', 1)[0].strip().lower()
+    return any(
+        media_type.startswith(entry[:-1]) if entry.endswith('*')
+        else media_type == entry
+        for entry in allowed
+    )
+
+
+def compress_stream(compressor, chunks):
+    """Compress chunks as they arrive, flushing after each one"""
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """Compress responses with the best encoding the client accepts
+
+    Supports gzip, and brotli and zstd when their packages are installed.
+    Only media types listed in COMPRESSION_CONTENT_TYPES are compressed,
+    and buffered responses shorter than COMPRESSION_MIN_SIZE are left
+    alone. Streaming responses are compressed chunk by chunk, so exports
+    are never buffered in memory.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.min_size = settings.COMPRESSION_MIN_SIZE
+        self.content_types = tuple(settings.COMPRESSION_CONTENT_TYPES)
+        self.preference = tuple(settings.COMPRESSION_ENCODINGS)
+
+    async def __acall__(self, request):
+        # process_response never touches the database, so run it on the
+        # event loop instead of hopping to the shared sync thread.
+        response = await self.get_response(request)
+        return self.process_response(request, response)
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding') or \
+                response.status_code == 206:
+            return response
+        if not content_type_allowed(
+            response.get('Content-Type', ''), self.content_types
+        ):
+            return response
+        if not response.streaming and len(response.content) < self.min_size:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''), self.preference
+        )
+        if encoding is None:
+            return response
+
+        compressor = COMPRESSORS[encoding]()
+        if response.streaming:
+            response.streaming_content = compress_stream(
+                compressor, response.streaming_content
+            )
+            # The compressed size isn't known until the stream ends.
+            del response.headers['Content-Length']
+        else:
+            content = compressor.compress(response.content) + \
+                compressor.finish()
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response.headers['Content-Length'] = str(len(content))
+
+        # Weaken strong ETags as the representation changed, RFC 7232 2.1
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+
+def view_name(request):
+    """Return (dotted view path, action) of the view that served request"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None, None
+    func = match.func
+    view_class = getattr(func, 'cls', None)
+    if view_class is None:
+        return f'{func.__module__}.{func.__qualname__}', None
+    actions = getattr(func, 'actions', None) or {}
+    return (
+        f'{view_class.__module__}.{view_class.__qualname__}',
+        actions.get(request.method.lower()),
+    )
+
+
+class RequestTimingMiddleware(MiddlewareMixin):
+    """Measure wall, database and serializer time of every request
+
+    The timings are added as a Server-Timing header when
+    SERVER_TIMING_HEADER is set, and logged with the view and action on
+    the `core.middleware` logger, as fields of the record for structured
+    handlers. With N_PLUS_ONE_THRESHOLD set, requests running the same
+    query shape that many times are logged as warnings, or fail with
+    NPlusOneError when N_PLUS_ONE_RAISE is set. Requests under
+    METRICS_PATH_PREFIXES are also counted in core.metrics. Install it
+    first so the wall time covers the other middleware.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.header = settings.SERVER_TIMING_HEADER
+        self.threshold = settings.N_PLUS_ONE_THRESHOLD
+        self.raise_n_plus_one = settings.N_PLUS_ONE_RAISE
+        self.metrics_prefixes = tuple(settings.METRICS_PATH_PREFIXES)
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        instrumentation.install_all()
+        with instrumentation.measure_request(
+            record_shapes=self.threshold is not None
+        ) as metrics:
+            response = self.get_response(request)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        instrumentation.install_all()
+        with instrumentation.measure_request(
+            record_shapes=self.threshold is not None
+        ) as metrics:
+            response = await self.get_response(request)
+        return self.finish(request, response, metrics)
+
+    def finish(self, request, response, metrics):
+        elapsed = metrics.elapsed
+        serializer_time = metrics.timings['serializer']
+        view, action = view_name(request)
+        if self.header:
+            response.headers['Server-Timing'] = ', '.join((
+                f'total;dur={elapsed * 1000:.1f}',
+                f'db;dur={metrics.db_time * 1000:.1f};'
+                f'desc="{metrics.queries} queries"',
+                f'serializer;dur={serializer_time * 1000:.1f}',
+            ))
+        logger.info(
+            '%s %s %s %s%s %.1fms db=%.1fms/%dq serializer=%.1fms',
+            request.method, request.path, response.status_code,
+            view, f'.{action}' if action else '',
+            elapsed * 1000, metrics.db_time * 1000, metrics.queries,
+            serializer_time * 1000,
+            extra={
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'view': view,
+                'action': action,
+                'duration_ms': round(elapsed * 1000, 3),
+                'db_ms': round(metrics.db_time * 1000, 3),
+                'queries': metrics.queries,
+                'serializer_ms': round(serializer_time * 1000, 3),
+            },
+        )
+        if request.path.startswith(self.metrics_prefixes):
+            self.record_metrics(request, response, metrics, elapsed)
+        if self.threshold is not None:
+            self.check_n_plus_one(request, view, action, metrics)
+        return response
+
+    def record_metrics(self, request, response, metrics, elapsed):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match is not None else ''
+        app_metrics.HTTP_REQUESTS.inc(
+            view, request.method, response.status_code
+        )
+        app_metrics.HTTP_REQUEST_DURATION.observe(
+            elapsed, view, request.method
+        )
+        if metrics.queries:
+            app_metrics.DB_QUERIES.inc(view, amount=metrics.queries)
+            app_metrics.DB_QUERY_SECONDS.inc(view, amount=metrics.db_time)
+
+    def check_n_plus_one(self, request, view, action, metrics):
+        repeated = metrics.repeated_shapes(self.threshold)
+        if not repeated:
+            return
+        shape, count = repeated[0]
+        message = (
+            f'{request.method} {request.path} ({view}'
+            f'{f".{action}" if action else ""}) ran the same query '
+            f'{count} times: {shape}'
+        )
+        if self.raise_n_plus_one:
+            raise instrumentation.NPlusOneError(message)
+        logger.warning(message)
@@ -0,0 +1,29 @@
+from django.db import migrations
+
+# (index, table, column) for the admin's case insensitive prefix searches,
+# which filter on UPPER(column::text) LIKE 'TERM%'. Written as SQL since
+# Django 4.0 can't express an operator class on a functional index.
+INDEXES = (
+    ('core_user_email_upper', 'core_user', 'email'),
+    ('core_tag_name_upper', 'core_tag', 'name'),
+    ('core_ingredient_name_upper', 'core_ingredient', 'name'),
+    ('core_recipe_title_upper', 'core_recipe', 'title'),
+)
+
+
+class Migration(migrations.Migration):
+    # Large tables must stay writable while the indexes build.
+    atomic = False
+
+    dependencies = [
+        ('core', '0008_recipeimport'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{index}" '
+            f'ON "{table}" ((UPPER("{column}"::text)) text_pattern_ops)',
+            f'DROP INDEX CONCURRENTLY IF EXISTS "{index}"',
+        )
+        for index, table, column in INDEXES
+    ]
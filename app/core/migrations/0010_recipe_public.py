@@ -0,0 +1,23 @@
+# Generated by Django 4.0.10 on 2026-10-19 11:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='is_public',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='slug',
+            field=models.SlugField(blank=True, db_index=False, max_length=80, null=True),
+        ),
+    ]
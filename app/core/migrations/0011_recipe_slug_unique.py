@@ -0,0 +1,33 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # The recipe table must stay writable while the index builds.
+    atomic = False
+
+    dependencies = [
+        ('core', '0010_recipe_public'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    'CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS '
+                    '"core_recipe_slug_unique" ON "core_recipe" ("slug") '
+                    'WHERE "slug" IS NOT NULL',
+                    'DROP INDEX CONCURRENTLY IF EXISTS '
+                    '"core_recipe_slug_unique"',
+                ),
+            ],
+            state_operations=[
+                migrations.AddConstraint(
+                    model_name='recipe',
+                    constraint=models.UniqueConstraint(
+                        condition=models.Q(('slug__isnull', False)),
+                        fields=('slug',), name='core_recipe_slug_unique',
+                    ),
+                ),
+            ],
+        ),
+    ]
@@ -1,12 +1,20 @@
+import secrets
 import uuid
 import os
-from django.db import models
+from django.db import models, connections, transaction
+from django.utils.text import slugify
 from django.contrib.auth.models import (
     AbstractBaseUser, BaseUserManager, PermissionsMixin
 )
 from django.conf import settings
 
 
+def recipe_import_file_path(instance, filename):
+    """generate file path for an uploaded recipe import"""
+    ext = filename.split('.')[-1]
+    return os.path.join('uploads/imports/', f'{uuid.uuid4()}.{ext}')
+
+
 def recipe_image_file_path(instance, filename):
     """generate file path new recipe image"""
     ext = filename.split('.')[-1]
@@ -72,6 +80,70 @@ class Ingredient(models.Model):
         return self.name
 
 
+class RecipeManager(models.Manager):
+    def duplicate(self, user, recipe_ids):
+        """Copy recipes owned by user along with their tags and ingredients
+
+        Rows are copied server side with INSERT ... SELECT in a single
+        transaction, so nothing is loaded into Python. Ids may repeat to
+        make several copies, ids the user doesn't own are skipped. Copies
+        share the source image file. Returns (source id, copy id) pairs in
+        the order given.
+        """
+        opts = self.model._meta
+        connection = connections[self.db]
+        quote = connection.ops.quote_name
+        table = quote(opts.db_table)
+        fields = [field for field in opts.concrete_fields
+                  if not field.primary_key]
+        # Copies start private, without the source's public slug.
+        reset = {'is_public': 'FALSE', 'slug': 'NULL'}
+        copied = ', '.join(quote(field.column) for field in fields)
+        selected = ', '.join(
+            reset.get(field.name, f'source.{quote(field.column)}')
+            for field in fields
+        )
+
+        with transaction.atomic(using=self.db), connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT id FROM {table} WHERE user_id = %s AND id = ANY(%s)',
+                [user.pk, list(recipe_ids)],
+            )
+            owned = {row[0] for row in cursor.fetchall()}
+            sources = [pk for pk in recipe_ids if pk in owned]
+            if not sources:
+                return []
+
+            cursor.execute(
+                'SELECT nextval(pg_get_serial_sequence(%s, %s)) '
+                'FROM generate_series(1, %s)',
+                [opts.db_table, opts.pk.column, len(sources)],
+            )
+            copies = [row[0] for row in cursor.fetchall()]
+            mapping = (
+                'unnest(%s::bigint[], %s::bigint[]) AS copy(source_id, id)'
+            )
+            cursor.execute(
+                f'INSERT INTO {table} (id, {copied}) '
+                f'SELECT copy.id, {selected} FROM {table} source '
+                f'JOIN {mapping} ON source.id = copy.source_id',
+                [sources, copies],
+            )
+            for field in opts.many_to_many:
+                through = quote(field.remote_field.through._meta.db_table)
+                source_column = quote(field.m2m_column_name())
+                target_column = quote(field.m2m_reverse_name())
+                cursor.execute(
+                    f'INSERT INTO {through} '
+                    f'({source_column}, {target_column}) '
+                    f'SELECT copy.id, m2m.{target_column} FROM {through} m2m '
+                    f'JOIN {mapping} ON m2m.{source_column} = copy.source_id '
+                    f'ORDER BY m2m.id',
+                    [sources, copies],
+                )
+        return list(zip(sources, copies))
+
+
 class Recipe(models.Model):
     """Recipe Object"""
     user = models.ForeignKey(
@@ -85,6 +157,133 @@ class Recipe(models.Model):
     ingredients = models.ManyToManyField('Ingredient')
     tags = models.ManyToManyField('Tag')
     image = models.ImageField(null=True, upload_to=recipe_image_file_path)
+    is_public = models.BooleanField(default=False)
+    # Set when first published and kept, so republishing keeps the URL
+    slug = models.SlugField(max_length=80, null=True, blank=True,
+                            db_index=False)
+
+    objects = RecipeManager()
+
+    class Meta:
+        constraints = [
+            # Partial, only published recipes are in the index
+            models.UniqueConstraint(
+                fields=['slug'], condition=models.Q(slug__isnull=False),
+                name='core_recipe_slug_unique',
+            ),
+        ]
 
     def __str__(self):
         return self.title
+
+    def publish(self):
+        """Make the recipe readable by anyone at its slug"""
+        if not self.slug:
+            title = slugify(self.title)[:60].strip('-') or 'recipe'
+            self.slug = f'{title}-{secrets.token_hex(4)}'
+        self.is_public = True
+        self.save(update_fields=['is_public', 'slug'])
+
+    def unpublish(self):
+        self.is_public = False
+        self.save(update_fields=['is_public'])
+
+
+class RecipeSimilarity(models.Model):
+    """A recipe's neighbour by shared ingredients and tags
+
+    Rebuilt offline by core.recommendations, each recipe keeps its
+    RECOMMENDATIONS_TOP_K most similar recipes of the same library.
+    """
+    # Looked up through the unique constraint's index
+    recipe = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE, related_name='similarities',
+        db_index=False,
+    )
+    similar = models.ForeignKey(
+        Recipe, on_delete=models.CASCADE, related_name='+'
+    )
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'similar'],
+                name='core_recipesimilarity_unique',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id} ~ {self.similar_id} {self.score:.2f}'
+
+
+class AccountDeletion(models.Model):
+    """Background deletion of a user account and its recipe library"""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user_id = models.BigIntegerField(db_index=True)
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=PENDING
+    )
+    totals = models.JSONField(default=dict)
+    progress = models.JSONField(default=dict)
+    files_deleted = models.IntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.user_id} {self.status}'
+
+
+class RecipeImport(models.Model):
+    """Bulk import of recipes from an uploaded CSV or NDJSON file"""
+    CSV = 'csv'
+    NDJSON = 'ndjson'
+    FORMAT_CHOICES = (
+        (CSV, 'CSV'),
+        (NDJSON, 'Newline delimited JSON'),
+    )
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+    file = models.FileField(upload_to=recipe_import_file_path)
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=PENDING
+    )
+    # Records read and committed so far, an interrupted import resumes
+    # after them.
+    rows_processed = models.IntegerField(default=0)
+    recipes_created = models.IntegerField(default=0)
+    rows_failed = models.IntegerField(default=0)
+    errors = models.JSONField(default=list)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.user_id} {self.status}'
@@ -0,0 +1,147 @@
+"""Ranking a library by the share of each recipe's ingredients at hand
+
+    index = get_index(user.pk)
+    index.rank([flour.pk, eggs.pk])  # [(recipe id, have, needs), ...]
+
+Each process keeps, per user, an inverted index from ingredient id to a
+bitmap of the recipes using it, a Python int with bit i set for the
+i-th recipe. Ranking adds up the bitmaps of the pantry's ingredients as
+a bit-sliced counter, one int per bit of the count, so the number of
+ingredients each recipe has at hand is found with a few whole-library
+operations per pantry ingredient rather than a query or a loop over
+recipes.
+
+Indexes are rebuilt, with one query, when the user's version in the
+'shared' cache changed. `invalidate_pantry` drops the version whenever a
+library's recipe ingredients may have changed, so every worker rebuilds
+on its next ranking. It is called by the code writing recipes and their
+relations rather than from m2m_changed, whose receivers cost a query
+per relation added.
+"""
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from core.caching import LRUCache
+from core.models import Recipe
+
+_indexes = LRUCache(settings.PANTRY_INDEX_SIZE, settings.PANTRY_INDEX_TTL)
+
+
+def _version_key(user_id):
+    return f'pantry:{user_id}'
+
+
+class PantryIndex:
+    """Bitmaps of the recipes using each ingredient of a library"""
+
+    def __init__(self, version, rows):
+        """Index (recipe id, ingredient id) rows"""
+        self.version = version
+        self.recipe_ids = []
+        self.sizes = []
+        positions = {}
+        postings = defaultdict(list)
+        for recipe_id, ingredient_id in rows:
+            position = positions.get(recipe_id)
+            if position is None:
+                position = positions[recipe_id] = len(self.recipe_ids)
+                self.recipe_ids.append(recipe_id)
+                self.sizes.append(0)
+            self.sizes[position] += 1
+            postings[ingredient_id].append(position)
+
+        self.length = (len(self.recipe_ids) + 7) // 8
+        self.bitmaps = {}
+        for ingredient_id, recipe_positions in postings.items():
+            bits = bytearray(self.length)
+            for position in recipe_positions:
+                bits[position >> 3] |= 1 << (position & 7)
+            self.bitmaps[ingredient_id] = int.from_bytes(bits, 'little')
+
+    def rank(self, ingredient_ids):
+        """Return (recipe id, have, needs) for recipes using ingredient_ids
+
+        The best covered come first, ties go to the recipe having more of
+        the ingredients, then to the newest.
+        """
+        # planes[k] holds bit k of each recipe's count
+        planes = []
+        for ingredient_id in set(ingredient_ids):
+            carry = self.bitmaps.get(ingredient_id, 0)
+            level = 0
+            while carry:
+                if level == len(planes):
+                    planes.append(carry)
+                    break
+                plane = planes[level]
+                planes[level] = plane ^ carry
+                carry &= plane
+                level += 1
+        if not planes:
+            return []
+
+        found = 0
+        for plane in planes:
+            found |= plane
+        found = found.to_bytes(self.length, 'little')
+        planes = [plane.to_bytes(self.length, 'little') for plane in planes]
+        ranked = []
+        for offset, byte in enumerate(found):
+            if not byte:
+                continue
+            for bit in range(8):
+                if byte >> bit & 1:
+                    have = 0
+                    for level, plane in enumerate(planes):
+                        have |= (plane[offset] >> bit & 1) << level
+                    position = offset * 8 + bit
+                    ranked.append((
+                        self.recipe_ids[position], have, self.sizes[position]
+                    ))
+        ranked.sort(
+            key=lambda item: (-item[1] / item[2], -item[1], -item[0])
+        )
+        return ranked
+
+
+def build_index(user_id, version):
+    rows = Recipe.ingredients.through.objects.filter(
+        recipe__user_id=user_id
+    ).order_by().values_list('recipe_id', 'ingredient_id')
+    return PantryIndex(version, rows.iterator())
+
+
+def get_index(user_id):
+    """Return the current PantryIndex of a user's library"""
+    cache = caches['shared']
+    # Read before the rows, a change committed after the read bumps it.
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        version = uuid.uuid4().hex
+        if not cache.add(_version_key(user_id), version, None):
+            version = cache.get(_version_key(user_id), version)
+    index = _indexes.get(user_id)
+    if getattr(index, 'version', None) != version:
+        index = build_index(user_id, version)
+        _indexes.set(user_id, index)
+    return index
+
+
+def invalidate_pantry(*user_ids):
+    """Make workers rebuild the users' indexes, now and on commit"""
+    keys = [_version_key(user_id) for user_id in set(user_ids)]
+    if not keys:
+        return
+    for user_id in user_ids:
+        _indexes.delete(user_id)
+    caches['shared'].delete_many(keys)
+    transaction.on_commit(lambda: caches['shared'].delete_many(keys))
+
+
+def clear_indexes():
+    """Empty this process's indexes, for tests"""
+    _indexes.clear()
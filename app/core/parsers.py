@@ -0,0 +1,41 @@
+import io
+
+from django.conf import settings
+from rest_framework.parsers import JSONParser
+
+from core.renderers import FastJSONRenderer, orjson
+
+# orjson decodes integers wider than 64 bits as floats, so bodies holding
+# long digit runs are left to the stdlib parser. Folding every digit to
+# zero and searching for a run is much cheaper than a regex scan.
+DIGITS_TO_ZERO = bytes.maketrans(b'123456789', b'000000000')
+LONG_NUMBER = b'0' * 19
+UTF8 = ('utf-8', 'utf8')
+
+
+class FastJSONParser(JSONParser):
+    """JSON parser using orjson when it is installed
+
+    Falls back to DRF's JSONParser for non utf-8 bodies, non strict
+    parsing, or bodies with numbers orjson can't decode losslessly.
+    """
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """Parse the incoming bytestream as JSON and return the data"""
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+
+        if orjson is None or not self.strict or encoding.lower() not in UTF8:
+            return super().parse(stream, media_type, parser_context)
+
+        body = stream.read()
+        if LONG_NUMBER not in body.translate(DIGITS_TO_ZERO):
+            try:
+                return orjson.loads(body)
+            except orjson.JSONDecodeError:
+                pass
+
+        # Let the stdlib parser handle the body, and word any error the
+        # same way DRF does.
+        return super().parse(io.BytesIO(body), media_type, parser_context)
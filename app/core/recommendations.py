@@ -0,0 +1,92 @@
+"""Precomputed similar recipes
+
+A recipe is described by the set of its ingredients and tags, and two
+recipes are as similar as the Jaccard index of their sets: the features
+they share over the features either has. Tags and ingredients belong to
+one user, so only recipes of the same library can share any.
+
+`build_recommendations` scores a library at once from an inverted index,
+feature to the recipes having it. Each recipe only meets the recipes it
+shares a feature with, counted while walking its features' lists, and
+keeps the RECOMMENDATIONS_TOP_K best in RecipeSimilarity. Reading the
+neighbours of a recipe is then one indexed lookup of K rows. Features
+found on more than RECOMMENDATIONS_MAX_POSTINGS recipes, such as a tag
+on every recipe, say little and would make the walk quadratic, so they
+only count towards the size of the sets.
+
+The scores go stale as recipes change until the next build, run by the
+build_recommendations command, for example nightly.
+"""
+import heapq
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+
+from core.models import Recipe, RecipeSimilarity
+
+
+def library_features(user_id):
+    """Return {recipe id: set of features} for a user's recipes"""
+    features = {
+        recipe_id: set() for recipe_id in
+        Recipe.objects.filter(user_id=user_id).values_list('id', flat=True)
+    }
+    relations = (
+        ('ingredient', Recipe.ingredients.through, 'ingredient_id'),
+        ('tag', Recipe.tags.through, 'tag_id'),
+    )
+    for kind, through, column in relations:
+        pairs = through.objects.filter(
+            recipe__user_id=user_id
+        ).values_list('recipe_id', column)
+        for recipe_id, related_id in pairs:
+            features[recipe_id].add((kind, related_id))
+    return features
+
+
+def similar_recipes(features, top_k, max_postings=None):
+    """Return {recipe id: [(score, similar id), ...]}, best first
+
+    features maps recipe ids to sets of hashable features. Recipes with
+    no shared feature are never compared and get no neighbours.
+    """
+    postings = defaultdict(list)
+    for recipe_id, recipe_features in features.items():
+        for feature in recipe_features:
+            postings[feature].append(recipe_id)
+
+    neighbours = {}
+    for recipe_id, recipe_features in features.items():
+        shared = Counter()
+        for feature in recipe_features:
+            recipes = postings[feature]
+            if max_postings is None or len(recipes) <= max_postings:
+                shared.update(recipes)
+        shared.pop(recipe_id, None)
+        size = len(recipe_features)
+        neighbours[recipe_id] = heapq.nlargest(top_k, (
+            (count / (size + len(features[other]) - count), other)
+            for other, count in shared.items()
+        ))
+    return neighbours
+
+
+def build_recommendations(user_id):
+    """Replace the similar recipes of a user's library, return the count"""
+    neighbours = similar_recipes(
+        library_features(user_id),
+        settings.RECOMMENDATIONS_TOP_K,
+        settings.RECOMMENDATIONS_MAX_POSTINGS,
+    )
+    similarities = [
+        RecipeSimilarity(recipe_id=recipe_id, similar_id=other, score=score)
+        for recipe_id, scored in neighbours.items()
+        for score, other in scored
+    ]
+    with transaction.atomic():
+        RecipeSimilarity.objects.filter(recipe__user_id=user_id).delete()
+        RecipeSimilarity.objects.bulk_create(
+            similarities, batch_size=settings.RECOMMENDATIONS_BATCH_SIZE
+        )
+    return len(similarities)
@@ -0,0 +1,67 @@
+import decimal
+import math
+
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _has_non_finite(data):
+    """Return whether data holds a NaN or infinite float or decimal"""
+    stack = [data]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+        elif isinstance(value, float):
+            if not math.isfinite(value):
+                return True
+        elif isinstance(value, decimal.Decimal):
+            if not value.is_finite():
+                return True
+    return False
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSON renderer using orjson when it is installed
+
+    Output is byte compatible with DRF's JSONRenderer for compact, non
+    indented responses, datetimes included: like DRF's encoder, orjson keeps
+    their microseconds and writes UTC as Z. Types orjson can't encode
+    natively go through the DRF encoder's `default`, while anything orjson
+    rejects outright (eg. integers wider than 64 bits) falls back to the
+    stdlib renderer, as does pretty printing for the browsable API. orjson
+    writes NaN and infinite floats as null, output holding a null is
+    checked for them and rendered by DRF, which refuses them.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Render `data` into JSON, returning a bytestring"""
+        if data is None:
+            return b''
+
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if orjson is None or indent or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=orjson.OPT_UTC_Z,
+            )
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        if b'null' in ret and _has_non_finite(data):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Like DRF, escape U+2028 and U+2029 so the output stays a strict
+        # javascript subset.
+        return ret.replace(
+            b'\xe2\x80\xa8', b'\\u2028'
+        ).replace(b'\xe2\x80\xa9', b'\\u2029')
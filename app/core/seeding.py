@@ -0,0 +1,30 @@
+"""Sample names for seeding development and benchmark data
+
+    names(TAG_NAMES, 45)  # ['Vegan', ..., 'Slow cooker', 'Vegan 2', ...]
+
+Shared by the seed_data command and benchmarks.datagen.
+"""
+TAG_NAMES = (
+    'Vegan', 'Vegetarian', 'Dessert', 'Breakfast', 'Dinner', 'Lunch',
+    'Quick', 'Spicy', 'Gluten free', 'Comfort food', 'Baking', 'Salad',
+    'Soup', 'Grill', 'Seafood', 'Party', 'Healthy', 'Kids', 'Budget',
+    'Slow cooker',
+)
+INGREDIENT_NAMES = (
+    'Salt', 'Olive oil', 'Garlic', 'Onion', 'Butter', 'Flour', 'Sugar',
+    'Egg', 'Milk', 'Black pepper', 'Lemon', 'Tomato', 'Rice', 'Potato',
+    'Carrot', 'Chicken', 'Beef', 'Cheese', 'Basil', 'Parsley', 'Ginger',
+    'Chili', 'Cumin', 'Paprika', 'Honey', 'Cream', 'Yogurt', 'Spinach',
+    'Mushroom', 'Bell pepper', 'Cinnamon', 'Vanilla', 'Chickpeas',
+    'Lentils', 'Coconut milk', 'Soy sauce', 'Salmon', 'Shrimp', 'Pasta',
+    'Bread',
+)
+
+
+def names(base, count):
+    """Return `count` distinct names, numbering repeats of base"""
+    return [
+        base[i % len(base)] +
+        (f' {i // len(base) + 1}' if i >= len(base) else '')
+        for i in range(count)
+    ]
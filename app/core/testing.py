@@ -0,0 +1,106 @@
+"""Query count budgets for tests
+
+    with query_budget(queries=3, rows=40):
+        client.get(url)
+
+    @query_budget(queries=1)
+    def test_profile(user_client): ...
+
+`query_budget` fails when the block runs more queries, or fetches more
+rows, than allowed. `assert_queries_constant` runs the same request
+against several data sizes and fails when the query count grows with
+them, the signature of an N+1.
+"""
+from contextlib import ContextDecorator
+
+from django.db import connection
+
+from core.instrumentation import query_shape
+
+
+class QueryRecorder:
+    """Connection execute wrapper keeping (sql, rows fetched) per query"""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        result = execute(sql, params, many, context)
+        cursor = context['cursor']
+        rows = cursor.rowcount if cursor.description is not None else 0
+        self.queries.append((sql, max(rows, 0)))
+        return result
+
+    @property
+    def rows(self):
+        return sum(rows for _, rows in self.queries)
+
+    def describe(self):
+        return '\n'.join(
+            f'  {index}. [{rows} rows] {sql}'
+            for index, (sql, rows) in enumerate(self.queries, 1)
+        )
+
+
+class query_budget(ContextDecorator):
+    """Fail unless the block stays within `queries` and `rows` fetched"""
+
+    def __init__(self, queries, rows=None):
+        self.max_queries = queries
+        self.max_rows = rows
+
+    def __enter__(self):
+        self.recorder = QueryRecorder()
+        self._wrapper = connection.execute_wrapper(self.recorder)
+        self._wrapper.__enter__()
+        return self.recorder
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._wrapper.__exit__(exc_type, exc_value, traceback)
+        if exc_type is not None:
+            return False
+        recorder = self.recorder
+        if len(recorder.queries) > self.max_queries:
+            raise AssertionError(
+                f'{len(recorder.queries)} queries run, budget is '
+                f'{self.max_queries}:\n{recorder.describe()}'
+            )
+        if self.max_rows is not None and recorder.rows > self.max_rows:
+            raise AssertionError(
+                f'{recorder.rows} rows fetched, budget is '
+                f'{self.max_rows}:\n{recorder.describe()}'
+            )
+        return False
+
+
+def assert_queries_constant(setup, request, sizes=(1, 5, 20)):
+    """Fail when request's query count depends on the data size
+
+    setup(size) creates the data and returns what request(data) needs.
+    Returns the recorders by size, for further assertions.
+    """
+    recorders = {}
+    for size in sizes:
+        data = setup(size)
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            request(data)
+        recorders[size] = recorder
+
+    counts = {size: len(recorder.queries) for size, recorder in
+              recorders.items()}
+    if len(set(counts.values())) > 1:
+        largest = recorders[max(sizes)]
+        shapes = {}
+        for sql, _ in largest.queries:
+            shape = query_shape(sql)
+            shapes[shape] = shapes.get(shape, 0) + 1
+        repeated = '\n'.join(
+            f'  {count} x {shape}' for shape, count in shapes.items()
+            if count > 1
+        )
+        raise AssertionError(
+            f'query count grows with the data size {counts}, repeated '
+            f'queries at size {max(sizes)}:\n{repeated}'
+        )
+    return recorders
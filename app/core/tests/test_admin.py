@@ -1,8 +1,15 @@
+from unittest.mock import patch
+
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.urls import reverse
 
 import pytest
-from pytest_django.asserts import assertContains
+from pytest_django.asserts import assertContains, assertNotContains
+
+from core import models
+from core.admin import EstimatedCountPaginator, estimated_count
+from core.testing import assert_queries_constant
 
 
 @pytest.fixture
@@ -38,3 +45,105 @@ class TestAdminSite:
         url = reverse('admin:core_user_add')
         res = admin_client.get(url)
         assert res.status_code == 200
+
+
+def sample_tags(user, count):
+    return models.Tag.objects.bulk_create(
+        models.Tag(user=user, name=f'Tag {i}') for i in range(count)
+    )
+
+
+class TestLargeTableAdmin:
+
+    @pytest.mark.django_db
+    def test_changelist_queries_constant(self, admin_client):
+        """Test listing recipes doesn't look up each recipe's user"""
+        def setup(size):
+            for i in range(size):
+                owner = get_user_model().objects.create_user(
+                    email=f'owner{size}-{i}@fake.com', password='pass'
+                )
+                models.Recipe.objects.create(
+                    user=owner, title='Toast', time_minutes=5, price=1
+                )
+
+        assert_queries_constant(
+            setup,
+            lambda _: admin_client.get(
+                reverse('admin:core_recipe_changelist')
+            ),
+            sizes=(1, 10),
+        )
+
+    @pytest.mark.django_db
+    def test_unfiltered_count_estimated(self, admin_client, user, settings):
+        """Test large tables are counted from the planner's estimate"""
+        settings.ADMIN_ESTIMATED_COUNT_MIN = 1000
+        sample_tags(user, 3)
+
+        with patch('core.admin.estimated_count', return_value=250000):
+            res = admin_client.get(reverse('admin:core_tag_changelist'))
+
+        assert res.context['cl'].result_count == 250000
+        assert res.context['cl'].full_result_count is None
+
+    @pytest.mark.django_db
+    def test_small_table_counted(self, user, settings):
+        """Test tables estimated small are counted exactly"""
+        sample_tags(user, 3)
+
+        paginator = EstimatedCountPaginator(
+            models.Tag.objects.order_by('id'), 10
+        )
+
+        assert paginator.count == 3
+
+    @pytest.mark.django_db
+    def test_filtered_count_limited(self, user, settings):
+        """Test filtered lists are only counted up to the limit"""
+        settings.ADMIN_COUNT_LIMIT = 5
+        sample_tags(user, 8)
+
+        paginator = EstimatedCountPaginator(
+            models.Tag.objects.filter(user=user).order_by('id'), 2
+        )
+
+        assert paginator.count == 5
+
+    @pytest.mark.django_db
+    def test_estimated_count(self, user):
+        """Test the estimate comes from the table's statistics"""
+        sample_tags(user, 4)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE core_tag')
+
+        assert estimated_count(models.Tag) == 4
+
+    @pytest.mark.django_db
+    def test_prefix_search(self, admin_client, user):
+        """Test searching names by prefix"""
+        models.Tag.objects.create(user=user, name='Vegan')
+        models.Tag.objects.create(user=user, name='Not vegan')
+
+        res = admin_client.get(
+            reverse('admin:core_tag_changelist'), {'q': 'veg'}
+        )
+
+        assert [tag.name for tag in res.context['cl'].result_list] == \
+            ['Vegan']
+
+    @pytest.mark.django_db
+    def test_recipe_form_uses_autocomplete(self, admin_client, user):
+        """Test the recipe form doesn't list every tag and ingredient"""
+        sample_tags(user, 5)
+        recipe = models.Recipe.objects.create(
+            user=user, title='Toast', time_minutes=5, price=1
+        )
+
+        res = admin_client.get(
+            reverse('admin:core_recipe_change', args=[recipe.id])
+        )
+
+        assert res.status_code == 200
+        assertContains(res, 'admin-autocomplete')
+        assertNotContains(res, 'Tag 0')
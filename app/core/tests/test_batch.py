@@ -0,0 +1,165 @@
+import re
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+import pytest
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import batch
+from core.models import Recipe, Tag, Ingredient
+
+BATCH_URL = reverse('batch')
+QUERIES = re.compile(r'desc="(\d+) queries"')
+SCREEN = [
+    {'path': '/api/user/me/'},
+    {'path': '/api/recipe/tags/'},
+    {'path': '/api/recipe/ingredients/'},
+    {'path': '/api/recipe/recipies/?tags=1'},
+]
+
+
+@pytest.fixture
+def user():
+    user = get_user_model().objects.create_user(
+        email='test@user.com', password='testpass', name='Test',
+    )
+    Tag.objects.create(user=user, name='Breakfast')
+    Ingredient.objects.create(user=user, name='Bread')
+    Recipe.objects.create(
+        user=user, title='Toast', time_minutes=5, price=1,
+    )
+    return user
+
+
+@pytest.fixture
+def user_api_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+def separately(client, requests):
+    """Return the responses of the requests sent one by one"""
+    return [
+        {'status': res.status_code, 'body': res.json()}
+        for res in (client.get(request['path']) for request in requests)
+    ]
+
+
+class TestBatch:
+
+    @pytest.mark.django_db
+    def test_auth_required(self):
+        """Test batches need an authenticated user"""
+        res = APIClient().post(BATCH_URL, {'requests': SCREEN}, format='json')
+
+        assert res.status_code == status.HTTP_401_UNAUTHORIZED
+
+    @pytest.mark.django_db
+    def test_batch(self, user_api_client):
+        """Test a batch returns what the requests return one by one"""
+        res = user_api_client.post(
+            BATCH_URL, {'requests': SCREEN}, format='json'
+        )
+
+        assert res.status_code == status.HTTP_200_OK
+        assert res.json()['responses'] == separately(user_api_client, SCREEN)
+
+    @pytest.mark.django_db
+    def test_writes_in_order(self, user_api_client):
+        """Test later requests see the writes of earlier ones"""
+        requests = [
+            {'method': 'POST', 'path': '/api/recipe/tags/',
+             'body': {'name': 'Lunch'}},
+            {'path': '/api/recipe/tags/'},
+        ]
+
+        res = user_api_client.post(
+            BATCH_URL, {'requests': requests, 'parallel': True},
+            format='json',
+        )
+
+        created, listed = res.json()['responses']
+        assert created['status'] == status.HTTP_201_CREATED
+        assert created['body']['name'] == 'Lunch'
+        assert 'Lunch' in [tag['name'] for tag in listed['body']]
+
+    @pytest.mark.django_db
+    def test_sub_request_errors(self, user_api_client):
+        """Test failing sub-requests report their own status"""
+        requests = [
+            {'path': '/api/recipe/nothing/'},
+            {'method': 'POST', 'path': '/api/recipe/tags/', 'body': {}},
+        ]
+
+        res = user_api_client.post(
+            BATCH_URL, {'requests': requests}, format='json'
+        )
+
+        missing, invalid = res.json()['responses']
+        assert missing['status'] == status.HTTP_404_NOT_FOUND
+        assert invalid['status'] == status.HTTP_400_BAD_REQUEST
+        assert 'name' in invalid['body']
+
+    @pytest.mark.django_db
+    def test_path_allowlist(self, user_api_client):
+        """Test only API paths can be batched"""
+        requests = [{'path': '/metrics'}]
+
+        res = user_api_client.post(
+            BATCH_URL, {'requests': requests}, format='json'
+        )
+
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+
+    @pytest.mark.django_db
+    def test_max_requests(self, settings, user_api_client):
+        """Test batches are limited to BATCH_MAX_REQUESTS"""
+        settings.BATCH_MAX_REQUESTS = 3
+
+        res = user_api_client.post(
+            BATCH_URL, {'requests': SCREEN}, format='json'
+        )
+
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+
+    @pytest.mark.django_db
+    def test_parallel_skipped_in_transaction(self, user_api_client):
+        """Test reads stay on the request's connection in a transaction"""
+        with patch('core.batch._get_executor') as executor:
+            res = user_api_client.post(
+                BATCH_URL, {'requests': SCREEN, 'parallel': True},
+                format='json',
+            )
+
+        executor.assert_not_called()
+        assert res.json()['responses'] == separately(user_api_client, SCREEN)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_parallel(self, user_api_client):
+        """Test consecutive reads may run on the thread pool"""
+        with patch('core.batch._dispatch_in_pool',
+                   wraps=batch._dispatch_in_pool) as dispatch:
+            res = user_api_client.post(
+                BATCH_URL, {'requests': SCREEN, 'parallel': True},
+                format='json',
+            )
+
+        assert dispatch.call_count == len(SCREEN)
+        assert res.json()['responses'] == separately(user_api_client, SCREEN)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_parallel_queries_counted(self, user_api_client):
+        """Test the queries of reads run on the pool count for the batch"""
+        def queries(parallel):
+            res = user_api_client.post(
+                BATCH_URL, {'requests': SCREEN, 'parallel': parallel},
+                format='json',
+            )
+            return int(QUERIES.search(res['Server-Timing']).group(1))
+
+        assert queries(parallel=True) == queries(parallel=False) > 0
@@ -0,0 +1,107 @@
+import time
+from unittest.mock import call, patch
+
+from django.core.cache import cache, caches
+
+from core.cache_backends import TwoTierCache
+
+
+class TestTwoTierCache:
+
+    def test_default_cache(self):
+        """Test the default cache is two tier"""
+        assert isinstance(caches['default'], TwoTierCache)
+
+    def test_set_writes_both_tiers(self):
+        """Test values are written to the local and shared caches"""
+        cache.set('recipe', {'title': 'Toast'})
+
+        assert caches['local'].get('recipe') == {'title': 'Toast'}
+        assert caches['shared'].get('recipe') == {'title': 'Toast'}
+        assert cache.get('recipe') == {'title': 'Toast'}
+
+    def test_shared_hit_copied_locally(self):
+        """Test a value set by another process is kept locally once read"""
+        caches['shared'].set('recipe', 'Toast')
+
+        assert cache.get('recipe') == 'Toast'
+        assert caches['local'].get('recipe') == 'Toast'
+
+    def test_miss(self):
+        """Test a key missing from both tiers returns the default"""
+        assert cache.get('recipe', 'none') == 'none'
+        assert cache.get('recipe') is None
+
+    def test_local_copy_expires(self):
+        """Test changes by other processes are seen after LOCAL_TIMEOUT"""
+        cache.set('recipe', 'Toast')
+        caches['shared'].set('recipe', 'Bagel')
+        assert cache.get('recipe') == 'Toast'
+
+        later = time.time() + 10
+        with patch('time.time', return_value=later):
+            assert cache.get('recipe') == 'Bagel'
+
+    def test_local_timeout_capped(self):
+        """Test entries without expiry are still dropped locally"""
+        cache.set('recipe', 'Toast', timeout=None)
+
+        later = time.time() + 10
+        with patch('time.time', return_value=later):
+            assert caches['local'].get('recipe') is None
+            assert caches['shared'].get('recipe') == 'Toast'
+
+    def test_add_decided_by_shared(self):
+        """Test add fails when another process holds the key"""
+        caches['shared'].set('lock', 'other')
+
+        assert not cache.add('lock', 'mine')
+        assert cache.add('other-lock', 'mine')
+        assert caches['shared'].get('other-lock') == 'mine'
+
+    def test_incr(self):
+        """Test counters are kept in the shared cache"""
+        cache.set('count', 1)
+
+        assert cache.incr('count', 2) == 3
+        assert cache.decr('count') == 2
+        assert cache.get('count') == 2
+
+    def test_get_many(self):
+        """Test keys are looked up locally, then in the shared cache"""
+        cache.set('a', 1)
+        caches['shared'].set('b', 2)
+
+        assert cache.get_many(['a', 'b', 'c']) == {'a': 1, 'b': 2}
+        assert caches['local'].get('b') == 2
+
+    def test_delete(self):
+        """Test deletes remove the key from both tiers"""
+        cache.set_many({'a': 1, 'b': 2})
+
+        cache.delete('a')
+        cache.delete_many(['b'])
+
+        assert cache.get('a') is None
+        assert caches['shared'].get('b') is None
+        assert caches['local'].get('b') is None
+
+    def test_versions(self):
+        """Test entries of another cache version are not read"""
+        cache.set('recipe', 'Toast')
+
+        assert cache.get('recipe', version=2) is None
+        cache.set('recipe', 'Bagel', version=2)
+        assert cache.get('recipe') == 'Toast'
+
+    def test_hits_recorded(self):
+        """Test lookups are counted per tier"""
+        caches['shared'].set('recipe', 'Toast')
+
+        with patch('core.cache_backends.metrics.record_cache_access') as rec:
+            cache.get('recipe')
+            cache.get('recipe')
+
+        assert rec.call_args_list == [
+            call('local', False), call('shared', True), call('local', True),
+        ]
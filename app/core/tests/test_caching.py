@@ -0,0 +1,174 @@
+import time
+from unittest.mock import Mock, call, patch
+
+from django.core.cache import caches
+
+import pytest
+
+from core.caching import _MISSING, HotCache, LRUCache
+
+
+@pytest.fixture
+def hot_cache():
+    return HotCache('test', ttl=60, stale_ttl=30, poll_interval=0)
+
+
+def stored(hot_cache, key):
+    return caches['shared'].get(hot_cache._key(key))
+
+
+class TestLRUCache:
+
+    def test_bounded(self):
+        """Test the least recently used value is dropped first"""
+        lru = LRUCache(size=2, ttl=60)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+
+        assert lru.get('a') == 1
+        assert lru.get('c') == 3
+        assert lru.get('b') is _MISSING
+
+    def test_expiry(self):
+        """Test values are dropped after ttl seconds"""
+        lru = LRUCache(size=2, ttl=1)
+        lru.set('a', 1)
+
+        later = time.monotonic() + 2
+        with patch('time.monotonic', return_value=later):
+            assert lru.get('a') is _MISSING
+
+
+class TestHotCache:
+
+    def test_computed_once(self, hot_cache):
+        """Test values are computed on a miss, then served from cache"""
+        compute = Mock(return_value='Toast')
+
+        assert hot_cache.get(1, compute) == 'Toast'
+        assert hot_cache.get(1, compute) == 'Toast'
+
+        compute.assert_called_once()
+        assert stored(hot_cache, 1)[0] == 'Toast'
+
+    def test_shared_hit(self, hot_cache):
+        """Test values computed by another process are not computed again"""
+        hot_cache.get(1, lambda: 'Toast')
+        hot_cache.local.clear()
+        compute = Mock()
+
+        assert hot_cache.get(1, compute) == 'Toast'
+        compute.assert_not_called()
+
+    def test_invalidate(self, hot_cache):
+        """Test invalidated values are computed again"""
+        hot_cache.get(1, lambda: 'Toast')
+
+        hot_cache.invalidate(1)
+
+        assert stored(hot_cache, 1) is None
+        assert hot_cache.get(1, lambda: 'Bagel') == 'Bagel'
+
+    def test_invalidated_while_computing(self, hot_cache):
+        """Test a value computed before an invalidation isn't kept"""
+        def compute_stale():
+            # The change commits and invalidates while this computes.
+            hot_cache.invalidate(1)
+            return 'Toast'
+
+        assert hot_cache.get(1, compute_stale) == 'Toast'
+
+        assert stored(hot_cache, 1) is None
+        assert hot_cache.get(1, lambda: 'Bagel') == 'Bagel'
+        assert stored(hot_cache, 1)[0] == 'Bagel'
+
+    def test_invalidated_while_storing(self, hot_cache):
+        """Test an invalidation racing the store drops the value"""
+        cache = caches['shared']
+        set_value = cache.set
+
+        def set_after_invalidation(*args, **kwargs):
+            hot_cache.invalidate(1)
+            set_value(*args, **kwargs)
+
+        with patch.object(cache, 'set', set_after_invalidation):
+            hot_cache.get(1, lambda: 'Toast')
+
+        assert stored(hot_cache, 1) is None
+        assert hot_cache.get(1, lambda: 'Bagel') == 'Bagel'
+
+    def test_waits_for_other_worker(self, hot_cache):
+        """Test a miss waits for the worker holding the lock"""
+        caches['shared'].add(hot_cache._lock_key(1), 'other')
+        compute = Mock()
+
+        def other_worker_done(seconds):
+            caches['shared'].set(hot_cache._key(1), ('Toast', 0.1, 0))
+
+        with patch('core.caching.time.sleep', side_effect=other_worker_done):
+            assert hot_cache.get(1, compute) == 'Toast'
+        compute.assert_not_called()
+
+    def test_other_worker_failed(self, hot_cache):
+        """Test waiters compute the value when the lock holder gives up"""
+        caches['shared'].add(hot_cache._lock_key(1), 'other')
+
+        def other_worker_failed(seconds):
+            caches['shared'].delete(hot_cache._lock_key(1))
+
+        with patch('core.caching.time.sleep',
+                   side_effect=other_worker_failed):
+            assert hot_cache.get(1, lambda: 'Toast') == 'Toast'
+
+    def test_error_releases_lock(self, hot_cache):
+        """Test a failed computation lets the next read try again"""
+        with pytest.raises(ValueError):
+            hot_cache.get(1, Mock(side_effect=ValueError))
+
+        assert caches['shared'].get(hot_cache._lock_key(1)) is None
+        assert hot_cache.get(1, lambda: 'Toast') == 'Toast'
+
+    def test_early_refresh(self, hot_cache):
+        """Test values may be refreshed before they expire"""
+        expires = time.time() + 1
+        caches['shared'].set(hot_cache._key(1), ('Toast', 10, expires))
+
+        with patch('core.caching.random.random', return_value=0.999):
+            assert hot_cache.get(1, lambda: 'Bagel') == 'Bagel'
+        assert stored(hot_cache, 1)[0] == 'Bagel'
+
+    def test_no_early_refresh(self, hot_cache):
+        """Test values far from expiry are served as they are"""
+        expires = time.time() + 60
+        caches['shared'].set(hot_cache._key(1), ('Toast', 0.01, expires))
+
+        with patch('core.caching.random.random', return_value=0.5):
+            assert hot_cache.get(1, Mock()) == 'Toast'
+
+    def test_stale_refreshed_in_background(self, settings, hot_cache):
+        """Test expired values are served while a job refreshes them"""
+        settings.JOBS_ALWAYS_EAGER = True
+        caches['shared'].set(hot_cache._key(1), ('Toast', 0.01, 0))
+
+        assert hot_cache.get(1, lambda: 'Bagel') == 'Toast'
+        assert stored(hot_cache, 1)[0] == 'Bagel'
+        assert caches['shared'].get(hot_cache._lock_key(1)) is None
+
+    def test_stale_refreshed_once(self, hot_cache):
+        """Test only the lock holder refreshes an expired value"""
+        caches['shared'].set(hot_cache._key(1), ('Toast', 0.01, 0))
+        caches['shared'].add(hot_cache._lock_key(1), 'other')
+
+        with patch('core.caching.enqueue') as enqueue:
+            assert hot_cache.get(1, Mock()) == 'Toast'
+        enqueue.assert_not_called()
+
+    def test_hits_recorded(self, hot_cache):
+        """Test lookups are counted under the cache name"""
+        with patch('core.caching.metrics.record_cache_access') as rec:
+            hot_cache.get(1, lambda: 'Toast')
+            hot_cache.get(1, lambda: 'Toast')
+
+        assert rec.call_args_list == [call('test', False), call('test', True)]
@@ -1,7 +1,15 @@
+from io import StringIO
 from unittest.mock import patch
+
+import pytest
+
+from django.contrib.auth import authenticate, get_user_model
 from django.core.management import call_command
+from django.core.management.base import CommandError
 from django.db.utils import OperationalError
 
+from core.models import Recipe, Tag, Ingredient
+
 
 class TestCommands:
 
@@ -19,3 +27,87 @@ class TestCommands:
             gi.side_effect = [OperationalError] * 5 + [True]
             call_command('wait_for_db')
             assert gi.call_count == 6
+
+
+def seed(**options):
+    """Run seed_data quietly with small defaults"""
+    options = {'users': 3, 'recipes': 4, 'tags': 5, 'ingredients': 6,
+               'workers': 1, 'shard_size': 2, **options}
+    call_command('seed_data', stdout=StringIO(), **options)
+    return get_user_model().objects.filter(
+        email__startswith=options.get('prefix', 'seed')
+    ).order_by('email')
+
+
+class TestSeedData:
+
+    @pytest.mark.django_db
+    def test_seed_data(self):
+        """Test users get their own tags, ingredients and recipes"""
+        users = seed()
+
+        assert users.count() == 3
+        for user in users:
+            assert Tag.objects.filter(user=user).count() == 5
+            assert Ingredient.objects.filter(user=user).count() == 6
+            recipes = Recipe.objects.filter(user=user)
+            assert recipes.count() == 4
+            assert not Recipe.tags.through.objects.filter(
+                recipe__in=recipes
+            ).exclude(tag__user=user).exists()
+            assert Recipe.ingredients.through.objects.filter(
+                recipe__in=recipes, ingredient__user=user
+            ).count() >= 3 * 4
+        assert authenticate(
+            email='seed0@seed.recipe.app', password='seedpass'
+        ) == users[0]
+
+    @pytest.mark.django_db
+    def test_without_tags_and_ingredients(self):
+        """Test users may be seeded without tags or ingredients"""
+        users = seed(tags=0, ingredients=0)
+
+        assert users.count() == 3
+        assert Recipe.objects.filter(user__in=users).count() == 3 * 4
+        assert not Tag.objects.filter(user__in=users).exists()
+        assert not Recipe.ingredients.through.objects.exists()
+
+    @pytest.mark.django_db
+    def test_ids_reserved(self):
+        """Test rows created after seeding don't collide with seeded ids"""
+        users = seed()
+
+        tag = Tag.objects.create(user=users[0], name='New')
+
+        assert tag.id > Tag.objects.exclude(id=tag.id).latest('id').id
+
+    @pytest.mark.django_db
+    def test_deterministic(self):
+        """Test a seed produces the same data whatever the sharding"""
+        first = seed(prefix='a', shard_size=1)
+        second = seed(prefix='b', shard_size=3)
+
+        def library(users):
+            return [
+                list(Recipe.objects.filter(user=user).order_by('id')
+                     .values_list('title', 'price', 'time_minutes'))
+                for user in users
+            ]
+
+        assert library(first) == library(second)
+
+    @pytest.mark.django_db
+    def test_prefix_taken(self):
+        """Test seeding refuses to reuse an email prefix"""
+        seed()
+
+        with pytest.raises(CommandError):
+            seed()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_parallel_workers(self):
+        """Test shards loaded by worker processes"""
+        users = seed(users=4, workers=2, shard_size=1)
+
+        assert users.count() == 4
+        assert Recipe.objects.filter(user__in=users).count() == 16
@@ -0,0 +1,147 @@
+import os
+import tempfile
+from datetime import timedelta
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.management import call_command
+from django.utils import timezone
+
+import pytest
+
+from core.deletion import delete_account, start_account_deletion
+from core.jobs import resume_stale_jobs
+from core.models import AccountDeletion, Recipe, Tag, Ingredient
+
+
+def create_user(email):
+    return get_user_model().objects.create_user(email, 'testpass')
+
+
+def sample_library(user, recipes=3):
+    """Create recipes sharing a tag and an ingredient for user"""
+    tag = Tag.objects.create(user=user, name='Vegan')
+    ingredient = Ingredient.objects.create(user=user, name='Kale')
+    for i in range(recipes):
+        recipe = Recipe.objects.create(
+            user=user, title=f'Recipe {i}', time_minutes=5, price=1
+        )
+        recipe.tags.add(tag)
+        recipe.ingredients.add(ingredient)
+    return tag, ingredient
+
+
+@pytest.fixture(autouse=True)
+def eager_jobs(settings):
+    settings.JOBS_ALWAYS_EAGER = True
+    settings.ACCOUNT_DELETION_BATCH_SIZE = 2
+
+
+class TestAccountDeletion:
+
+    @pytest.mark.django_db
+    def test_deletes_library_and_user(self):
+        """Test the user and everything they own is deleted"""
+        user = create_user('test@myapp.com')
+        sample_library(user)
+        deletion = start_account_deletion(user)
+
+        delete_account(deletion.pk)
+
+        deletion.refresh_from_db()
+        assert deletion.status == AccountDeletion.DONE
+        assert deletion.progress == deletion.totals
+        assert deletion.progress['recipes'] == 3
+        assert not get_user_model().objects.filter(id=user.id).exists()
+        assert not Recipe.objects.exists()
+        assert not Tag.objects.exists()
+        assert not Ingredient.objects.exists()
+
+    @pytest.mark.django_db
+    def test_other_users_untouched(self):
+        """Test other users keep their recipes but lose links to ours"""
+        user = create_user('test@myapp.com')
+        other = create_user('other@myapp.com')
+        tag, _ = sample_library(user)
+        sample_library(other)
+        shared = Recipe.objects.filter(user=other).first()
+        shared.tags.add(tag)
+        deletion = start_account_deletion(user)
+
+        delete_account(deletion.pk)
+
+        deletion.refresh_from_db()
+        assert deletion.progress['tag_uses'] == 1
+        assert Recipe.objects.filter(user=other).count() == 3
+        assert shared.tags.count() == 1
+        assert Tag.objects.filter(user=other).count() == 1
+
+    @pytest.mark.django_db
+    def test_deletes_image_files(self):
+        """Test recipe images are removed from storage"""
+        user = create_user('test@myapp.com')
+        recipe = Recipe.objects.create(
+            user=user, title='Toast', time_minutes=5, price=1
+        )
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            Image.new('RGB', (10, 10)).save(ntf, format='JPEG')
+            ntf.seek(0)
+            recipe.image.save('toast.jpg', File(ntf))
+        path = recipe.image.path
+        deletion = start_account_deletion(user)
+
+        delete_account(deletion.pk)
+
+        deletion.refresh_from_db()
+        assert deletion.files_deleted == 1
+        assert not os.path.exists(path)
+
+    @pytest.mark.django_db
+    def test_command_resumes_deletions(self):
+        """Test the command finishes deletions that didn't complete"""
+        user = create_user('test@myapp.com')
+        sample_library(user)
+        deletion = AccountDeletion.objects.create(
+            user_id=user.id, status=AccountDeletion.FAILED
+        )
+
+        call_command('delete_accounts')
+
+        deletion.refresh_from_db()
+        assert deletion.status == AccountDeletion.DONE
+        assert not Recipe.objects.exists()
+
+    @pytest.mark.django_db
+    def test_stale_deletions_resumed(self, settings):
+        """Test deletions left behind by a dead worker are run again"""
+        settings.JOBS_STALE_AFTER = 600
+        user = create_user('test@myapp.com')
+        sample_library(user)
+        deletion = AccountDeletion.objects.create(
+            user_id=user.id, status=AccountDeletion.RUNNING
+        )
+        AccountDeletion.objects.filter(pk=deletion.pk).update(
+            updated_at=timezone.now() - timedelta(seconds=601)
+        )
+
+        assert resume_stale_jobs() == 1
+
+        deletion.refresh_from_db()
+        assert deletion.status == AccountDeletion.DONE
+        assert not Recipe.objects.exists()
+
+    @pytest.mark.django_db
+    def test_running_deletions_left_alone(self, settings):
+        """Test deletions making progress aren't run twice"""
+        settings.JOBS_STALE_AFTER = 600
+        user = create_user('test@myapp.com')
+        sample_library(user)
+        AccountDeletion.objects.create(
+            user_id=user.id, status=AccountDeletion.RUNNING
+        )
+
+        assert resume_stale_jobs() == 0
+
+        assert Recipe.objects.count() == 3
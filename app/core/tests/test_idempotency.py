@@ -0,0 +1,211 @@
+import io
+from unittest.mock import patch
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+import pytest
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from recipe.views import RecipeViewSet
+
+RECIPES_URL = reverse('recipe:recipe-list')
+CREATE_USER_URL = reverse('user:create')
+PAYLOAD = {'title': 'Toast', 'time_minutes': 5, 'price': '1.00'}
+
+
+def image_upload_url(recipe_id):
+    return reverse('recipe:recipe-upload-image', args=[recipe_id])
+
+
+def sample_image():
+    image = io.BytesIO()
+    Image.new('RGB', (10, 10)).save(image, format='JPEG')
+    image.name = 'toast.jpg'
+    image.seek(0)
+    return image
+
+
+def authenticated_client(email='test@user.com'):
+    user = get_user_model().objects.create_user(
+        email=email, password='testpass',
+    )
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+class TestIdempotencyKey:
+
+    @pytest.mark.django_db
+    def test_retry_replayed(self):
+        """Test a retry gets the first response without running again"""
+        client = authenticated_client()
+        first = client.post(RECIPES_URL, PAYLOAD, HTTP_IDEMPOTENCY_KEY='a')
+
+        with CaptureQueriesContext(connection) as queries:
+            retry = client.post(RECIPES_URL, PAYLOAD, HTTP_IDEMPOTENCY_KEY='a')
+
+        assert retry.status_code == status.HTTP_201_CREATED
+        assert retry.data == first.data
+        assert retry['Idempotent-Replayed'] == 'true'
+        assert len(queries) == 0
+        assert Recipe.objects.count() == 1
+
+    @pytest.mark.django_db
+    def test_new_key_runs(self):
+        """Test requests with different or no keys all run"""
+        client = authenticated_client()
+
+        client.post(RECIPES_URL, PAYLOAD, HTTP_IDEMPOTENCY_KEY='a')
+        client.post(RECIPES_URL, PAYLOAD, HTTP_IDEMPOTENCY_KEY='b')
+        client.post(RECIPES_URL, PAYLOAD)
+
+        assert Recipe.objects.count() == 3
+
+    @pytest.mark.django_db
+    def test_key_reused(self):
+        """Test a key sent with another request body is refused"""
+        client = authenticated_client()
+        client.post(RECIPES_URL, PAYLOAD, HTTP_IDEMPOTENCY_KEY='a')
+
+        res = client.post(
+            RECIPES_URL, {**PAYLOAD, 'title': 'Bagel'},
+            HTTP_IDEMPOTENCY_KEY='a',
+        )
+
+        assert res.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+        assert Recipe.objects.count() == 1
+
+    @pytest.mark.django_db
+    def test_in_progress(self):
+        """Test a retry arriving while the request runs gets a 409"""
+        client = authenticated_client()
+        retries = []
+        perform_create = RecipeViewSet.perform_create
+
+        def retry_meanwhile(view, serializer):
+            retries.append(
+                client.post(RECIPES_URL, PAYLOAD, HTTP_IDEMPOTENCY_KEY='a')
+            )
+            perform_create(view, serializer)
+
+        with patch.object(RecipeViewSet, 'perform_create', retry_meanwhile):
+            res = client.post(RECIPES_URL, PAYLOAD, HTTP_IDEMPOTENCY_KEY='a')
+
+        assert res.status_code == status.HTTP_201_CREATED
+        assert retries[0].status_code == status.HTTP_409_CONFLICT
+
+    @pytest.mark.django_db
+    def test_in_progress_after_expiry(self):
+        """Test retries racing for an expired key don't both run"""
+        client = authenticated_client()
+        retries = []
+        perform_create = RecipeViewSet.perform_create
+
+        def retry_meanwhile(view, serializer):
+            # The retry finds the key taken, then its entry gone, as when
+            # another retry took the key after it expired.
+            with patch.object(caches['shared'], 'get', return_value=None):
+                retries.append(client.post(
+                    RECIPES_URL, PAYLOAD, HTTP_IDEMPOTENCY_KEY='a'
+                ))
+            perform_create(view, serializer)
+
+        with patch.object(RecipeViewSet, 'perform_create', retry_meanwhile):
+            res = client.post(RECIPES_URL, PAYLOAD, HTTP_IDEMPOTENCY_KEY='a')
+
+        assert res.status_code == status.HTTP_201_CREATED
+        assert retries[0].status_code == status.HTTP_409_CONFLICT
+        assert Recipe.objects.count() == 1
+
+    @pytest.mark.django_db
+    def test_scoped_to_user(self):
+        """Test users sending the same key don't share responses"""
+        authenticated_client().post(
+            RECIPES_URL, PAYLOAD, HTTP_IDEMPOTENCY_KEY='a'
+        )
+
+        res = authenticated_client('other@user.com').post(
+            RECIPES_URL, PAYLOAD, HTTP_IDEMPOTENCY_KEY='a'
+        )
+
+        assert 'Idempotent-Replayed' not in res
+        assert Recipe.objects.count() == 2
+
+    @pytest.mark.django_db
+    def test_errors_not_kept(self):
+        """Test a request failing validation may be fixed and retried"""
+        client = authenticated_client()
+        res = client.post(
+            RECIPES_URL, {'title': 'Toast'}, HTTP_IDEMPOTENCY_KEY='a'
+        )
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+
+        res = client.post(RECIPES_URL, PAYLOAD, HTTP_IDEMPOTENCY_KEY='a')
+
+        assert res.status_code == status.HTTP_201_CREATED
+
+    @pytest.mark.django_db
+    def test_key_too_long(self):
+        """Test overlong keys are refused"""
+        client = authenticated_client()
+
+        res = client.post(
+            RECIPES_URL, PAYLOAD, HTTP_IDEMPOTENCY_KEY='a' * 256
+        )
+
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+        assert not Recipe.objects.exists()
+
+    @pytest.mark.django_db
+    def test_upload_replayed(self):
+        """Test a retried upload doesn't write the image again"""
+        client = authenticated_client()
+        recipe = Recipe.objects.create(
+            user=get_user_model().objects.get(), title='Toast',
+            time_minutes=5, price=1,
+        )
+        url = image_upload_url(recipe.id)
+        first = client.post(
+            url, {'image': sample_image()}, format='multipart',
+            HTTP_IDEMPOTENCY_KEY='a',
+        )
+
+        with patch('recipe.views.RecipeViewSet.get_serializer') as serializer:
+            retry = client.post(
+                url, {'image': sample_image()}, format='multipart',
+                HTTP_IDEMPOTENCY_KEY='a',
+            )
+
+        recipe.refresh_from_db()
+        recipe.image.delete()
+        serializer.assert_not_called()
+        assert retry.status_code == status.HTTP_200_OK
+        assert retry.data == first.data
+
+    @pytest.mark.django_db
+    def test_register_replayed(self):
+        """Test a retried sign up returns the user created first"""
+        client = APIClient()
+        payload = {
+            'email': 'test@user.com', 'password': 'testpass', 'name': 'Test',
+        }
+
+        first = client.post(CREATE_USER_URL, payload,
+                            HTTP_IDEMPOTENCY_KEY='a')
+        retry = client.post(CREATE_USER_URL, payload,
+                            HTTP_IDEMPOTENCY_KEY='a')
+
+        assert first.status_code == status.HTTP_201_CREATED
+        assert retry.status_code == status.HTTP_201_CREATED
+        assert retry.data == first.data
+        assert get_user_model().objects.count() == 1
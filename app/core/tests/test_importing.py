@@ -0,0 +1,260 @@
+import json
+import os
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db.models import F
+from django.utils import timezone
+
+import pytest
+
+from core import importing
+from core.deletion import delete_account, start_account_deletion
+from core.jobs import resume_stale_jobs
+from core.models import RecipeImport, Recipe, Tag, Ingredient
+
+CSV = (
+    'title,time_minutes,price,link,tags,ingredients\n'
+    'Dal,30,4.50,,Vegan;Dinner,Lentils;Onion\n'
+    'Toast,5,1.00,https://example.com/toast,Breakfast,Bread\n'
+    ',10,2.00,,,\n'
+    'Soup,20,3.00,,Vegan,Onion;Carrot\n'
+)
+
+
+def create_user(email='test@myapp.com'):
+    return get_user_model().objects.create_user(email, 'testpass')
+
+
+def create_import(user, content, format=RecipeImport.CSV):
+    recipe_import = RecipeImport(user=user, format=format)
+    recipe_import.file.save(
+        f'recipes.{format}', ContentFile(content.encode()), save=True
+    )
+    return recipe_import
+
+
+def ndjson(*records):
+    return ''.join(json.dumps(record) + '\n' for record in records)
+
+
+@pytest.fixture(autouse=True)
+def import_settings(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.JOBS_ALWAYS_EAGER = True
+    settings.IMPORT_BATCH_SIZE = 2
+
+
+class TestRecipeImport:
+
+    @pytest.mark.django_db
+    def test_import_csv(self):
+        """Test CSV rows become recipes with their tags and ingredients"""
+        user = create_user()
+
+        recipe_import = importing.run_import(create_import(user, CSV).pk)
+
+        assert recipe_import.status == RecipeImport.DONE
+        assert recipe_import.rows_processed == 4
+        assert recipe_import.recipes_created == 3
+        dal = Recipe.objects.get(user=user, title='Dal')
+        assert sorted(dal.tags.values_list('name', flat=True)) == \
+            ['Dinner', 'Vegan']
+        assert sorted(dal.ingredients.values_list('name', flat=True)) == \
+            ['Lentils', 'Onion']
+        assert Recipe.objects.get(title='Toast').link == \
+            'https://example.com/toast'
+
+    @pytest.mark.django_db
+    def test_import_ndjson(self):
+        """Test one JSON object per line is imported"""
+        user = create_user()
+        content = ndjson(
+            {'title': 'Dal', 'time_minutes': 30, 'price': '4.50',
+             'tags': ['Vegan'], 'ingredients': ['Lentils']},
+            {'title': 'Toast', 'time_minutes': 5, 'price': 1},
+        ) + '\n'
+
+        recipe_import = importing.run_import(
+            create_import(user, content, RecipeImport.NDJSON).pk
+        )
+
+        assert recipe_import.recipes_created == 2
+        assert Recipe.objects.get(title='Dal').tags.get().name == 'Vegan'
+
+    @pytest.mark.django_db
+    def test_names_reuse_existing(self):
+        """Test names map to the user's existing rows, created only once"""
+        user = create_user()
+        vegan = Tag.objects.create(user=user, name='Vegan')
+        Tag.objects.create(user=create_user('other@myapp.com'), name='Dinner')
+
+        importing.run_import(create_import(user, CSV).pk)
+
+        assert Tag.objects.filter(user=user).count() == 3
+        assert Ingredient.objects.filter(user=user, name='Onion').count() == 1
+        assert set(Recipe.objects.filter(tags=vegan)
+                   .values_list('title', flat=True)) == {'Dal', 'Soup'}
+
+    @pytest.mark.django_db
+    def test_invalid_rows_recorded(self):
+        """Test invalid rows are skipped and reported with their number"""
+        user = create_user()
+        content = ndjson(
+            {'time_minutes': 30, 'price': 4},
+            {'title': 'Toast', 'time_minutes': 5, 'price': 1,
+             'tags': 'Breakfast'},
+        ) + '{not json\n[1]\n'
+
+        recipe_import = importing.run_import(
+            create_import(user, content, RecipeImport.NDJSON).pk
+        )
+
+        assert recipe_import.status == RecipeImport.DONE
+        assert recipe_import.recipes_created == 0
+        assert recipe_import.rows_failed == 4
+        assert [error['row'] for error in recipe_import.errors] == \
+            [1, 2, 3, 4]
+        assert recipe_import.errors[0]['error'].startswith('title')
+
+    @pytest.mark.django_db
+    def test_errors_capped(self, settings):
+        """Test only the first IMPORT_MAX_ERRORS errors are kept"""
+        settings.IMPORT_MAX_ERRORS = 3
+        user = create_user()
+        content = 'title,time_minutes,price\n' + ',1,1\n' * 5
+
+        recipe_import = importing.run_import(create_import(user, content).pk)
+
+        assert recipe_import.rows_failed == 5
+        assert len(recipe_import.errors) == 3
+
+    @pytest.mark.django_db
+    def test_queries_per_batch(self, django_assert_max_num_queries):
+        """Test the query count depends on batches, not rows"""
+        user = create_user()
+        recipe_import = create_import(user, CSV)
+
+        # Per batch: savepoint, tags, ingredients, recipes, 2 through
+        # tables, checkpoint and release, plus the setup queries.
+        with django_assert_max_num_queries(2 * 8 + 8):
+            importing.run_import(recipe_import.pk)
+
+    @pytest.mark.django_db
+    def test_resume_after_failure(self):
+        """Test a failed import resumes after its last committed batch"""
+        user = create_user()
+        recipe_import = create_import(user, CSV)
+        batch = importing._import_batch
+        calls = []
+
+        def fail_second(*args):
+            calls.append(1)
+            if len(calls) == 2:
+                raise RuntimeError('Connection lost')
+            return batch(*args)
+
+        with patch('core.importing._import_batch', side_effect=fail_second):
+            with pytest.raises(RuntimeError):
+                importing.run_import(recipe_import.pk)
+
+        recipe_import.refresh_from_db()
+        assert recipe_import.status == RecipeImport.FAILED
+        assert recipe_import.error == 'Connection lost'
+        assert recipe_import.rows_processed == 2
+        assert Recipe.objects.filter(user=user).count() == 2
+
+        call_command('import_recipes', resume=True, stdout=StringIO())
+
+        recipe_import.refresh_from_db()
+        assert recipe_import.status == RecipeImport.DONE
+        assert recipe_import.rows_processed == 4
+        assert recipe_import.recipes_created == 3
+        assert sorted(Recipe.objects.filter(user=user)
+                      .values_list('title', flat=True)) == \
+            ['Dal', 'Soup', 'Toast']
+        assert Tag.objects.filter(user=user, name='Vegan').count() == 1
+
+    @pytest.mark.django_db
+    def test_stale_import_resumed(self, settings):
+        """Test an import left running by a dead worker is resumed"""
+        settings.JOBS_STALE_AFTER = 600
+        user = create_user()
+        recipe_import = create_import(user, CSV)
+        batch = importing._import_batch
+
+        def die_second(*args):
+            if args[2]:
+                raise SystemExit()
+            return batch(*args)
+
+        with patch('core.importing._import_batch', side_effect=die_second):
+            with pytest.raises(SystemExit):
+                importing.run_import(recipe_import.pk)
+        RecipeImport.objects.filter(pk=recipe_import.pk).update(
+            updated_at=timezone.now() - timedelta(seconds=601)
+        )
+        recipe_import.refresh_from_db()
+        assert recipe_import.status == RecipeImport.RUNNING
+
+        assert resume_stale_jobs() == 1
+
+        recipe_import.refresh_from_db()
+        assert recipe_import.status == RecipeImport.DONE
+        assert recipe_import.rows_processed == 4
+        assert Recipe.objects.filter(user=user).count() == 3
+
+    @pytest.mark.django_db
+    def test_taken_over(self):
+        """Test a run stops when another one committed its batch"""
+        user = create_user()
+        recipe_import = create_import(user, CSV)
+        read_csv = importing.read_csv
+
+        def other_run_first(stream):
+            # Another run commits the first batch while this one reads it.
+            RecipeImport.objects.filter(pk=recipe_import.pk).update(
+                rows_processed=F('rows_processed') + 2
+            )
+            return read_csv(stream)
+
+        readers = {RecipeImport.CSV: other_run_first}
+        with patch.dict(importing.READERS, readers):
+            importing.run_import(recipe_import.pk)
+
+        recipe_import.refresh_from_db()
+        assert recipe_import.status == RecipeImport.RUNNING
+        assert recipe_import.rows_processed == 2
+        assert not Recipe.objects.filter(user=user).exists()
+
+    @pytest.mark.django_db
+    def test_command(self, tmp_path):
+        """Test importing a file from the command line"""
+        user = create_user()
+        path = tmp_path / 'library.jsonl'
+        path.write_text(ndjson({'title': 'Dal', 'time_minutes': 30,
+                                'price': 4}))
+
+        call_command('import_recipes', user.email, str(path),
+                     stdout=StringIO())
+
+        recipe_import = RecipeImport.objects.get(user=user)
+        assert recipe_import.format == RecipeImport.NDJSON
+        assert recipe_import.status == RecipeImport.DONE
+        assert Recipe.objects.filter(user=user, title='Dal').exists()
+
+    @pytest.mark.django_db
+    def test_account_deletion_removes_files(self):
+        """Test uploaded import files go with the account"""
+        user = create_user()
+        path = create_import(user, CSV).file.path
+        deletion = start_account_deletion(user)
+
+        delete_account(deletion.pk)
+
+        assert not RecipeImport.objects.exists()
+        assert not os.path.exists(path)
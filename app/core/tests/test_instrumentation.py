@@ -0,0 +1,181 @@
+import logging
+import re
+
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.urls import reverse
+
+import pytest
+
+from rest_framework.test import APIClient
+
+from core import instrumentation
+from core.middleware import RequestTimingMiddleware
+from core.models import Recipe, Tag
+
+from recipe.serializers import RecipeDetailSerializer
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+SERVER_TIMING = re.compile(
+    r'total;dur=[\d.]+, db;dur=[\d.]+;desc="(\d+) queries", '
+    r'serializer;dur=[\d.]+'
+)
+
+
+@pytest.fixture
+def user():
+    """A sample user for testing"""
+    return get_user_model().objects.create_user(
+        email='test@user.com', password='testpass', name='name'
+    )
+
+
+@pytest.fixture
+def client(user):
+    """An api client with a logged in user"""
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+def sample_recipes(user, count):
+    """Create count recipes sharing one tag"""
+    tag = Tag.objects.create(user=user, name='Vegan')
+    for i in range(count):
+        recipe = Recipe.objects.create(
+            user=user, title=f'Recipe {i}', time_minutes=5, price=3
+        )
+        recipe.tags.add(tag)
+
+
+class TestQueryShape:
+
+    @pytest.mark.parametrize('sql,expected', [
+        ('SELECT 1 WHERE id IN (%s)', 'SELECT 1 WHERE id IN (...)'),
+        ('SELECT 1 WHERE id IN (%s, %s,%s)', 'SELECT 1 WHERE id IN (...)'),
+        ('SELECT 1 WHERE id = %s', 'SELECT 1 WHERE id = %s'),
+    ])
+    def test_in_lists_collapsed(self, sql, expected):
+        """Test IN lists of any length have the same shape"""
+        assert instrumentation.query_shape(sql) == expected
+
+
+class TestTimer:
+
+    def test_outside_request(self):
+        """Test timers are a no-op outside a measured request"""
+        with instrumentation.timer('serializer'):
+            assert instrumentation.current_metrics() is None
+
+    def test_nested_counted_once(self, monkeypatch):
+        """Test nested blocks with the same name are counted once"""
+        ticks = iter([0.0, 1.0, 2.0, 3.0])
+        monkeypatch.setattr(
+            instrumentation.time, 'perf_counter', lambda: next(ticks)
+        )
+        with instrumentation.measure_request() as metrics:
+            with instrumentation.timer('serializer'):
+                with instrumentation.timer('serializer'):
+                    pass
+
+        assert metrics.timings['serializer'] == 1.0
+
+
+class TestRequestTimingMiddleware:
+
+    @pytest.mark.django_db
+    def test_server_timing_header(self, client, user):
+        """Test the header reports the queries the request ran"""
+        sample_recipes(user, 2)
+
+        res = client.get(RECIPES_URL)
+
+        match = SERVER_TIMING.fullmatch(res['Server-Timing'])
+        assert match
+        assert int(match.group(1)) > 0
+
+    def test_header_disabled(self, settings):
+        """Test the header can be turned off"""
+        settings.SERVER_TIMING_HEADER = False
+        middleware = RequestTimingMiddleware(lambda request: HttpResponse())
+
+        res = middleware(RequestFactory().get('/'))
+
+        assert not res.has_header('Server-Timing')
+
+    @pytest.mark.django_db
+    def test_logs_view_and_action(self, client, user, caplog):
+        """Test a structured record names the viewset and action"""
+        sample_recipes(user, 1)
+
+        with caplog.at_level(logging.INFO, logger='core.middleware'):
+            client.get(RECIPES_URL)
+
+        record = next(
+            record for record in caplog.records
+            if getattr(record, 'view', None)
+        )
+        assert record.view == 'recipe.views.RecipeViewSet'
+        assert record.action == 'list'
+        assert record.status == 200
+        assert record.queries > 0
+        assert record.serializer_ms >= 0
+
+    @pytest.mark.django_db
+    def test_serializer_time_recorded(self, user):
+        """Test model serializers count towards serializer time"""
+        sample_recipes(user, 1)
+        recipe = Recipe.objects.get()
+
+        with instrumentation.measure_request() as metrics:
+            RecipeDetailSerializer(recipe).data
+
+        assert 'serializer' in metrics.timings
+        assert metrics.queries == 2
+
+    @pytest.mark.django_db
+    def test_list_is_not_n_plus_one(self, client, user, settings):
+        """Test the recipe list runs a fixed number of query shapes"""
+        settings.N_PLUS_ONE_THRESHOLD = 3
+        settings.N_PLUS_ONE_RAISE = True
+        sample_recipes(user, 5)
+
+        res = client.get(RECIPES_URL)
+
+        assert res.status_code == 200
+
+    @pytest.mark.django_db
+    def test_n_plus_one_raises(self, user, settings):
+        """Test repeating a query shape fails when raising is enabled"""
+        settings.N_PLUS_ONE_THRESHOLD = 3
+        settings.N_PLUS_ONE_RAISE = True
+
+        def view(request):
+            for recipe_id in range(3):
+                Recipe.objects.filter(id=recipe_id).exists()
+            return HttpResponse()
+
+        middleware = RequestTimingMiddleware(view)
+
+        with pytest.raises(instrumentation.NPlusOneError):
+            middleware(RequestFactory().get('/'))
+
+    @pytest.mark.django_db
+    def test_n_plus_one_logged(self, user, settings, caplog):
+        """Test repeated query shapes are logged as a warning by default"""
+        settings.N_PLUS_ONE_THRESHOLD = 3
+
+        def view(request):
+            for recipe_id in range(3):
+                Recipe.objects.filter(id=recipe_id).exists()
+            return HttpResponse()
+
+        middleware = RequestTimingMiddleware(view)
+        middleware(RequestFactory().get('/'))
+
+        assert any(
+            record.levelno == logging.WARNING and 'same query' in record.msg
+            for record in caplog.records
+        )
@@ -0,0 +1,195 @@
+import os
+import tempfile
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.test import Client
+from django.urls import reverse
+
+import pytest
+
+from rest_framework.test import APIClient
+
+from core import metrics
+from core.models import Recipe
+
+
+@pytest.fixture
+def metrics_dir(settings, tmp_path, monkeypatch):
+    """Write metrics to a fresh directory for the test"""
+    settings.METRICS_DIR = str(tmp_path)
+    monkeypatch.setattr(metrics, '_values', None)
+    yield tmp_path
+    if metrics._values is not None:
+        metrics._values.close()
+
+
+@pytest.fixture
+def user():
+    """A sample user for testing"""
+    return get_user_model().objects.create_user(
+        email='test@user.com', password='testpass', name='name'
+    )
+
+
+@pytest.fixture
+def user_api_client(user):
+    """An api client with a logged in user"""
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+def totals(metric):
+    """Return the summed samples of metric by (suffix, label values)"""
+    return dict(metrics.collect().get(metric.name, {}))
+
+
+class TestValueFile:
+
+    def test_round_trip(self, tmp_path):
+        """Test values written to a file are read back by key"""
+        values = metrics.ValueFile(str(tmp_path / 'metrics_1.db'))
+        values.add('a', 1)
+        values.add('a', 2.5)
+        values.add('b' * 13, 1)
+        values.close()
+
+        assert metrics.read_file(str(tmp_path / 'metrics_1.db')) == [
+            ('a', 3.5), ('b' * 13, 1.0),
+        ]
+
+    @pytest.mark.parametrize('path', [None, 'metrics_1.db'])
+    def test_grows(self, tmp_path, path):
+        """Test the map grows past its initial size"""
+        values = metrics.ValueFile(path and str(tmp_path / path))
+        for i in range(5000):
+            values.add(f'key-{i}', i)
+
+        assert dict(values.items())['key-4999'] == 4999
+        values.close()
+
+    def test_reopen_keeps_values(self, tmp_path):
+        """Test reopening a file continues from its values"""
+        path = str(tmp_path / 'metrics_1.db')
+        values = metrics.ValueFile(path)
+        values.add('a', 1)
+        values.close()
+
+        values = metrics.ValueFile(path)
+        values.add('a', 1)
+
+        assert values.items() == [('a', 2.0)]
+        values.close()
+
+
+class TestMultiprocess:
+
+    def test_workers_summed(self, metrics_dir):
+        """Test samples from forked workers are reported together"""
+        metrics.HTTP_REQUESTS.inc('recipe:recipe-list', 'GET', 200)
+        pid = os.fork()
+        if pid == 0:
+            try:
+                metrics.HTTP_REQUESTS.inc(
+                    'recipe:recipe-list', 'GET', 200, amount=2
+                )
+            finally:
+                os._exit(0)
+        os.waitpid(pid, 0)
+
+        key = ('_total', ('recipe:recipe-list', 'GET', '200'))
+        assert totals(metrics.HTTP_REQUESTS)[key] == 3
+        assert len(list(metrics_dir.glob('metrics_*.db'))) == 2
+
+        metrics.mark_process_dead(pid)
+
+        assert totals(metrics.HTTP_REQUESTS)[key] == 3
+        assert not (metrics_dir / f'metrics_{pid}.db').exists()
+        assert (metrics_dir / metrics.ARCHIVE).exists()
+
+
+class TestExposition:
+
+    @pytest.mark.django_db
+    def test_histogram(self, metrics_dir):
+        """Test histogram buckets are cumulative with a count and sum"""
+        histogram = metrics.HTTP_REQUEST_DURATION
+        histogram.observe(0.003, 'recipe:tag-list', 'GET')
+        histogram.observe(0.2, 'recipe:tag-list', 'GET')
+        histogram.observe(30, 'recipe:tag-list', 'GET')
+
+        lines = metrics.exposition().splitlines()
+
+        labels = 'view="recipe:tag-list",method="GET"'
+        name = 'http_request_duration_seconds'
+        assert f'# TYPE {name} histogram' in lines
+        assert f'{name}_bucket{{{labels},le="0.005"}} 1' in lines
+        assert f'{name}_bucket{{{labels},le="0.25"}} 2' in lines
+        assert f'{name}_bucket{{{labels},le="+Inf"}} 3' in lines
+        assert f'{name}_count{{{labels}}} 3' in lines
+        assert f'{name}_sum{{{labels}}} 30.203' in lines
+
+    @pytest.mark.django_db
+    def test_label_values_escaped(self, metrics_dir):
+        """Test quotes and backslashes in label values are escaped"""
+        metrics.record_cache_access('a"b\\', True)
+
+        assert 'cache_requests_total{cache="a\\"b\\\\",result="hit"} 1' \
+            in metrics.exposition().splitlines()
+
+    @pytest.mark.django_db
+    def test_metrics_view(self, metrics_dir):
+        """Test the view serves the text format with connection counts"""
+        res = Client().get(reverse('metrics'))
+
+        assert res.status_code == 200
+        assert res['Content-Type'].startswith('text/plain; version=0.0.4')
+        assert '# TYPE db_connections gauge' in res.content.decode()
+        assert 'db_connections{state="active"}' in res.content.decode()
+
+
+class TestRequestMetrics:
+
+    @pytest.mark.django_db
+    def test_api_requests_recorded(self, metrics_dir, user_api_client):
+        """Test API requests are counted and timed by view"""
+        user_api_client.get(reverse('recipe:recipe-list'))
+        user_api_client.get(reverse('recipe:recipe-detail', args=[0]))
+
+        requests = totals(metrics.HTTP_REQUESTS)
+        assert requests[
+            '_total', ('recipe:recipe-list', 'GET', '200')
+        ] == 1
+        assert requests[
+            '_total', ('recipe:recipe-detail', 'GET', '404')
+        ] == 1
+        duration = totals(metrics.HTTP_REQUEST_DURATION)
+        assert duration['_sum', ('recipe:recipe-list', 'GET')] > 0
+        assert totals(metrics.DB_QUERIES)['_total', ('recipe:recipe-list',)]
+
+    @pytest.mark.django_db
+    def test_other_paths_ignored(self, metrics_dir):
+        """Test requests outside the API are not recorded"""
+        Client().get(reverse('metrics'))
+
+        assert totals(metrics.HTTP_REQUESTS) == {}
+
+    @pytest.mark.django_db
+    def test_image_upload_size(self, metrics_dir, user, user_api_client):
+        """Test uploaded image sizes are observed"""
+        recipe = Recipe.objects.create(
+            user=user, title='Kale salad', time_minutes=5, price=3
+        )
+        url = reverse('recipe:recipe-upload-image', args=[recipe.id])
+
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as ntf:
+            Image.new('RGB', (10, 10)).save(ntf, format='JPEG')
+            size = ntf.tell()
+            ntf.seek(0)
+            user_api_client.post(url, {'image': ntf}, format='multipart')
+
+        recipe.refresh_from_db()
+        recipe.image.delete()
+        assert totals(metrics.IMAGE_UPLOAD_BYTES)['_sum', ()] == size
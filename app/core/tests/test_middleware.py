@@ -0,0 +1,116 @@
+import gzip
+import zlib
+
+import brotli
+import pytest
+import zstandard
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory
+
+from core.middleware import CompressionMiddleware, negotiate_encoding
+
+
+PREFERENCE = ('zstd', 'br', 'gzip')
+BODY = b'{"title": "Sample recipe"}' * 100
+
+
+def get_response(response, accept_encoding='gzip, deflate, br, zstd'):
+    """Run a response through the compression middleware"""
+    request = RequestFactory().get(
+        '/', HTTP_ACCEPT_ENCODING=accept_encoding
+    )
+    middleware = CompressionMiddleware(lambda request: response)
+    return middleware(request)
+
+
+class TestNegotiateEncoding:
+
+    @pytest.mark.parametrize('header,expected', [
+        ('gzip, br, zstd', 'zstd'),
+        ('gzip;q=1.0, br;q=0.5', 'gzip'),
+        ('br', 'br'),
+        ('*', 'zstd'),
+        ('*, zstd;q=0', 'br'),
+        ('identity', None),
+        ('', None),
+        ('gzip;q=bad', None),
+    ])
+    def test_negotiate(self, header, expected):
+        """Test the encoding is picked from q-values then preference"""
+        assert negotiate_encoding(header, PREFERENCE) == expected
+
+
+class TestCompressionMiddleware:
+
+    @pytest.mark.parametrize('accept_encoding,decompress', [
+        ('gzip', gzip.decompress),
+        ('br', brotli.decompress),
+        ('zstd', zstandard.ZstdDecompressor().decompressobj().decompress),
+    ])
+    def test_compresses_json(self, accept_encoding, decompress):
+        """Test JSON responses are compressed with the negotiated coding"""
+        response = get_response(
+            HttpResponse(BODY, content_type='application/json'),
+            accept_encoding,
+        )
+
+        assert response['Content-Encoding'] == accept_encoding
+        assert response['Vary'] == 'Accept-Encoding'
+        assert int(response['Content-Length']) == len(response.content)
+        assert decompress(response.content) == BODY
+
+    def test_small_response_untouched(self):
+        """Test responses under the minimum size are not compressed"""
+        response = get_response(
+            HttpResponse(b'{}', content_type='application/json')
+        )
+        assert not response.has_header('Content-Encoding')
+
+    def test_content_type_not_allowed(self):
+        """Test media types outside the allowlist are not compressed"""
+        response = get_response(HttpResponse(BODY, content_type='image/png'))
+        assert not response.has_header('Content-Encoding')
+
+    def test_wildcard_content_type(self):
+        """Test wildcard allowlist entries match subtypes"""
+        response = get_response(HttpResponse(BODY, content_type='text/csv'))
+        assert response['Content-Encoding'] == 'zstd'
+
+    def test_not_accepted(self):
+        """Test nothing is compressed when the client accepts no coding"""
+        response = get_response(
+            HttpResponse(BODY, content_type='application/json'), ''
+        )
+        assert not response.has_header('Content-Encoding')
+        assert response['Vary'] == 'Accept-Encoding'
+
+    def test_strong_etag_weakened(self):
+        """Test a strong ETag is made weak after compression"""
+        original = HttpResponse(BODY, content_type='application/json')
+        original['ETag'] = '"abc"'
+        response = get_response(original)
+        assert response['ETag'] == 'W/"abc"'
+
+    def test_streaming_compressed_incrementally(self):
+        """Test each streamed chunk is emitted before the next is read"""
+        consumed = []
+
+        def chunks():
+            for i in range(3):
+                consumed.append(i)
+                yield BODY
+
+        response = get_response(
+            StreamingHttpResponse(chunks(), content_type='application/json'),
+            'gzip',
+        )
+        stream = iter(response.streaming_content)
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+        assert decompressor.decompress(next(stream)) == BODY
+        assert consumed == [0]
+        rest = b''.join(decompressor.decompress(part) for part in stream)
+        assert rest == BODY * 2
+        assert not response.has_header('Content-Length')
+        assert response['Content-Encoding'] == 'gzip'
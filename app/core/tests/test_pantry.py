@@ -0,0 +1,93 @@
+import random
+
+from django.contrib.auth import get_user_model
+
+import pytest
+
+from core import pantry
+from core.models import Recipe, Ingredient
+
+
+def brute_force(rows, ingredient_ids):
+    """Rank (recipe id, ingredient id) rows the slow way"""
+    recipes = {}
+    for recipe_id, ingredient_id in rows:
+        recipes.setdefault(recipe_id, set()).add(ingredient_id)
+    ranked = [
+        (recipe_id, len(needed & set(ingredient_ids)), len(needed))
+        for recipe_id, needed in recipes.items()
+        if needed & set(ingredient_ids)
+    ]
+    ranked.sort(key=lambda item: (-item[1] / item[2], -item[1], -item[0]))
+    return ranked
+
+
+class TestPantryIndex:
+
+    def test_rank(self):
+        """Test recipes are ranked by the share of ingredients at hand"""
+        index = pantry.PantryIndex('v1', [
+            (1, 10), (1, 11), (1, 12),
+            (2, 10), (2, 11),
+            (3, 10), (3, 13),
+            (4, 13),
+        ])
+
+        assert index.rank([10, 11, 99]) == [
+            (2, 2, 2), (1, 2, 3), (3, 1, 2),
+        ]
+        assert index.rank([99]) == []
+
+    def test_matches_brute_force(self):
+        """Test counts stay right past the first bits of the counter"""
+        rng = random.Random(1)
+        rows = {
+            (recipe_id, rng.randrange(40))
+            for recipe_id in range(1, 300) for _ in range(rng.randint(1, 15))
+        }
+        index = pantry.PantryIndex('v1', sorted(rows))
+
+        for _ in range(20):
+            ingredient_ids = rng.sample(range(40), rng.randint(1, 30))
+            assert index.rank(ingredient_ids) == \
+                brute_force(rows, ingredient_ids)
+
+
+class TestGetIndex:
+
+    @pytest.fixture
+    def user(self):
+        return get_user_model().objects.create_user(
+            'test@user.com', 'testpass',
+        )
+
+    @pytest.mark.django_db
+    def test_built_once(self, user, django_assert_num_queries):
+        """Test the index is reused while the version is unchanged"""
+        flour = Ingredient.objects.create(user=user, name='Flour')
+        recipe = Recipe.objects.create(
+            user=user, title='Bread', time_minutes=60, price=1,
+        )
+        recipe.ingredients.add(flour)
+
+        with django_assert_num_queries(1):
+            assert pantry.get_index(user.pk).rank([flour.pk]) == \
+                [(recipe.pk, 1, 1)]
+        with django_assert_num_queries(0):
+            pantry.get_index(user.pk)
+
+    @pytest.mark.django_db
+    def test_invalidated(self, user):
+        """Test other workers rebuild once the version is dropped"""
+        flour = Ingredient.objects.create(user=user, name='Flour')
+        recipe = Recipe.objects.create(
+            user=user, title='Bread', time_minutes=60, price=1,
+        )
+        stale = pantry.get_index(user.pk)
+        # Another worker adds the ingredient, this one keeps its index.
+        recipe.ingredients.add(flour)
+        pantry.invalidate_pantry(user.pk)
+        pantry._indexes.set(user.pk, stale)
+
+        assert pantry.get_index(user.pk).rank([flour.pk]) == \
+            [(recipe.pk, 1, 1)]
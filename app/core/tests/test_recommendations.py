@@ -0,0 +1,130 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+
+import pytest
+
+from core.deletion import delete_account, start_account_deletion
+from core.models import Recipe, RecipeSimilarity, Tag, Ingredient
+from core.recommendations import build_recommendations, similar_recipes
+
+
+def create_user(email='test@user.com'):
+    return get_user_model().objects.create_user(email, 'testpass')
+
+
+def sample_recipe(user, title, ingredients=(), tags=()):
+    recipe = Recipe.objects.create(
+        user=user, title=title, time_minutes=5, price=1,
+    )
+    recipe.ingredients.add(*ingredients)
+    recipe.tags.add(*tags)
+    return recipe
+
+
+def sample_library(user):
+    """Create pancakes, crepes sharing most of their features, and soup"""
+    flour, eggs, milk, leek = (
+        Ingredient.objects.create(user=user, name=name)
+        for name in ('Flour', 'Eggs', 'Milk', 'Leek')
+    )
+    sweet = Tag.objects.create(user=user, name='Sweet')
+    return (
+        sample_recipe(user, 'Pancakes', [flour, eggs, milk], [sweet]),
+        sample_recipe(user, 'Crepes', [flour, eggs, milk]),
+        sample_recipe(user, 'Omelette', [eggs]),
+        sample_recipe(user, 'Soup', [leek]),
+    )
+
+
+class TestSimilarRecipes:
+
+    def test_jaccard(self):
+        """Test neighbours are scored by shared over combined features"""
+        neighbours = similar_recipes({
+            1: {'a', 'b', 'c'},
+            2: {'a', 'b'},
+            3: {'c', 'd', 'e', 'f'},
+            4: {'g'},
+        }, top_k=5)
+
+        assert neighbours[1] == [(2 / 3, 2), (1 / 6, 3)]
+        assert neighbours[2] == [(2 / 3, 1)]
+        assert neighbours[4] == []
+
+    def test_top_k(self):
+        """Test only the top_k best neighbours are kept"""
+        features = {i: {'shared', i} for i in range(10)}
+
+        neighbours = similar_recipes(features, top_k=3)
+
+        assert all(len(scored) == 3 for scored in neighbours.values())
+
+    def test_max_postings(self):
+        """Test features of too many recipes don't link them"""
+        features = {1: {'common', 'a'}, 2: {'common', 'a'}, 3: {'common'}}
+
+        neighbours = similar_recipes(features, top_k=5, max_postings=2)
+
+        assert neighbours[1] == [(1 / 3, 2)]
+        assert neighbours[3] == []
+
+
+class TestBuildRecommendations:
+
+    @pytest.mark.django_db
+    def test_build(self, settings):
+        """Test each recipe keeps its best neighbours of the library"""
+        settings.RECOMMENDATIONS_TOP_K = 2
+        user = create_user()
+        pancakes, crepes, omelette, soup = sample_library(user)
+        sample_library(create_user('other@user.com'))
+
+        build_recommendations(user.pk)
+
+        similar = RecipeSimilarity.objects.filter(recipe=pancakes)
+        assert list(
+            similar.order_by('-score').values_list('similar_id', 'score')
+        ) == [(crepes.id, 0.75), (omelette.id, 0.25)]
+        assert not RecipeSimilarity.objects.filter(recipe=soup).exists()
+        assert not RecipeSimilarity.objects.exclude(
+            recipe__user=user
+        ).exists()
+
+    @pytest.mark.django_db
+    def test_rebuild_replaces(self):
+        """Test a rebuild drops neighbours that no longer match"""
+        user = create_user()
+        pancakes, crepes, omelette, _ = sample_library(user)
+        build_recommendations(user.pk)
+        crepes.delete()
+        omelette.ingredients.clear()
+
+        build_recommendations(user.pk)
+
+        assert not RecipeSimilarity.objects.filter(recipe=pancakes).exists()
+
+    @pytest.mark.django_db
+    def test_command(self):
+        """Test the command builds every library"""
+        sample_library(create_user())
+        sample_library(create_user('other@user.com'))
+        out = StringIO()
+
+        call_command('build_recommendations', stdout=out)
+
+        assert RecipeSimilarity.objects.count() == 12
+        assert 'for 2 users' in out.getvalue()
+
+    @pytest.mark.django_db
+    def test_account_deletion(self, settings):
+        """Test deleting an account deletes its similar recipes"""
+        settings.JOBS_ALWAYS_EAGER = True
+        user = create_user()
+        sample_library(user)
+        build_recommendations(user.pk)
+
+        delete_account(start_account_deletion(user).pk)
+
+        assert not RecipeSimilarity.objects.exists()
@@ -0,0 +1,110 @@
+import datetime
+import decimal
+import io
+import uuid
+from unittest.mock import patch
+
+import pytest
+
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from core.parsers import FastJSONParser
+from core.renderers import FastJSONRenderer
+
+
+SAMPLE = {
+    'id': 1,
+    'title': 'Crème brûlée \u2028\u2029',
+    'price': decimal.Decimal('5.50'),
+    'uuid': uuid.UUID('12345678123456781234567812345678'),
+    'created': datetime.datetime(
+        2022, 1, 2, 3, 4, 5, 6000, tzinfo=datetime.timezone.utc),
+    'updated': datetime.datetime(
+        2022, 1, 2, 3, 4, 5, 123456, tzinfo=datetime.timezone.utc),
+    'offset': datetime.datetime(
+        2022, 1, 2, 3, 4, 5, 999999,
+        tzinfo=datetime.timezone(datetime.timedelta(hours=2))),
+    'naive': datetime.datetime(2022, 1, 2, 3, 4, 5, 654321),
+    'time': datetime.time(3, 4, 5, 123456),
+    'day': datetime.date(2022, 1, 2),
+    'tags': [1, 2, 3],
+    'nested': {'none': None, 'flag': True, 'ratio': 0.25},
+    'big': 2 ** 70,
+}
+
+
+class TestFastJSONRenderer:
+
+    @pytest.mark.parametrize('key', list(SAMPLE))
+    def test_matches_drf_output(self, key):
+        """Test each value renders to the same bytes as DRF"""
+        data = {key: SAMPLE[key]}
+        assert FastJSONRenderer().render(data) == JSONRenderer().render(data)
+
+    @pytest.mark.parametrize('value', [
+        float('nan'), float('inf'), -float('inf'), decimal.Decimal('NaN'),
+    ])
+    def test_non_finite_refused_like_drf(self, value):
+        """Test NaN and infinities raise like DRF instead of becoming null"""
+        data = {'nested': [{'ratio': value, 'none': None}]}
+
+        with pytest.raises(ValueError) as expected:
+            JSONRenderer().render(data)
+        with pytest.raises(ValueError) as error:
+            FastJSONRenderer().render(data)
+        assert str(error.value) == str(expected.value)
+
+    def test_non_finite_allowed_like_drf(self):
+        """Test non strict renderers write NaN like DRF"""
+        class Renderer(FastJSONRenderer):
+            strict = False
+
+        class Expected(JSONRenderer):
+            strict = False
+
+        data = {'ratio': float('nan'), 'none': None}
+        assert Renderer().render(data) == Expected().render(data)
+
+    def test_indent_matches_drf_output(self):
+        """Test pretty printed output falls back to DRF"""
+        media_type = 'application/json; indent=4'
+        expected = JSONRenderer().render({'a': [1]}, media_type)
+        assert FastJSONRenderer().render({'a': [1]}, media_type) == expected
+
+    def test_none_renders_empty(self):
+        """Test no data renders an empty body"""
+        assert FastJSONRenderer().render(None) == b''
+
+    def test_without_orjson(self):
+        """Test the stdlib fallback is used when orjson is missing"""
+        with patch('core.renderers.orjson', None):
+            rendered = FastJSONRenderer().render(SAMPLE)
+        assert rendered == JSONRenderer().render(SAMPLE)
+
+
+class TestFastJSONParser:
+
+    def parse(self, parser, body):
+        return parser.parse(io.BytesIO(body), 'application/json', {})
+
+    @pytest.mark.parametrize('body', [
+        b'{"title": "Cr\\u00e8me", "price": "5.50", "tags": [1, 2]}',
+        b'[1.5, null, true, "\xc3\xa9"]',
+        b'{"big": 123456789012345678901234567890}',
+    ])
+    def test_matches_drf_parser(self, body):
+        """Test bodies parse to the same data as DRF"""
+        expected = self.parse(JSONParser(), body)
+        assert self.parse(FastJSONParser(), body) == expected
+
+    def test_invalid_json(self):
+        """Test invalid JSON raises a parse error"""
+        with pytest.raises(ParseError):
+            self.parse(FastJSONParser(), b'{"title": ')
+
+    def test_nan_rejected(self):
+        """Test non strict constants are rejected like DRF"""
+        with pytest.raises(ParseError):
+            self.parse(FastJSONParser(), b'{"price": NaN}')
@@ -0,0 +1,50 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+
+# Loads the API only profile in a fresh interpreter, the test process
+# already has the full one configured.
+CHILD = '''
+import json, sys
+import app.wsgi
+from django.apps import apps
+from django.core.management import call_command
+from django.urls import resolve, Resolver404
+call_command('check')
+try:
+    resolve('/admin/')
+    admin_routed = True
+except Resolver404:
+    admin_routed = False
+print(json.dumps({
+    'apps': [config.name for config in apps.get_app_configs()],
+    'sessions': [
+        name for name in sys.modules
+        if name.startswith('django.contrib.sessions')
+    ],
+    'admin_routed': admin_routed,
+    'recipes_view': resolve('/api/recipe/recipies/').view_name,
+}))
+'''
+
+
+class TestApiSettings:
+
+    def test_api_profile_loads(self):
+        """Test the API only profile serves the API without the admin"""
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': 'app.settings_api'}
+
+        result = subprocess.run(
+            [sys.executable, '-c', CHILD], cwd=settings.BASE_DIR, env=env,
+            capture_output=True, text=True, check=True,
+        )
+
+        loaded = json.loads(result.stdout.splitlines()[-1])
+        assert not loaded['admin_routed']
+        assert loaded['recipes_view'] == 'recipe:recipe-list'
+        assert 'django.contrib.admin' not in loaded['apps']
+        assert 'recipe' in loaded['apps']
+        assert loaded['sessions'] == []
@@ -0,0 +1,190 @@
+import threading
+import time
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache.backends.locmem import LocMemCache
+from django.urls import reverse
+
+import pytest
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.throttling import TokenBucketThrottle, parse_rate
+
+TOKEN_URL = reverse('user:token')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+
+def take(throttle, count, rate=1, burst=3):
+    """Return how many of count requests the bucket allowed"""
+    return sum(throttle.consume('bucket', rate, burst) for _ in range(count))
+
+
+@pytest.fixture
+def throttle():
+    return TokenBucketThrottle()
+
+
+def authenticated_client(email):
+    user = get_user_model().objects.create_user(
+        email=email, password='testpass',
+    )
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+class TestTokenBucket:
+
+    def test_parse_rate(self):
+        """Test rates are read as requests per second"""
+        assert parse_rate('120/min') == (2, 120)
+        assert parse_rate('10/s') == (10, 10)
+
+    def test_burst(self, throttle):
+        """Test a full bucket allows a burst, then refuses"""
+        assert take(throttle, 5) == 3
+        assert 0 < throttle.wait() <= 1
+
+    def test_refill(self, throttle):
+        """Test tokens come back at the rate"""
+        take(throttle, 5)
+
+        later = time.time() + 2.1
+        with patch('time.time', return_value=later):
+            assert take(throttle, 5) == 2
+
+    def test_capped_at_burst(self, throttle):
+        """Test idle clients don't save up more than the burst"""
+        throttle.consume('bucket', 1, 3)
+
+        later = time.time() + 2.9
+        with patch('time.time', return_value=later):
+            assert take(throttle, 10) == 3
+
+    def test_refused_not_counted(self, throttle):
+        """Test refused requests don't delay the next token"""
+        take(throttle, 50)
+
+        later = time.time() + 1.1
+        with patch('time.time', return_value=later):
+            assert take(throttle, 5) == 1
+
+    def test_keys_expire(self, throttle):
+        """Test buckets of idle clients are dropped, and start full"""
+        take(throttle, 5)
+
+        later = time.time() + 60
+        with patch('time.time', return_value=later):
+            assert take(throttle, 5) == 3
+
+    def test_concurrent(self):
+        """Test concurrent requests never take more than the burst"""
+        threads, burst = 16, 20
+        start = threading.Barrier(threads)
+        allowed = []
+
+        def client():
+            throttle = TokenBucketThrottle()
+            start.wait()
+            allowed.append(sum(
+                throttle.consume('bucket', 1 / 3600, burst)
+                for _ in range(5)
+            ))
+
+        workers = [threading.Thread(target=client) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        assert sum(allowed) == burst
+
+    def test_concurrent_after_idle(self):
+        """Test parallel requests of an idle client take one token each"""
+        throttle = TokenBucketThrottle()
+        # Early in a 10 s refill period, the requests come late in it.
+        start = time.time() // 10 * 10 + 0.5
+        with patch('time.time', return_value=start):
+            throttle.consume('bucket', 20, 200)
+
+        threads = 8
+        barrier = threading.Barrier(threads)
+        allowed = []
+        get = LocMemCache.get
+
+        def slow_get(cache, *args, **kwargs):
+            # Let every request read before any of them writes.
+            value = get(cache, *args, **kwargs)
+            time.sleep(0.01)
+            return value
+
+        def client():
+            barrier.wait()
+            allowed.append(TokenBucketThrottle().consume('bucket', 20, 200))
+
+        with patch('time.time', return_value=start + 9), \
+                patch.object(LocMemCache, 'get', slow_get), \
+                patch('core.throttling.LOCK_WAIT', 1):
+            workers = [
+                threading.Thread(target=client) for _ in range(threads)
+            ]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+
+        assert allowed == [True] * threads
+        with patch('time.time', return_value=start + 9):
+            assert take(throttle, 300, rate=20, burst=200) == 200 - threads
+
+    def test_buckets_separate(self, throttle):
+        """Test each key has its own bucket"""
+        take(throttle, 5)
+
+        assert throttle.consume('other', 1, 3)
+
+
+class TestThrottledViews:
+
+    @pytest.mark.django_db
+    def test_token_quota(self):
+        """Test token requests are refused past their burst"""
+        client = APIClient()
+        payload = {'email': 'test@user.com', 'password': 'wrong'}
+
+        for _ in range(5):
+            res = client.post(TOKEN_URL, payload)
+            assert res.status_code == status.HTTP_400_BAD_REQUEST
+        res = client.post(TOKEN_URL, payload)
+
+        assert res.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert int(res['Retry-After']) > 0
+
+    @pytest.mark.django_db
+    def test_per_user_and_endpoint(self, settings):
+        """Test users have separate buckets for each endpoint"""
+        settings.THROTTLE_BURSTS = {**settings.THROTTLE_BURSTS, 'user': 2}
+        client = authenticated_client('test@user.com')
+
+        statuses = [client.get(TAGS_URL).status_code for _ in range(3)]
+
+        assert statuses[-1] == status.HTTP_429_TOO_MANY_REQUESTS
+        assert client.get(INGREDIENTS_URL).status_code == status.HTTP_200_OK
+        other = authenticated_client('other@user.com')
+        assert other.get(TAGS_URL).status_code == status.HTTP_200_OK
+
+    @pytest.mark.django_db
+    def test_refusals_counted(self, settings):
+        """Test refused requests are counted by scope"""
+        settings.THROTTLE_BURSTS = {**settings.THROTTLE_BURSTS, 'user': 1}
+        client = authenticated_client('test@user.com')
+
+        with patch('core.throttling.metrics.THROTTLED_REQUESTS') as counter:
+            client.get(TAGS_URL)
+            client.get(TAGS_URL)
+
+        counter.inc.assert_called_once_with('user')
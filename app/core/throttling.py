@@ -0,0 +1,141 @@
+"""Token bucket rate limits shared by every worker
+
+Each client gets buckets holding up to THROTTLE_BURSTS[scope] requests,
+refilled at the scope's rate from DEFAULT_THROTTLE_RATES, so short bursts
+pass while the sustained rate is capped:
+
+    REST_FRAMEWORK = {
+        'DEFAULT_THROTTLE_CLASSES': (
+            'core.throttling.EndpointThrottle',
+            'core.throttling.ScopedThrottle',
+        ),
+        'DEFAULT_THROTTLE_RATES': {'user': '1200/min', 'upload': '60/hour'},
+    }
+    THROTTLE_BURSTS = {'user': 200, 'upload': 10}
+
+A bucket is one key in the 'shared' cache holding its tokens and the
+time they were counted. A check takes the bucket's lock, a key added
+with `cache.add` so only one request of any worker holds it, tops the
+tokens up for the time passed, capped at the burst, takes one and
+writes the bucket back. Reading and writing under the lock makes the
+check one atomic step, so concurrent requests can't overdraw a bucket or
+undo each other's updates. Requests finding the lock held retry for up
+to LOCK_WAIT seconds, then are refused. A check costs four cache round
+trips, three when refused; buckets of idle clients expire once full.
+"""
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from core import metrics
+
+_PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+# Seconds a check may wait for, and hold, a bucket's lock
+LOCK_WAIT = 0.1
+LOCK_TIMEOUT = 1
+
+
+def parse_rate(rate):
+    """Return (requests per second, requests) of a rate like '100/min'"""
+    requests, period = rate.split('/')
+    requests = int(requests)
+    return requests / _PERIODS[period[0]], requests
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """Allow a burst of requests, then a steady rate, per cache key"""
+    cache_alias = 'shared'
+
+    def __init__(self):
+        self.wait_seconds = None
+
+    def get_scope(self, request, view):
+        """Return the scope whose rate applies, None to not throttle"""
+        raise NotImplementedError
+
+    def get_cache_key(self, request, view, scope):
+        raise NotImplementedError
+
+    def get_client(self, request):
+        """Return the user, or the address of anonymous clients"""
+        if request.user and request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        return f'ip:{self.get_ident(request)}'
+
+    def allow_request(self, request, view):
+        scope = self.get_scope(request, view)
+        if scope is None:
+            return True
+        rate, requests = parse_rate(api_settings.DEFAULT_THROTTLE_RATES[scope])
+        burst = settings.THROTTLE_BURSTS.get(scope, requests)
+        if self.consume(self.get_cache_key(request, view, scope), rate, burst):
+            return True
+        metrics.THROTTLED_REQUESTS.inc(scope)
+        return False
+
+    def consume(self, key, rate, burst):
+        """Take a token from the bucket at key, False when it's empty"""
+        cache = caches[self.cache_alias]
+        lock_key = f'{key}:lock'
+        # An idle bucket is full again after this long.
+        timeout = math.ceil(burst / rate) + 1
+
+        deadline = time.monotonic() + LOCK_WAIT
+        while not cache.add(lock_key, 1, LOCK_TIMEOUT):
+            if time.monotonic() >= deadline:
+                self.wait_seconds = 1 / rate
+                return False
+            time.sleep(0.001)
+        try:
+            now = time.time()
+            tokens, counted = cache.get(key) or (burst, now)
+            # Clocks of workers may disagree, time never runs back.
+            tokens = min(burst, tokens + max(0, now - counted) * rate)
+            if tokens < 1:
+                self.wait_seconds = (1 - tokens) / rate
+                return False
+            cache.set(key, (tokens - 1, max(now, counted)), timeout)
+            return True
+        finally:
+            cache.delete(lock_key)
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class EndpointThrottle(TokenBucketThrottle):
+    """Limit each user, or anonymous address, per endpoint
+
+    Uses the 'user' rate for authenticated requests and 'anon' otherwise,
+    with one bucket per view and action.
+    """
+
+    def get_scope(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return 'user'
+        return 'anon'
+
+    def get_cache_key(self, request, view, scope):
+        endpoint = getattr(view, 'action', None) or request.method.lower()
+        return (
+            f'throttle:{scope}:{type(view).__name__}.{endpoint}:'
+            f'{self.get_client(request)}'
+        )
+
+
+class ScopedThrottle(TokenBucketThrottle):
+    """Apply the quota of views, or actions, that set throttle_scope
+
+    Views sharing a scope share one bucket per client.
+    """
+
+    def get_scope(self, request, view):
+        return getattr(view, 'throttle_scope', None)
+
+    def get_cache_key(self, request, view, scope):
+        return f'throttle:{scope}:{self.get_client(request)}'
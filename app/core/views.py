@@ -0,0 +1,38 @@
+from django.http import HttpResponse
+from django.views.decorators.http import require_GET
+
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.batch import BatchSerializer, run_batch
+from core.metrics import exposition
+
+
+@require_GET
+def metrics(request):
+    """Expose metrics in the Prometheus text format
+
+    Unauthenticated like any scrape target, keep it off the public
+    internet at the proxy.
+    """
+    return HttpResponse(
+        exposition(), content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+
+class BatchView(APIView):
+    """Serve several API requests at once, see core.batch"""
+    authentication_classes = (TokenAuthentication, )
+    permission_classes = (IsAuthenticated, )
+
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        responses = run_batch(
+            request,
+            serializer.validated_data['requests'],
+            serializer.validated_data['parallel'],
+        )
+        return Response({'responses': responses})
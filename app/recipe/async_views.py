@@ -0,0 +1,112 @@
+"""Async read-only views for tags, ingredients and recipes
+
+Under ASGI, DRF's sync views are run through thread sensitive
+sync_to_async, which funnels every request's database work onto one
+shared thread. These views instead do all of a request's database work,
+authentication included, in a single hop to the default thread pool, so
+requests are served in parallel with one connection per pool thread.
+
+Each view checks the throttles of the sync viewset action it mirrors, so
+both share the client's buckets.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.http import HttpResponse, HttpResponseNotAllowed
+
+from rest_framework import exceptions, status
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.request import Request
+
+from core.models import Recipe, Tag, Ingredient
+from core.renderers import FastJSONRenderer
+
+from recipe import serializers, queries, views
+
+
+def _read(reader, throttled_view, request, *args, **kwargs):
+    try:
+        credentials = TokenAuthentication().authenticate(request)
+        if credentials is None:
+            raise exceptions.NotAuthenticated()
+        api_request = Request(request)
+        api_request.user = credentials[0]
+        throttled_view.check_throttles(api_request)
+        data = reader(credentials[0], request, *args, **kwargs)
+        return data, status.HTTP_200_OK, {}
+    except exceptions.APIException as exc:
+        headers = {}
+        if getattr(exc, 'wait', None):
+            headers['Retry-After'] = '%d' % exc.wait
+        return {'detail': exc.detail}, exc.status_code, headers
+    finally:
+        # Pool threads outlive the request, so release the connection the
+        # way request_finished does for sync views.
+        close_old_connections()
+
+
+def async_read_view(viewset, action):
+    """Turn reader(user, request, ...) into a token authenticated async view
+
+    The reader runs in the thread pool and returns the response data.
+    Requests are throttled like viewset's action.
+    """
+    # Throttles only read the view's class, action and throttle_scope.
+    throttled_view = viewset(action=action)
+
+    def decorator(reader):
+        @wraps(reader)
+        async def view(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return HttpResponseNotAllowed(['GET', 'HEAD'])
+            data, status_code, headers = await sync_to_async(
+                _read, thread_sensitive=False
+            )(reader, throttled_view, request, *args, **kwargs)
+            response = HttpResponse(
+                FastJSONRenderer().render(data),
+                content_type='application/json',
+                status=status_code,
+            )
+            for name, value in headers.items():
+                response[name] = value
+            if status_code == status.HTTP_401_UNAUTHORIZED:
+                response['WWW-Authenticate'] = 'Token'
+            return response
+
+        return view
+
+    return decorator
+
+
+@async_read_view(views.TagViewSet, 'list')
+def tag_list(user, request):
+    """List the authenticated user's tags"""
+    queryset = queries.filter_attributes(Tag.objects.all(), request.GET, user)
+    return serializers.FastTagSerializer(queryset).data
+
+
+@async_read_view(views.IngredientViewSet, 'list')
+def ingredient_list(user, request):
+    """List the authenticated user's ingredients"""
+    queryset = queries.filter_attributes(
+        Ingredient.objects.all(), request.GET, user
+    )
+    return serializers.FastIngredientSerializer(queryset).data
+
+
+@async_read_view(views.RecipeViewSet, 'list')
+def recipe_list(user, request):
+    """List the authenticated user's recipes"""
+    queryset = queries.filter_recipes(Recipe.objects.all(), request.GET, user)
+    return serializers.FastRecipeSerializer(queryset).data
+
+
+@async_read_view(views.RecipeViewSet, 'retrieve')
+def recipe_detail(user, request, pk):
+    """Retrieve one of the authenticated user's recipes"""
+    try:
+        recipe = Recipe.objects.get(user=user, pk=pk)
+    except Recipe.DoesNotExist:
+        raise exceptions.NotFound()
+    return serializers.RecipeDetailSerializer(recipe).data
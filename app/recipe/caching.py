@@ -0,0 +1,113 @@
+"""Cached recipe payloads, see core.caching"""
+import hashlib
+from functools import partial
+
+from django.db import transaction
+from django.shortcuts import get_object_or_404
+
+from core.caching import HotCache
+from core.cdn import purge
+from core.models import Recipe
+from core.renderers import FastJSONRenderer
+
+from recipe import serializers
+
+recipe_details = HotCache('recipe_detail', ttl=300, stale_ttl=60)
+
+
+def detail_key(user_id, recipe_id):
+    return f'{user_id}:{recipe_id}'
+
+
+def recipe_detail(user_id, recipe_id):
+    """Return the RecipeDetailSerializer data of a user's recipe"""
+    recipe = get_object_or_404(
+        Recipe.objects.prefetch_related('tags', 'ingredients'),
+        user_id=user_id, pk=recipe_id,
+    )
+    return serializers.RecipeDetailSerializer(recipe).data
+
+
+def cached_recipe_detail(user_id, recipe_id):
+    return recipe_details.get(
+        detail_key(user_id, recipe_id),
+        partial(recipe_detail, user_id, recipe_id),
+    )
+
+
+def invalidate_recipes(pairs):
+    """Drop the cached payloads of (user id, recipe id) pairs
+
+    Dropped now and again on commit, so a worker that read the rows
+    before the change committed doesn't keep its stale copy: the commit
+    time invalidation moves the key's generation and the value isn't
+    stored, see core.caching.
+    """
+    keys = [detail_key(user_id, recipe_id) for user_id, recipe_id in pairs]
+    if not keys:
+        return
+    recipe_details.invalidate(*keys)
+    transaction.on_commit(lambda: recipe_details.invalidate(*keys))
+
+
+public_recipes = HotCache('public_recipe', ttl=300, stale_ttl=60)
+
+
+def slug_key(slug):
+    # Tags the 404 served before a slug is published, too.
+    return f'slug-{slug}'
+
+
+def surrogate_keys(recipe):
+    """Return the CDN surrogate keys of a public recipe's response"""
+    return [
+        f'recipe-{recipe.pk}',
+        slug_key(recipe.slug),
+        *(f'tag-{tag.pk}' for tag in recipe.tags.all()),
+        *(f'ingredient-{ingredient.pk}'
+          for ingredient in recipe.ingredients.all()),
+    ]
+
+
+def public_recipe(slug):
+    """Return the rendered response of a public recipe, None if missing
+
+    The value is a dict of the JSON `body`, its `etag` and the surrogate
+    `keys`.
+    """
+    recipe = Recipe.objects.prefetch_related('tags', 'ingredients').filter(
+        slug=slug, is_public=True,
+    ).first()
+    if recipe is None:
+        return None
+    body = FastJSONRenderer().render(
+        serializers.PublicRecipeSerializer(recipe).data
+    )
+    return {
+        'body': body,
+        'etag': '"{}"'.format(hashlib.md5(body).hexdigest()),
+        'keys': surrogate_keys(recipe),
+    }
+
+
+def cached_public_recipe(slug):
+    return public_recipes.get(slug, partial(public_recipe, slug))
+
+
+def invalidate_public_recipes(rows, keys=None):
+    """Drop the cached responses of (recipe id, slug) rows
+
+    Drops them here as invalidate_recipes does, and purges the surrogate
+    `keys` from the CDN once the transaction commits, by default the
+    rows' own. Rows without a slug were never public and are skipped.
+    """
+    rows = [(recipe_id, slug) for recipe_id, slug in rows if slug]
+    if not rows:
+        return
+    slugs = [slug for _, slug in rows]
+    public_recipes.invalidate(*slugs)
+    transaction.on_commit(lambda: public_recipes.invalidate(*slugs))
+    if keys is None:
+        keys = [f'recipe-{recipe_id}' for recipe_id, _ in rows] + \
+            [slug_key(slug) for slug in slugs]
+    purge(keys)
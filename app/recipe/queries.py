@@ -0,0 +1,48 @@
+from django.db.models import Exists, OuterRef
+
+from core.models import Recipe
+
+
+def params_to_ints(qs):
+    """convert a list of string IDs to a list of integers"""
+    return [int(str_id) for str_id in qs.split(",")]
+
+
+def filter_attributes(queryset, params, user):
+    """Filter tags or ingredients by the request's query params"""
+    assigned_only = bool(int(params.get('assigned_only', 0)))
+    if assigned_only:
+        queryset = queryset.filter(recipe__isnull=False)
+
+    return queryset.filter(user=user).order_by('-name').distinct()
+
+
+def filter_recipes(queryset, params, user):
+    """Filter recipes by the request's tags and ingredients query params"""
+    tags = params.get('tags')
+    ingredients = params.get('ingredients')
+    if tags:
+        queryset = queryset.filter(tags__id__in=params_to_ints(tags))
+    if ingredients:
+        queryset = queryset.filter(
+            ingredients__id__in=params_to_ints(ingredients)
+        )
+    return queryset.filter(user=user).order_by('-id')
+
+
+def cookable_recipes(queryset, ingredient_ids, user):
+    """Filter recipes needing no ingredient besides ingredient_ids
+
+    The candidates come from the through rows of the given ingredients,
+    so the work follows the recipes using them, not the whole library.
+    """
+    through = Recipe.ingredients.through
+    missing = through.objects.filter(
+        recipe_id=OuterRef('pk')
+    ).exclude(ingredient_id__in=ingredient_ids)
+    return queryset.filter(
+        user=user,
+        id__in=through.objects.filter(
+            ingredient_id__in=ingredient_ids
+        ).values('recipe_id'),
+    ).exclude(Exists(missing)).order_by('-id')
@@ -0,0 +1,394 @@
+"""Nested reads in the shape the client asks for
+
+A subset of GraphQL: one anonymous query of fields, aliases and literal
+arguments, without variables, fragments or directives.
+
+    {
+      recipes(tags: [1, 2], limit: 20) {
+        id title price
+        tags { name }
+        ingredients { id name }
+      }
+      me { email }
+    }
+
+Each field selecting objects is resolved with one `.values()` query for
+all of its parents at once, the dataloader pattern: the query above runs
+four SQL statements whatever the number of recipes. A query runs at most
+one statement per field with a selection set, and QUERY_MAX_FIELDS and
+QUERY_MAX_DEPTH bound those.
+"""
+import re
+from collections import defaultdict, namedtuple
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+
+from core.models import Recipe, Tag, Ingredient
+from recipe.serializers import _decimal_formatter
+
+
+class QueryError(Exception):
+    """The query can't be parsed or doesn't fit the schema"""
+
+
+Field = namedtuple('Field', 'alias name arguments selections')
+
+# How a type links to another: the lookup from the target model back to
+# the parent, and whether a parent has several targets.
+Relation = namedtuple('Relation', 'type lookup many')
+
+
+class Type:
+    """Fields of a model that queries may select"""
+
+    def __init__(self, model, fields, relations, owner='user'):
+        self.model = model
+        self.name = model.__name__
+        self.fields = fields
+        self.relations = relations
+        self.owner = owner
+
+    def queryset(self, user):
+        """Return the objects of this type user may read"""
+        return self.model.objects.filter(**{self.owner: user.pk})
+
+    def formatters(self, request):
+        """Map each field to a callable formatting its values, or None"""
+        formatters = {}
+        for name in self.fields:
+            model_field = self.model._meta.get_field(name)
+            internal_type = model_field.get_internal_type()
+            if internal_type == 'DecimalField':
+                formatters[name] = _decimal_formatter(model_field)
+            elif internal_type in ('FileField', 'ImageField'):
+                formatters[name] = _file_url_formatter(request)
+            else:
+                formatters[name] = None
+        return formatters
+
+
+def _file_url_formatter(request):
+    def format_file(value):
+        if not value:
+            return None
+        return request.build_absolute_uri(default_storage.url(value))
+    return format_file
+
+
+TYPES = {
+    'Recipe': Type(
+        Recipe,
+        ('id', 'title', 'time_minutes', 'price', 'link', 'image'),
+        {
+            'tags': Relation('Tag', 'recipe', True),
+            'ingredients': Relation('Ingredient', 'recipe', True),
+            'user': Relation('User', 'recipe', False),
+        },
+    ),
+    'Tag': Type(
+        Tag, ('id', 'name'),
+        {'recipes': Relation('Recipe', 'tags', True)},
+    ),
+    'Ingredient': Type(
+        Ingredient, ('id', 'name'),
+        {'recipes': Relation('Recipe', 'ingredients', True)},
+    ),
+    'User': Type(
+        get_user_model(), ('id', 'email', 'name'),
+        {
+            'recipes': Relation('Recipe', 'user', True),
+            'tags': Relation('Tag', 'user', True),
+            'ingredients': Relation('Ingredient', 'user', True),
+        },
+        owner='pk',
+    ),
+}
+
+TOKEN = re.compile(r'''
+    (?P<skip>[\s,]+|\#[^\n]*)
+    | (?P<punctuation>[{}():\[\]])
+    | (?P<name>[_A-Za-z][_0-9A-Za-z]*)
+    | (?P<number>-?\d+)
+    | (?P<string>"(?:[^"\\\n]|\\.)*")
+''', re.VERBOSE)
+LITERALS = {'true': True, 'false': False, 'null': None}
+
+
+def tokenize(query):
+    """Return the (kind, text) tokens of query"""
+    tokens = []
+    position = 0
+    while position < len(query):
+        match = TOKEN.match(query, position)
+        if match is None:
+            raise QueryError(f'Unexpected character at {position}.')
+        if match.lastgroup != 'skip':
+            tokens.append((match.lastgroup, match.group()))
+        position = match.end()
+    return tokens
+
+
+class Parser:
+    """Recursive descent parser turning a query into Field trees
+
+    The size limits are checked while parsing, so deep queries can't
+    exhaust the stack.
+    """
+
+    def __init__(self, query):
+        self.tokens = tokenize(query)
+        self.position = 0
+        self.depth = 0
+        self.fields = 0
+
+    def peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return (None, None)
+
+    def take(self, kind, text=None):
+        token_kind, token_text = self.peek()
+        if token_kind != kind or (text is not None and token_text != text):
+            expected = text or kind
+            found = token_text or 'the end of the query'
+            raise QueryError(f'Expected {expected}, found {found}.')
+        self.position += 1
+        return token_text
+
+    def document(self):
+        if self.peek() == ('name', 'query'):
+            self.take('name')
+            if self.peek()[0] == 'name':
+                self.take('name')
+        selections = self.selection_set()
+        if self.peek()[0] is not None:
+            raise QueryError('Only one query can be sent at a time.')
+        return selections
+
+    def selection_set(self):
+        self.depth += 1
+        if self.depth > settings.QUERY_MAX_DEPTH:
+            raise QueryError(
+                f'Queries may nest {settings.QUERY_MAX_DEPTH} levels deep.'
+            )
+        self.take('punctuation', '{')
+        fields = [self.field()]
+        while self.peek() != ('punctuation', '}'):
+            fields.append(self.field())
+        self.take('punctuation', '}')
+        self.depth -= 1
+        return fields
+
+    def field(self):
+        self.fields += 1
+        if self.fields > settings.QUERY_MAX_FIELDS:
+            raise QueryError(
+                f'Queries may select {settings.QUERY_MAX_FIELDS} fields.'
+            )
+        alias = name = self.take('name')
+        if self.peek() == ('punctuation', ':'):
+            self.take('punctuation', ':')
+            name = self.take('name')
+        arguments = {}
+        if self.peek() == ('punctuation', '('):
+            self.take('punctuation', '(')
+            while self.peek() != ('punctuation', ')'):
+                argument = self.take('name')
+                self.take('punctuation', ':')
+                arguments[argument] = self.value()
+            self.take('punctuation', ')')
+        selections = None
+        if self.peek() == ('punctuation', '{'):
+            selections = self.selection_set()
+        return Field(alias, name, arguments, selections)
+
+    def value(self, in_list=False):
+        kind, text = self.peek()
+        if kind == 'number':
+            self.position += 1
+            return int(text)
+        if kind == 'string':
+            self.position += 1
+            return re.sub(r'\\(.)', r'\1', text[1:-1])
+        if kind == 'name' and text in LITERALS:
+            self.position += 1
+            return LITERALS[text]
+        if (kind, text) == ('punctuation', '[') and not in_list:
+            self.position += 1
+            values = []
+            while self.peek() != ('punctuation', ']'):
+                values.append(self.value(in_list=True))
+            self.take('punctuation', ']')
+            return values
+        raise QueryError(f'Expected a value, found {text}.')
+
+
+def parse(query):
+    """Return the root fields of query"""
+    return Parser(query).document()
+
+
+def _ids(arguments, name):
+    ids = arguments.get(name)
+    if ids is None:
+        return None
+    if not isinstance(ids, list) or \
+            not all(isinstance(item, int) for item in ids):
+        raise QueryError(f'{name} must be a list of ids.')
+    return ids
+
+
+def _window(queryset, arguments):
+    maximum = settings.QUERY_MAX_LIMIT
+    limit = arguments.get('limit', maximum)
+    offset = arguments.get('offset', 0)
+    if not isinstance(limit, int) or not 0 < limit <= maximum:
+        raise QueryError(f'limit must be from 1 to {maximum}.')
+    if not isinstance(offset, int) or offset < 0:
+        raise QueryError('offset must not be negative.')
+    return queryset[offset:offset + limit]
+
+
+def _recipes(user, arguments):
+    queryset = TYPES['Recipe'].queryset(user)
+    tags = _ids(arguments, 'tags')
+    ingredients = _ids(arguments, 'ingredients')
+    if tags is not None:
+        queryset = queryset.filter(tags__id__in=tags)
+    if ingredients is not None:
+        queryset = queryset.filter(ingredients__id__in=ingredients)
+    if tags is not None or ingredients is not None:
+        queryset = queryset.distinct()
+    return _window(queryset.order_by('-id'), arguments)
+
+
+def _me(user, arguments):
+    return TYPES['User'].queryset(user)
+
+
+def _recipe(user, arguments):
+    if not isinstance(arguments.get('id'), int):
+        raise QueryError('recipe needs an id.')
+    return TYPES['Recipe'].queryset(user).filter(id=arguments['id'])
+
+
+def _attributes(type_name):
+    def resolve(user, arguments):
+        queryset = TYPES[type_name].queryset(user)
+        if arguments.get('assigned_only'):
+            queryset = queryset.filter(recipe__isnull=False).distinct()
+        return _window(queryset.order_by('-name'), arguments)
+    return resolve
+
+
+# Root fields: their type, whether they return a list, and a function
+# returning their queryset from the user and the field arguments.
+ROOTS = {
+    'me': ('User', False, _me),
+    'recipe': ('Recipe', False, _recipe),
+    'recipes': ('Recipe', True, _recipes),
+    'tags': ('Tag', True, _attributes('Tag')),
+    'ingredients': ('Ingredient', True, _attributes('Ingredient')),
+}
+
+
+class Executor:
+    """Resolve parsed fields for a request, one query per object field"""
+
+    def __init__(self, request):
+        self.request = request
+        self.user = request.user
+        self._formatters = {}
+
+    def formatters(self, type_):
+        if type_.name not in self._formatters:
+            self._formatters[type_.name] = type_.formatters(self.request)
+        return self._formatters[type_.name]
+
+    def execute(self, fields):
+        data = {}
+        for field in fields:
+            if field.name not in ROOTS:
+                raise QueryError(f'Unknown field {field.name} on Query.')
+            type_name, many, resolve = ROOTS[field.name]
+            if not field.selections:
+                raise QueryError(f'{field.name} needs a selection of fields.')
+            queryset = resolve(self.user, field.arguments)
+            objects = [
+                obj for _, obj in
+                self.resolve(TYPES[type_name], queryset, field.selections)
+            ]
+            data[field.alias] = objects if many else (
+                objects[0] if objects else None
+            )
+        return data
+
+    def resolve(self, type_, queryset, selections, key=None):
+        """Return (key value, object) for each row of queryset
+
+        key names the column linking the rows to their parents.
+        """
+        scalars, relations = [], []
+        for field in selections:
+            if field.name in type_.fields:
+                if field.selections is not None:
+                    raise QueryError(
+                        f'{field.name} on {type_.name} has no fields.'
+                    )
+                scalars.append(field)
+            elif field.name in type_.relations:
+                if not field.selections:
+                    raise QueryError(
+                        f'{field.name} on {type_.name} needs a selection '
+                        'of fields.'
+                    )
+                relations.append(field)
+            else:
+                raise QueryError(
+                    f'Unknown field {field.name} on {type_.name}.'
+                )
+
+        formatters = self.formatters(type_)
+        columns = {'id', *(field.name for field in scalars)}
+        if key is not None:
+            columns.add(key)
+        pairs = []
+        objects = {}
+        for row in queryset.values(*columns):
+            obj = objects.get(row['id'])
+            if obj is None:
+                obj = objects[row['id']] = {}
+                for field in scalars:
+                    value = row[field.name]
+                    formatter = formatters[field.name]
+                    obj[field.alias] = formatter(value) if formatter \
+                        else value
+            pairs.append((row.get(key), obj))
+
+        for field in relations:
+            relation = type_.relations[field.name]
+            target = TYPES[relation.type]
+            children = defaultdict(list)
+            if objects:
+                queryset = target.queryset(self.user).filter(
+                    **{f'{relation.lookup}__in': list(objects)}
+                ).order_by('id')
+                for parent_id, child in self.resolve(
+                    target, queryset, field.selections, relation.lookup
+                ):
+                    children[parent_id].append(child)
+            for object_id, obj in objects.items():
+                found = children.get(object_id, [])
+                obj[field.alias] = found if relation.many else (
+                    found[0] if found else None
+                )
+        return pairs
+
+
+def execute(query, request):
+    """Run query for the request's user and return the data"""
+    if not isinstance(query, str) or not query.strip():
+        raise QueryError('Send the query as a string.')
+    return Executor(request).execute(parse(query))
@@ -1,9 +1,63 @@
+import decimal
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+
 from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+from rest_framework.settings import api_settings
+
+from core.instrumentation import TimedSerializerMixin, timer
+from core.models import Tag, Ingredient, Recipe, RecipeImport
+
+
+class BulkManyRelatedField(serializers.ManyRelatedField):
+    """Many related field resolving all primary keys in one query"""
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        return self.child_relation.to_internal_value_many(data)
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """PrimaryKeyRelatedField whose many=True form validates in bulk
 
-from core.models import Tag, Ingredient, Recipe
+    The stock field runs a query per primary key in the payload.
+    """
 
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
 
-class TagSerializer(serializers.ModelSerializer):
+    def to_internal_value_many(self, data):
+        """Return the objects for a list of primary keys, in order"""
+        if self.pk_field is not None:
+            data = [self.pk_field.to_internal_value(item) for item in data]
+        queryset = self.get_queryset()
+        pk = queryset.model._meta.pk
+        pks = []
+        for item in data:
+            try:
+                if isinstance(item, bool):
+                    raise TypeError
+                pks.append(pk.to_python(item))
+            except (TypeError, ValueError, ValidationError):
+                self.fail('incorrect_type', data_type=type(item).__name__)
+        found = queryset.in_bulk(set(pks))
+        for item, value in zip(data, pks):
+            if value not in found:
+                self.fail('does_not_exist', pk_value=item)
+        return [found[value] for value in pks]
+
+
+class TagSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for tag objects"""
 
     class Meta:
@@ -12,7 +66,7 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serializer for ingredient objects"""
 
     class Meta:
@@ -21,14 +75,14 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serialize a recipe"""
-    ingredients = serializers.PrimaryKeyRelatedField(
+    ingredients = BulkPrimaryKeyRelatedField(
         many=True,
         queryset=Ingredient.objects.all()
 
     )
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = BulkPrimaryKeyRelatedField(
         many=True,
         queryset=Tag.objects.all()
     )
@@ -48,10 +102,208 @@ class RecipeDetailSerializer(RecipeSerializer):
     ingredients = IngredientSerializer(many=True, read_only=True)
     tags = TagSerializer(many=True, read_only=True)
 
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ('is_public', 'slug')
+        read_only_fields = ('id', 'is_public', 'slug')
 
-class RecipeImageSerializer(serializers.ModelSerializer):
+
+class PublicRecipeSerializer(TimedSerializerMixin,
+                             serializers.ModelSerializer):
+    """Serialize a published recipe for anyone, without its owner"""
+    ingredients = IngredientSerializer(many=True, read_only=True)
+    tags = TagSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Recipe
+        fields = (
+            'slug', 'title', 'ingredients', 'tags', 'time_minutes',
+            'price', 'link', 'image'
+        )
+        read_only_fields = fields
+
+
+class RecipeImageSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Serialzier for uploading image to recipes"""
     class Meta:
         model = Recipe
         fields = ('id', 'image')
         read_only_fields = ('id',)
+
+
+class RecipeImportSerializer(serializers.ModelSerializer):
+    """Serializer for uploading a recipe import and reporting progress"""
+    format = serializers.ChoiceField(
+        choices=RecipeImport.FORMAT_CHOICES, required=False
+    )
+
+    class Meta:
+        model = RecipeImport
+        fields = (
+            'id', 'file', 'format', 'status', 'rows_processed',
+            'recipes_created', 'rows_failed', 'errors', 'error',
+            'created_at', 'updated_at',
+        )
+        read_only_fields = (
+            'id', 'status', 'rows_processed', 'recipes_created',
+            'rows_failed', 'errors', 'error', 'created_at', 'updated_at',
+        )
+        extra_kwargs = {'file': {'write_only': True}}
+
+    def validate(self, attrs):
+        """Take the format from the file extension when not given"""
+        if not attrs.get('format'):
+            extension = attrs['file'].name.rsplit('.', 1)[-1].lower()
+            formats = {'csv': RecipeImport.CSV, 'ndjson': RecipeImport.NDJSON,
+                       'jsonl': RecipeImport.NDJSON}
+            if extension not in formats:
+                raise serializers.ValidationError(
+                    {'format': 'Give the format of this file.'}
+                )
+            attrs['format'] = formats[extension]
+        return attrs
+
+
+class RecipeDuplicateSerializer(serializers.Serializer):
+    """Serializer for duplicating a batch of recipes"""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=500,
+    )
+
+    def validate_ids(self, value):
+        """Check every recipe belongs to the authenticated user"""
+        user = self.context['request'].user
+        owned = set(
+            Recipe.objects.filter(user=user, id__in=value)
+            .values_list('id', flat=True)
+        )
+        missing = sorted(set(value) - owned)
+        if missing:
+            raise serializers.ValidationError(
+                f'Invalid recipe ids: {missing}'
+            )
+        return value
+
+
+class ShoppingListSerializer(serializers.Serializer):
+    """Serializer for a meal plan, recipes cooked twice are listed twice"""
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+    )
+
+    def validate_recipes(self, value):
+        if len(value) > settings.SHOPPING_LIST_MAX_RECIPES:
+            raise serializers.ValidationError(
+                f'At most {settings.SHOPPING_LIST_MAX_RECIPES} recipes.'
+            )
+        return value
+
+
+def _decimal_formatter(model_field):
+    """Return a callable formatting decimals like DRF's DecimalField"""
+    exponent = decimal.Decimal(1).scaleb(-model_field.decimal_places)
+    context = decimal.getcontext().copy()
+    context.prec = model_field.max_digits
+    empty = '' if api_settings.COERCE_DECIMAL_TO_STRING else None
+
+    def format_decimal(value):
+        if value is None:
+            return empty
+        quantized = value.quantize(exponent, context=context)
+        if empty is None:
+            return quantized
+        return '{:f}'.format(quantized)
+
+    return format_decimal
+
+
+class FastValuesSerializer:
+    """Read-only serializer building dicts directly from `.values()` rows
+
+    The field plan is compiled once per class, so serializing a row is a
+    tuple walk instead of DRF's per-field `to_representation` dispatch.
+    Many to many fields are fetched with one query per relation, using the
+    queryset as a subquery, and rendered as lists of primary keys.
+    """
+    model = None
+    fields = ()
+    many_to_many = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        opts = cls.model._meta
+        plan = []
+        for name in cls.fields:
+            model_field = opts.get_field(name)
+            formatter = None
+            if model_field.get_internal_type() == 'DecimalField':
+                formatter = _decimal_formatter(model_field)
+            plan.append((name, formatter))
+        cls._plan = tuple(plan)
+        cls._columns = tuple(
+            name for name in cls.fields if name not in cls.many_to_many
+        )
+        cls._relations = tuple(
+            (
+                name,
+                opts.get_field(name).remote_field.through,
+                opts.get_field(name).m2m_column_name(),
+                opts.get_field(name).m2m_reverse_name(),
+            )
+            for name in cls.many_to_many
+        )
+
+    def __init__(self, queryset):
+        self.queryset = queryset
+
+    def _related_ids(self):
+        """Map each relation to {row pk: [related pks]} for the queryset"""
+        pks = self.queryset.order_by().values('pk')
+        related = {}
+        for name, through, source, target in self._relations:
+            by_pk = {}
+            pairs = through.objects.filter(
+                **{f'{source}__in': pks}
+            ).order_by('pk').values_list(source, target)
+            for pk, related_pk in pairs:
+                by_pk.setdefault(pk, []).append(related_pk)
+            related[name] = by_pk
+        return related
+
+    @property
+    def data(self):
+        with timer('serializer'):
+            rows = list(self.queryset.values(*self._columns))
+            if rows and self._relations:
+                for name, by_pk in self._related_ids().items():
+                    for row in rows:
+                        row[name] = by_pk.get(row['id'], [])
+            plan = self._plan
+            return [
+                {
+                    name: formatter(row[name]) if formatter else row[name]
+                    for name, formatter in plan
+                }
+                for row in rows
+            ]
+
+
+class FastTagSerializer(FastValuesSerializer):
+    """Read-only fast serializer matching TagSerializer output"""
+    model = Tag
+    fields = TagSerializer.Meta.fields
+
+
+class FastIngredientSerializer(FastValuesSerializer):
+    """Read-only fast serializer matching IngredientSerializer output"""
+    model = Ingredient
+    fields = IngredientSerializer.Meta.fields
+
+
+class FastRecipeSerializer(FastValuesSerializer):
+    """Read-only fast serializer matching RecipeSerializer output"""
+    model = Recipe
+    fields = RecipeSerializer.Meta.fields
+    many_to_many = ('ingredients', 'tags')
@@ -0,0 +1,93 @@
+"""Shopping lists merging the ingredients of a meal plan
+
+    POST /api/recipe/shopping-list/
+    {"recipes": [12, 12, 31]}
+
+returns each ingredient the planned recipes use once, by name:
+
+    [{"id": 4, "name": "Eggs", "count": 3, "recipes": [12, 31]}, ...]
+
+`count` is the number of planned recipes needing the ingredient, a
+recipe planned twice counting twice, and `recipes` the ids of those
+recipes. Ids of recipes outside the user's library are ignored.
+
+The list is computed by one aggregate query over the recipe ingredients
+of the plan, the ids passed as an array and unnested in SQL. Plans of
+more than SHOPPING_LIST_STREAM_MIN recipes are streamed: the rows are
+fetched in the view, then encoded and sent SHOPPING_LIST_CHUNK_SIZE at
+a time, so the rendered body is never held whole. The stream doesn't
+touch the database, ASGI servers iterate it on the event loop.
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection
+from django.http import StreamingHttpResponse
+
+from core.models import Recipe, Ingredient
+from core.renderers import FastJSONRenderer
+
+COLUMNS = ('id', 'name', 'count', 'recipes')
+
+
+def shopping_list_sql():
+    quote = connection.ops.quote_name
+    recipes = quote(Recipe._meta.db_table)
+    ingredients = quote(Ingredient._meta.db_table)
+    through = quote(Recipe.ingredients.through._meta.db_table)
+    return f'''
+        SELECT ingredient.id, ingredient.name,
+               sum(plan.servings)::integer,
+               array_agg(plan.recipe_id ORDER BY plan.recipe_id)
+        FROM unnest(%(ids)s::bigint[], %(servings)s::integer[])
+             AS plan(recipe_id, servings)
+        JOIN {recipes} recipe
+             ON recipe.id = plan.recipe_id AND recipe.user_id = %(user)s
+        JOIN {through} used ON used.recipe_id = plan.recipe_id
+        JOIN {ingredients} ingredient ON ingredient.id = used.ingredient_id
+        GROUP BY ingredient.id, ingredient.name
+        ORDER BY ingredient.name, ingredient.id
+    '''
+
+
+def _params(user, recipe_ids):
+    servings = Counter(recipe_ids)
+    return {
+        'ids': list(servings), 'servings': list(servings.values()),
+        'user': user.pk,
+    }
+
+
+def _fetch(user, recipe_ids):
+    with connection.cursor() as cursor:
+        cursor.execute(shopping_list_sql(), _params(user, recipe_ids))
+        return cursor.fetchall()
+
+
+def shopping_list(user, recipe_ids):
+    """Return the merged ingredients of recipe_ids, a list of dicts"""
+    return [dict(zip(COLUMNS, row)) for row in _fetch(user, recipe_ids)]
+
+
+def _stream(rows):
+    if not rows:
+        yield b'[]'
+        return
+    render = FastJSONRenderer().render
+    size = settings.SHOPPING_LIST_CHUNK_SIZE
+    for start in range(0, len(rows), size):
+        yield (b',' if start else b'[') + b','.join(
+            render(dict(zip(COLUMNS, row)))
+            for row in rows[start:start + size]
+        )
+    yield b']'
+
+
+def streaming_shopping_list(user, recipe_ids):
+    """Return a response streaming the shopping list of recipe_ids
+
+    The query runs here, the response only encodes its rows.
+    """
+    return StreamingHttpResponse(
+        _stream(_fetch(user, recipe_ids)), content_type='application/json',
+    )
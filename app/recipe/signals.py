@@ -0,0 +1,54 @@
+"""Invalidate cached recipe payloads and pantry indexes when rows change
+
+Saving a recipe invalidates it, and forms and serializers save the
+recipe before its tags and ingredients. The API invalidates again once
+the relations are set. m2m_changed isn't used, any receiver of it makes
+Django check for existing rows before every add, a query per relation.
+Bulk inserts and the raw SQL of account deletion send no model signals.
+They only create recipes, which have nothing cached yet, or delete
+accounts, whose tokens are gone first. Public recipes are cached by
+slug, so account deletion reports the published ones it removes with
+core.deletion.recipes_deleted.
+"""
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from core.deletion import recipes_deleted
+from core.models import Recipe, Tag, Ingredient
+from core.pantry import invalidate_pantry
+
+from recipe.caching import invalidate_public_recipes, invalidate_recipes
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    invalidate_recipes([(instance.user_id, instance.pk)])
+    invalidate_public_recipes([(instance.pk, instance.slug)])
+    invalidate_pantry(instance.user_id)
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def attribute_changed(sender, instance, created=False, **kwargs):
+    if created:
+        return
+    rows = list(instance.recipe_set.values_list('user_id', 'id', 'slug'))
+    invalidate_recipes(
+        (user_id, recipe_id) for user_id, recipe_id, _ in rows
+    )
+    # Public responses carry the attribute's surrogate key, one purge
+    # drops all of them.
+    invalidate_public_recipes(
+        [(recipe_id, slug) for _, recipe_id, slug in rows],
+        keys=[f'{sender._meta.model_name}-{instance.pk}'],
+    )
+    if sender is Ingredient:
+        invalidate_pantry(*(user_id for user_id, _, _ in rows))
+
+
+@receiver(recipes_deleted)
+def published_recipes_deleted(sender, rows, **kwargs):
+    invalidate_public_recipes(rows)
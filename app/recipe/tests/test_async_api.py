@@ -0,0 +1,154 @@
+from django.contrib.auth import get_user_model
+from django.test import Client
+from django.urls import reverse
+
+import pytest
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+
+ASYNC_TAGS_URL = reverse('recipe:async-tag-list')
+ASYNC_INGREDIENTS_URL = reverse('recipe:async-ingredient-list')
+ASYNC_RECIPES_URL = reverse('recipe:async-recipe-list')
+
+
+def async_detail_url(recipe_id):
+    """Return the async recipe detail URL"""
+    return reverse('recipe:async-recipe-detail', args=[recipe_id])
+
+
+def create_user(**params):
+    return get_user_model().objects.create_user(**params)
+
+
+@pytest.fixture
+def user():
+    """A sample user for testing"""
+    new_user = create_user(
+        email='test@user.com',
+        password='testspass',
+        name='name',
+    )
+    return new_user
+
+
+@pytest.fixture
+def token_client(user):
+    """A client sending the user's auth token"""
+    token = Token.objects.create(user=user)
+    return Client(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+
+@pytest.fixture
+def user_api_client(user):
+    """An api client with a logged in user"""
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.fixture
+def recipe(user):
+    """A sample recipe with a tag and an ingredient"""
+    recipe = Recipe.objects.create(
+        user=user, title='Kale salad', time_minutes=5, price=3
+    )
+    recipe.tags.add(Tag.objects.create(user=user, name='Vegan'))
+    recipe.ingredients.add(Ingredient.objects.create(user=user, name='Kale'))
+    return recipe
+
+
+class TestAsyncRecipeApi:
+    """Test the async read endpoints match the sync ones"""
+
+    def test_auth_required(self):
+        """Test authentication is required"""
+        res = Client().get(ASYNC_RECIPES_URL)
+
+        assert res.status_code == status.HTTP_401_UNAUTHORIZED
+        assert res['WWW-Authenticate'] == 'Token'
+
+    @pytest.mark.django_db(transaction=True)
+    def test_invalid_token(self):
+        """Test an unknown token is rejected"""
+        res = Client(HTTP_AUTHORIZATION='Token nope').get(ASYNC_TAGS_URL)
+
+        assert res.status_code == status.HTTP_401_UNAUTHORIZED
+        assert res.json() == {'detail': 'Invalid token.'}
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize('async_url,sync_name', [
+        (ASYNC_TAGS_URL, 'recipe:tag-list'),
+        (ASYNC_INGREDIENTS_URL, 'recipe:ingredient-list'),
+        (ASYNC_RECIPES_URL, 'recipe:recipe-list'),
+    ])
+    def test_list_matches_sync(
+        self, token_client, user_api_client, recipe, async_url, sync_name
+    ):
+        """Test async lists return the same body as the viewsets"""
+        res = token_client.get(async_url)
+        expected = user_api_client.get(reverse(sync_name))
+
+        assert res.status_code == status.HTTP_200_OK
+        assert res.content == expected.content
+
+    @pytest.mark.django_db(transaction=True)
+    def test_filter_matches_sync(self, token_client, user_api_client, recipe):
+        """Test recipe filters are applied"""
+        params = {'tags': str(recipe.tags.get().id)}
+        res = token_client.get(ASYNC_RECIPES_URL, params)
+        expected = user_api_client.get(reverse('recipe:recipe-list'), params)
+
+        assert res.json() == expected.json()
+        assert len(res.json()) == 1
+
+    @pytest.mark.django_db(transaction=True)
+    def test_detail_matches_sync(self, token_client, user_api_client, recipe):
+        """Test the async detail returns the detail serializer output"""
+        res = token_client.get(async_detail_url(recipe.id))
+        expected = user_api_client.get(
+            reverse('recipe:recipe-detail', args=[recipe.id])
+        )
+
+        assert res.status_code == status.HTTP_200_OK
+        assert res.content == expected.content
+
+    @pytest.mark.django_db(transaction=True)
+    def test_detail_other_user(self, token_client):
+        """Test another user's recipe is not found"""
+        other = create_user(email='other@user.com', password='otherpass')
+        recipe = Recipe.objects.create(
+            user=other, title='Toast', time_minutes=1, price=1
+        )
+
+        res = token_client.get(async_detail_url(recipe.id))
+
+        assert res.status_code == status.HTTP_404_NOT_FOUND
+
+    @pytest.mark.django_db(transaction=True)
+    def test_throttled(self, settings, token_client, user):
+        """Test async reads share the throttle of the sync action"""
+        settings.THROTTLE_BURSTS = {**settings.THROTTLE_BURSTS, 'user': 3}
+        sync_client = APIClient()
+        sync_client.force_authenticate(user)
+
+        assert sync_client.get(
+            reverse('recipe:recipe-list')
+        ).status_code == status.HTTP_200_OK
+        statuses = []
+        while status.HTTP_429_TOO_MANY_REQUESTS not in statuses:
+            res = token_client.get(ASYNC_RECIPES_URL)
+            statuses.append(res.status_code)
+            assert len(statuses) <= 3
+
+        assert statuses == [status.HTTP_200_OK] * 2 + [
+            status.HTTP_429_TOO_MANY_REQUESTS
+        ]
+        assert int(res['Retry-After']) > 0
+        assert token_client.get(ASYNC_TAGS_URL).status_code == (
+            status.HTTP_200_OK
+        )
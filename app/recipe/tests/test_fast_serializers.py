@@ -0,0 +1,86 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+
+import pytest
+
+from core.models import Recipe, Tag, Ingredient
+
+from recipe.serializers import (
+    TagSerializer,
+    IngredientSerializer,
+    RecipeSerializer,
+    FastTagSerializer,
+    FastIngredientSerializer,
+    FastRecipeSerializer,
+)
+
+
+@pytest.fixture
+def user():
+    """A sample user for testing"""
+    return get_user_model().objects.create_user(
+        email='test@user.com',
+        password='testspass',
+        name='name',
+    )
+
+
+class TestFastSerializers:
+    """Test the fast serializers match the model serializers"""
+
+    @pytest.mark.django_db
+    def test_tags_match(self, user):
+        """Test fast tag output matches TagSerializer"""
+        Tag.objects.create(user=user, name='Vegan')
+        Tag.objects.create(user=user, name='Dessert')
+        tags = Tag.objects.order_by('-name')
+
+        assert FastTagSerializer(tags).data == \
+            TagSerializer(tags, many=True).data
+
+    @pytest.mark.django_db
+    def test_ingredients_match(self, user):
+        """Test fast ingredient output matches IngredientSerializer"""
+        Ingredient.objects.create(user=user, name='Kale')
+        ingredients = Ingredient.objects.all()
+
+        assert FastIngredientSerializer(ingredients).data == \
+            IngredientSerializer(ingredients, many=True).data
+
+    @pytest.mark.django_db
+    def test_recipes_match(self, user):
+        """Test fast recipe output matches RecipeSerializer"""
+        tag = Tag.objects.create(user=user, name='Vegan')
+        ingredient = Ingredient.objects.create(user=user, name='Kale')
+        recipe = Recipe.objects.create(
+            user=user, title='Kale salad', time_minutes=5, price=Decimal('3')
+        )
+        recipe.tags.add(tag)
+        recipe.ingredients.add(ingredient)
+        Recipe.objects.create(
+            user=user, title='Toast', time_minutes=2, price=Decimal('0.5')
+        )
+        recipes = Recipe.objects.order_by('-id')
+
+        data = FastRecipeSerializer(recipes).data
+
+        assert data == RecipeSerializer(recipes, many=True).data
+        assert data[1]['price'] == '3.00'
+        assert data[0]['tags'] == []
+
+    @pytest.mark.django_db
+    def test_recipe_fields_in_order(self, user):
+        """Test keys are emitted in the declared field order"""
+        Recipe.objects.create(
+            user=user, title='Toast', time_minutes=2, price=Decimal('1')
+        )
+
+        data = FastRecipeSerializer(Recipe.objects.all()).data
+
+        assert tuple(data[0]) == RecipeSerializer.Meta.fields
+
+    @pytest.mark.django_db
+    def test_empty_queryset(self):
+        """Test an empty queryset serializes to an empty list"""
+        assert FastRecipeSerializer(Recipe.objects.none()).data == []
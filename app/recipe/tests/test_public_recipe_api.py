@@ -0,0 +1,203 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+import pytest
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import cdn
+from core.deletion import delete_account, start_account_deletion
+from core.models import Recipe, Tag, Ingredient
+
+
+def public_url(slug):
+    return reverse('recipe:public-recipe', args=[slug])
+
+
+def publish_url(recipe_id, action='publish'):
+    return reverse(f'recipe:recipe-{action}', args=[recipe_id])
+
+
+@pytest.fixture
+def user():
+    return get_user_model().objects.create_user(
+        email='test@user.com', password='testpass', name='Test',
+    )
+
+
+@pytest.fixture
+def user_api_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.fixture
+def recipe(user):
+    recipe = Recipe.objects.create(
+        user=user, title='Banana Bread!', time_minutes=60, price=4,
+    )
+    recipe.tags.add(Tag.objects.create(user=user, name='Baking'))
+    recipe.ingredients.add(Ingredient.objects.create(user=user, name='Flour'))
+    return recipe
+
+
+@pytest.fixture
+def purger(settings):
+    settings.CDN_PURGER = 'core.cdn.MemoryPurger'
+    settings.JOBS_ALWAYS_EAGER = True
+    return cdn.get_purger()
+
+
+class TestPublicRecipeApi:
+
+    @pytest.mark.django_db
+    def test_publish(self, user_api_client, recipe):
+        """Test publishing gives the recipe a slug kept when republished"""
+        res = user_api_client.post(publish_url(recipe.id))
+
+        assert res.status_code == status.HTTP_200_OK
+        assert res.data['is_public'] is True
+        slug = res.data['slug']
+        assert slug.startswith('banana-bread-')
+
+        user_api_client.post(publish_url(recipe.id, 'unpublish'))
+        res = user_api_client.post(publish_url(recipe.id))
+
+        assert res.data['slug'] == slug
+
+    @pytest.mark.django_db
+    def test_publish_other_users_recipe(self, user_api_client):
+        """Test only the owner can publish a recipe"""
+        other = get_user_model().objects.create_user(
+            email='other@user.com', password='testpass',
+        )
+        recipe = Recipe.objects.create(
+            user=other, title='Secret', time_minutes=5, price=1,
+        )
+
+        res = user_api_client.post(publish_url(recipe.id))
+
+        assert res.status_code == status.HTTP_404_NOT_FOUND
+        recipe.refresh_from_db()
+        assert not recipe.is_public
+
+    @pytest.mark.django_db
+    def test_read_without_auth(self, recipe):
+        """Test anyone can read a published recipe, with CDN headers"""
+        recipe.publish()
+
+        res = APIClient().get(public_url(recipe.slug))
+
+        assert res.status_code == status.HTTP_200_OK
+        body = res.json()
+        assert body['title'] == 'Banana Bread!'
+        assert body['tags'][0]['name'] == 'Baking'
+        assert 'user' not in body
+        cache_control = res['Cache-Control']
+        assert cache_control.startswith('public, ')
+        assert 's-maxage=86400' in cache_control
+        tag = recipe.tags.get()
+        ingredient = recipe.ingredients.get()
+        assert set(res['Surrogate-Key'].split()) == {
+            f'recipe-{recipe.id}', f'slug-{recipe.slug}',
+            f'tag-{tag.id}', f'ingredient-{ingredient.id}',
+        }
+
+    @pytest.mark.django_db
+    def test_not_modified(self, recipe):
+        """Test a matching If-None-Match, weak or strong, gets a 304"""
+        recipe.publish()
+        client = APIClient()
+        etag = client.get(public_url(recipe.slug))['ETag']
+
+        for sent in (etag, 'W/' + etag):
+            res = client.get(public_url(recipe.slug), HTTP_IF_NONE_MATCH=sent)
+
+            assert res.status_code == status.HTTP_304_NOT_MODIFIED
+            assert res['Cache-Control'].startswith('public, ')
+
+    @pytest.mark.django_db
+    def test_private_recipe_not_found(self, recipe):
+        """Test unpublished recipes and unknown slugs are not found"""
+        recipe.publish()
+        recipe.unpublish()
+
+        res = APIClient().get(public_url(recipe.slug))
+        missing = APIClient().get(public_url('nothing'))
+
+        assert res.status_code == status.HTTP_404_NOT_FOUND
+        assert missing.status_code == status.HTTP_404_NOT_FOUND
+        assert missing['Surrogate-Key'] == 'slug-nothing'
+        assert 's-maxage=60' in missing['Cache-Control']
+
+    @pytest.mark.django_db
+    def test_read_only(self, recipe):
+        """Test the public URL only serves reads"""
+        recipe.publish()
+
+        res = APIClient().post(public_url(recipe.slug))
+
+        assert res.status_code == status.HTTP_405_METHOD_NOT_ALLOWED
+
+    @pytest.mark.django_db
+    def test_update_refreshes(self, user_api_client, recipe, purger,
+                              django_capture_on_commit_callbacks):
+        """Test changes are served at once and purged from the CDN"""
+        recipe.publish()
+        APIClient().get(public_url(recipe.slug))
+        purger.purged.clear()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            user_api_client.patch(
+                reverse('recipe:recipe-detail', args=[recipe.id]),
+                {'title': 'Better Bread'},
+            )
+        res = APIClient().get(public_url(recipe.slug))
+
+        assert res.json()['title'] == 'Better Bread'
+        assert f'recipe-{recipe.id}' in purger.purged
+
+    @pytest.mark.django_db
+    def test_tag_change_purges_tag_key(self, recipe, purger,
+                                       django_capture_on_commit_callbacks):
+        """Test renaming a tag purges its surrogate key"""
+        recipe.publish()
+        APIClient().get(public_url(recipe.slug))
+        tag = recipe.tags.get()
+
+        with django_capture_on_commit_callbacks(execute=True):
+            tag.name = 'Baked'
+            tag.save()
+        res = APIClient().get(public_url(recipe.slug))
+
+        assert res.json()['tags'][0]['name'] == 'Baked'
+        assert purger.purged[-1:] == [f'tag-{tag.id}']
+
+    @pytest.mark.django_db
+    def test_account_deletion_purges(self, user, recipe, purger,
+                                     django_capture_on_commit_callbacks):
+        """Test deleting an account purges its published recipes"""
+        recipe.publish()
+        APIClient().get(public_url(recipe.slug))
+
+        with django_capture_on_commit_callbacks(execute=True):
+            delete_account(start_account_deletion(user).pk)
+
+        res = APIClient().get(public_url(recipe.slug))
+        assert res.status_code == status.HTTP_404_NOT_FOUND
+        assert f'recipe-{recipe.id}' in purger.purged
+
+    @pytest.mark.django_db
+    def test_duplicate_is_private(self, user_api_client, recipe):
+        """Test copies of a published recipe start private, without slug"""
+        recipe.publish()
+
+        res = user_api_client.post(
+            reverse('recipe:recipe-duplicate', args=[recipe.id])
+        )
+
+        copy = Recipe.objects.get(pk=res.data['id'])
+        assert not copy.is_public
+        assert copy.slug is None
@@ -0,0 +1,283 @@
+from collections import namedtuple
+from itertools import count
+
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+import pytest
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+from core.testing import query_budget, assert_queries_constant
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+INGREDIENTS_URL = reverse('recipe:ingredient-list')
+
+SIZES = (1, 10, 50)
+FAN_OUT = 2
+
+# Queries allowed per request, and rows allowed per item returned or sent
+# plus a fixed allowance.
+Budget = namedtuple('Budget', 'queries rows_per_item extra_rows',
+                    defaults=(0,))
+BUDGETS = {
+    'recipe-list': Budget(3, 1 + 2 * FAN_OUT),
+    'recipe-filter': Budget(3, 1 + 2 * FAN_OUT),
+    'recipe-retrieve': Budget(3, 1 + 2 * FAN_OUT),
+    'recipe-create': Budget(9, 4, 1),
+    'tag-list': Budget(1, 1),
+    'ingredient-assigned': Budget(1, 1),
+    'recipe-query': Budget(3, 1 + 2 * FAN_OUT),
+    'recipe-cookable': Budget(3, 1 + 2 * FAN_OUT),
+    # Builds the pantry index, a row per recipe ingredient
+    'recipe-coverage': Budget(4, 1 + 3 * FAN_OUT),
+    'shopping-list': Budget(1, 1),
+}
+
+_emails = count()
+
+
+def library(size):
+    """Create a user owning size recipes, tags and ingredients"""
+    user = get_user_model().objects.create_user(
+        email=f'budget{next(_emails)}@user.com', password='testpass',
+        name='name',
+    )
+    tags = Tag.objects.bulk_create(
+        Tag(user=user, name=f'Tag {i}') for i in range(size)
+    )
+    ingredients = Ingredient.objects.bulk_create(
+        Ingredient(user=user, name=f'Ingredient {i}') for i in range(size)
+    )
+    recipes = Recipe.objects.bulk_create(
+        Recipe(user=user, title=f'Recipe {i}', time_minutes=5, price=3)
+        for i in range(size)
+    )
+    for i, recipe in enumerate(recipes):
+        picked = [(i + j) % size for j in range(min(FAN_OUT, size))]
+        recipe.tags.add(*(tags[j] for j in picked))
+        recipe.ingredients.add(*(ingredients[j] for j in picked))
+    client = APIClient()
+    client.force_authenticate(user)
+    return client, recipes, tags, ingredients
+
+
+def list_recipes(data):
+    client, recipes, _, _ = data
+    return client.get(RECIPES_URL), len(recipes)
+
+
+def filter_recipes(data):
+    client, recipes, tags, _ = data
+    res = client.get(
+        RECIPES_URL, {'tags': ','.join(str(tag.id) for tag in tags)}
+    )
+    return res, len(res.data)
+
+
+def retrieve_recipe(data):
+    client, recipes, _, _ = data
+    return client.get(
+        reverse('recipe:recipe-detail', args=[recipes[0].id])
+    ), 1
+
+
+def create_recipe(data):
+    client, _, tags, ingredients = data
+    payload = {
+        'title': 'Chocolate cheesecake',
+        'time_minutes': 30,
+        'price': '5.00',
+        'tags': [tag.id for tag in tags],
+        'ingredients': [ingredient.id for ingredient in ingredients],
+    }
+    return client.post(RECIPES_URL, payload, format='json'), len(tags)
+
+
+def list_tags(data):
+    client, _, tags, _ = data
+    return client.get(TAGS_URL), len(tags)
+
+
+def list_assigned_ingredients(data):
+    client, _, _, ingredients = data
+    return client.get(INGREDIENTS_URL, {'assigned_only': 1}), \
+        len(ingredients)
+
+
+def query_recipes(data):
+    client, recipes, _, _ = data
+    query = '{ recipes { title tags { name } ingredients { name } } }'
+    return client.post(
+        reverse('recipe:query'), {'query': query}, format='json'
+    ), len(recipes)
+
+
+def cookable_recipes(data):
+    client, _, _, ingredients = data
+    res = client.get(
+        reverse('recipe:recipe-cookable'),
+        {'ingredients': ','.join(str(item.id) for item in ingredients)},
+    )
+    return res, len(res.data)
+
+
+def rank_recipes(data):
+    client, _, _, ingredients = data
+    res = client.get(RECIPES_URL, {
+        'ingredients': ','.join(str(item.id) for item in ingredients[:2]),
+        'match': 'coverage',
+    })
+    return res, len(res.data)
+
+
+def shopping_list(data):
+    client, recipes, _, _ = data
+    res = client.post(
+        reverse('recipe:shopping-list'),
+        {'recipes': [recipe.id for recipe in recipes]}, format='json',
+    )
+    return res, len(res.data)
+
+
+ENDPOINTS = {
+    'recipe-list': list_recipes,
+    'recipe-filter': filter_recipes,
+    'recipe-retrieve': retrieve_recipe,
+    'recipe-create': create_recipe,
+    'tag-list': list_tags,
+    'ingredient-assigned': list_assigned_ingredients,
+    'recipe-query': query_recipes,
+    'recipe-cookable': cookable_recipes,
+    'recipe-coverage': rank_recipes,
+    'shopping-list': shopping_list,
+}
+
+
+class TestQueryBudgets:
+    """Test every endpoint stays within its query and row budget"""
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize('size', SIZES)
+    @pytest.mark.parametrize('endpoint', ENDPOINTS)
+    def test_within_budget(self, endpoint, size):
+        """Test the endpoint's queries and rows fetched at a data size"""
+        data = library(size)
+        budget = BUDGETS[endpoint]
+
+        with query_budget(budget.queries) as recorder:
+            res, items = ENDPOINTS[endpoint](data)
+
+        assert status.is_success(res.status_code)
+        assert recorder.rows <= \
+            budget.rows_per_item * max(items, 1) + budget.extra_rows
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize('endpoint', ENDPOINTS)
+    def test_queries_constant(self, endpoint):
+        """Test the endpoint's query count doesn't grow with the data"""
+        assert_queries_constant(
+            library, lambda data: ENDPOINTS[endpoint](data), SIZES
+        )
+
+
+class TestBulkPrimaryKeyRelatedField:
+    """Test recipe tags and ingredients are validated in bulk"""
+
+    @pytest.mark.django_db
+    def test_missing_pk_rejected(self):
+        """Test an unknown id fails validation like the stock field"""
+        client, _, tags, ingredients = library(2)
+        payload = {
+            'title': 'Cheesecake',
+            'time_minutes': 30,
+            'price': '5.00',
+            'tags': [tags[0].id, 0],
+            'ingredients': [ingredients[0].id],
+        }
+
+        res = client.post(RECIPES_URL, payload, format='json')
+
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+        assert res.data['tags'] == [
+            'Invalid pk "0" - object does not exist.'
+        ]
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize('value', ['abc', True, {'id': 1}])
+    def test_incorrect_type_rejected(self, value):
+        """Test ids that aren't integers fail validation"""
+        client, _, tags, _ = library(1)
+        payload = {
+            'title': 'Cheesecake',
+            'time_minutes': 30,
+            'price': '5.00',
+            'tags': [tags[0].id, value],
+            'ingredients': [],
+        }
+
+        res = client.post(RECIPES_URL, payload, format='json')
+
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+        assert 'Incorrect type' in res.data['tags'][0]
+
+    @pytest.mark.django_db
+    def test_order_kept(self):
+        """Test the validated objects follow the payload order"""
+        client, _, tags, ingredients = library(3)
+        payload = {
+            'title': 'Cheesecake',
+            'time_minutes': 30,
+            'price': '5.00',
+            'tags': [tags[2].id, tags[0].id],
+            'ingredients': [ingredients[1].id],
+        }
+
+        res = client.post(RECIPES_URL, payload, format='json')
+
+        assert res.status_code == status.HTTP_201_CREATED
+        recipe = Recipe.objects.get(id=res.data['id'])
+        assert set(recipe.tags.all()) == {tags[2], tags[0]}
+
+
+class TestQueryBudgetHelpers:
+
+    @pytest.mark.django_db
+    def test_budget_exceeded(self):
+        """Test exceeding the budget fails with the queries listed"""
+        with pytest.raises(AssertionError, match='2 queries run'):
+            with query_budget(1):
+                Tag.objects.count()
+                Tag.objects.count()
+
+    @pytest.mark.django_db
+    def test_rows_exceeded(self):
+        """Test fetching too many rows fails"""
+        library(3)
+
+        with pytest.raises(AssertionError, match='3 rows fetched'):
+            with query_budget(1, rows=2):
+                list(Tag.objects.all())
+
+    @pytest.mark.django_db
+    def test_decorator(self):
+        """Test the budget can decorate a function"""
+        @query_budget(0)
+        def no_queries():
+            return 1
+
+        assert no_queries() == 1
+
+    @pytest.mark.django_db
+    def test_growing_queries_detected(self):
+        """Test a per row query is reported as scaling with the data"""
+        def per_recipe(data):
+            for recipe in data[1]:
+                list(recipe.tags.all())
+
+        with pytest.raises(AssertionError, match='grows with the data'):
+            assert_queries_constant(library, per_recipe, (1, 3))
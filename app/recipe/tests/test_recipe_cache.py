@@ -0,0 +1,99 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+import pytest
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+
+
+def detail_url(recipe_id):
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+@pytest.fixture
+def user():
+    return get_user_model().objects.create_user(
+        email='test@user.com', password='testpass', name='name',
+    )
+
+
+@pytest.fixture
+def user_api_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.fixture
+def recipe(user):
+    recipe = Recipe.objects.create(
+        user=user, title='Toast', time_minutes=5, price=1.00,
+    )
+    recipe.tags.add(Tag.objects.create(user=user, name='Breakfast'))
+    return recipe
+
+
+class TestCachedRecipeDetail:
+
+    @pytest.mark.django_db
+    def test_second_read_cached(self, recipe, user_api_client):
+        """Test a recipe read twice is only queried once"""
+        user_api_client.get(detail_url(recipe.id))
+
+        with CaptureQueriesContext(connection) as queries:
+            res = user_api_client.get(detail_url(recipe.id))
+
+        assert res.status_code == status.HTTP_200_OK
+        assert res.data['title'] == 'Toast'
+        assert len(queries) == 0
+
+    @pytest.mark.django_db
+    def test_update_invalidates(self, recipe, user_api_client):
+        """Test changes are read back at once"""
+        user_api_client.get(detail_url(recipe.id))
+
+        user_api_client.patch(detail_url(recipe.id), {'title': 'Bagel'})
+        res = user_api_client.get(detail_url(recipe.id))
+
+        assert res.data['title'] == 'Bagel'
+
+    @pytest.mark.django_db
+    def test_tag_rename_invalidates(self, user, recipe, user_api_client):
+        """Test renaming a tag updates the recipes using it"""
+        user_api_client.get(detail_url(recipe.id))
+
+        tag = recipe.tags.get()
+        tag.name = 'Brunch'
+        tag.save()
+        res = user_api_client.get(detail_url(recipe.id))
+
+        assert res.data['tags'][0]['name'] == 'Brunch'
+
+    @pytest.mark.django_db
+    def test_delete_invalidates(self, recipe, user_api_client):
+        """Test deleted recipes are not served from cache"""
+        user_api_client.get(detail_url(recipe.id))
+
+        recipe.delete()
+        res = user_api_client.get(detail_url(recipe.id))
+
+        assert res.status_code == status.HTTP_404_NOT_FOUND
+
+    @pytest.mark.django_db
+    def test_other_user_not_cached(self, recipe, user_api_client):
+        """Test a cached recipe is not served to other users"""
+        user_api_client.get(detail_url(recipe.id))
+        other = get_user_model().objects.create_user(
+            email='other@user.com', password='testpass',
+        )
+        client = APIClient()
+        client.force_authenticate(other)
+
+        res = client.get(detail_url(recipe.id))
+
+        assert res.status_code == status.HTTP_404_NOT_FOUND
@@ -0,0 +1,139 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+import pytest
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+
+DUPLICATE_MANY_URL = reverse('recipe:recipe-duplicate-many')
+
+
+def duplicate_url(recipe_id):
+    """Return URL for duplicating a recipe"""
+    return reverse('recipe:recipe-duplicate', args=[recipe_id])
+
+
+def create_user(**params):
+    return get_user_model().objects.create_user(**params)
+
+
+def sample_recipe(user, **params):
+    """Create and return a sample recipe"""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'price': 5.00
+    }
+
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+@pytest.fixture
+def user():
+    """A sample user for testing"""
+    new_user = create_user(
+        email='test@user.com',
+        password='testspass',
+        name='name',
+    )
+    return new_user
+
+
+@pytest.fixture
+def user_api_client(user):
+    """An api client with a logged in user"""
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.fixture
+def recipe(user):
+    """A recipe with a tag and two ingredients"""
+    recipe = sample_recipe(user, title='Pancakes', link='http://pan.cakes')
+    recipe.tags.add(Tag.objects.create(user=user, name='Breakfast'))
+    recipe.ingredients.add(
+        Ingredient.objects.create(user=user, name='Flour'),
+        Ingredient.objects.create(user=user, name='Eggs'),
+    )
+    return recipe
+
+
+class TestDuplicateRecipeApi:
+    """Test duplicating recipes"""
+
+    @pytest.mark.django_db
+    def test_duplicate_recipe(self, user_api_client, recipe):
+        """Test a recipe is copied with its tags and ingredients"""
+        res = user_api_client.post(duplicate_url(recipe.id))
+
+        assert res.status_code == status.HTTP_201_CREATED
+        copy = Recipe.objects.get(id=res.data['id'])
+        assert copy.id != recipe.id
+        assert copy.user == recipe.user
+        assert copy.title == recipe.title
+        assert copy.link == recipe.link
+        assert copy.price == recipe.price
+        assert set(copy.tags.all()) == set(recipe.tags.all())
+        assert set(copy.ingredients.all()) == set(recipe.ingredients.all())
+        through = Recipe.ingredients.through.objects.filter(recipe=recipe)
+        assert res.data['ingredients'] == list(
+            through.order_by('id').values_list('ingredient_id', flat=True)
+        )
+
+    @pytest.mark.django_db
+    def test_duplicate_other_users_recipe(self, user_api_client):
+        """Test another user's recipe can't be duplicated"""
+        other = create_user(email='other@user.com', password='otherpass')
+        recipe = sample_recipe(other)
+
+        res = user_api_client.post(duplicate_url(recipe.id))
+
+        assert res.status_code == status.HTTP_404_NOT_FOUND
+        assert Recipe.objects.count() == 1
+
+    @pytest.mark.django_db
+    def test_duplicate_many(self, user, user_api_client, recipe):
+        """Test a batch of recipes is copied in the order given"""
+        other = sample_recipe(user, title='Waffles')
+
+        res = user_api_client.post(
+            DUPLICATE_MANY_URL,
+            {'ids': [other.id, recipe.id, other.id]},
+            format='json',
+        )
+
+        assert res.status_code == status.HTTP_201_CREATED
+        assert [item['title'] for item in res.data] == \
+            ['Waffles', 'Pancakes', 'Waffles']
+        assert Recipe.objects.filter(user=user).count() == 5
+        assert Recipe.objects.filter(title='Pancakes').count() == 2
+
+    @pytest.mark.django_db
+    def test_duplicate_many_invalid_ids(self, user_api_client, recipe):
+        """Test nothing is copied if any id is not the user's"""
+        other = create_user(email='other@user.com', password='otherpass')
+        foreign = sample_recipe(other)
+
+        res = user_api_client.post(
+            DUPLICATE_MANY_URL,
+            {'ids': [recipe.id, foreign.id]},
+            format='json',
+        )
+
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+        assert Recipe.objects.count() == 2
+
+    @pytest.mark.django_db
+    def test_duplicate_many_empty(self, user_api_client):
+        """Test an empty batch is rejected"""
+        res = user_api_client.post(
+            DUPLICATE_MANY_URL, {'ids': []}, format='json'
+        )
+
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,98 @@
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+
+import pytest
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import RecipeImport, Recipe
+
+
+IMPORTS_URL = reverse('recipe:recipeimport-list')
+
+CSV = (
+    b'title,time_minutes,price,tags,ingredients\n'
+    b'Dal,30,4.50,Vegan,Lentils;Onion\n'
+    b'Toast,5,1.00,,Bread\n'
+)
+
+
+def import_url(import_id):
+    return reverse('recipe:recipeimport-detail', args=[import_id])
+
+
+@pytest.fixture(autouse=True)
+def import_settings(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.JOBS_ALWAYS_EAGER = True
+
+
+@pytest.fixture
+def user():
+    return get_user_model().objects.create_user(
+        email='test@user.com', password='testpass'
+    )
+
+
+@pytest.fixture
+def client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+class TestRecipeImportApi:
+
+    def test_auth_required(self):
+        """Test authentication is required to import"""
+        res = APIClient().get(IMPORTS_URL)
+
+        assert res.status_code == status.HTTP_401_UNAUTHORIZED
+
+    @pytest.mark.django_db
+    def test_upload_runs_import(self, client, user,
+                                django_capture_on_commit_callbacks):
+        """Test an upload is accepted, then imported after commit"""
+        upload = SimpleUploadedFile('library.csv', CSV)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            res = client.post(IMPORTS_URL, {'file': upload},
+                              format='multipart')
+
+        assert res.status_code == status.HTTP_202_ACCEPTED
+        assert res.data['format'] == RecipeImport.CSV
+        assert res.data['status'] == RecipeImport.PENDING
+        assert 'file' not in res.data
+        assert Recipe.objects.filter(user=user).count() == 2
+
+        res = client.get(import_url(res.data['id']))
+
+        assert res.data['status'] == RecipeImport.DONE
+        assert res.data['recipes_created'] == 2
+
+    @pytest.mark.django_db
+    def test_unknown_format_rejected(self, client):
+        """Test a file without a known extension needs a format"""
+        upload = SimpleUploadedFile('library.txt', CSV)
+
+        res = client.post(IMPORTS_URL, {'file': upload}, format='multipart')
+
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+        assert not RecipeImport.objects.exists()
+
+    @pytest.mark.django_db
+    def test_imports_limited_to_user(self, client, user):
+        """Test users only see their own imports"""
+        other = get_user_model().objects.create_user(
+            email='other@user.com', password='testpass'
+        )
+        mine = RecipeImport.objects.create(user=user, file='a.csv')
+        theirs = RecipeImport.objects.create(user=other, file='b.csv')
+
+        res = client.get(IMPORTS_URL)
+
+        assert [item['id'] for item in res.data] == [str(mine.id)]
+        res = client.get(import_url(theirs.id))
+        assert res.status_code == status.HTTP_404_NOT_FOUND
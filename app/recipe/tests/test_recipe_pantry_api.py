@@ -0,0 +1,113 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+import pytest
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Ingredient
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def create_user(email='test@user.com'):
+    return get_user_model().objects.create_user(
+        email=email, password='testpass', name='Test',
+    )
+
+
+def sample_recipe(user, title, ingredients):
+    recipe = Recipe.objects.create(
+        user=user, title=title, time_minutes=5, price=1,
+    )
+    recipe.ingredients.add(*ingredients)
+    return recipe
+
+
+def rank(client, *ingredients, **params):
+    return client.get(RECIPES_URL, {
+        'ingredients': ','.join(str(item.id) for item in ingredients),
+        'match': 'coverage',
+        **params,
+    })
+
+
+@pytest.fixture
+def user():
+    return create_user()
+
+
+@pytest.fixture
+def user_api_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.fixture
+def pantry(user):
+    return [
+        Ingredient.objects.create(user=user, name=name)
+        for name in ('Flour', 'Eggs', 'Milk', 'Leek')
+    ]
+
+
+class TestPantryCoverageApi:
+
+    @pytest.mark.django_db
+    def test_ranked_by_coverage(self, user, user_api_client, pantry):
+        """Test recipes come best covered first, with their coverage"""
+        flour, eggs, milk, leek = pantry
+        pancakes = sample_recipe(user, 'Pancakes', [flour, eggs, milk])
+        omelette = sample_recipe(user, 'Omelette', [eggs])
+        soup = sample_recipe(user, 'Soup', [leek, milk])
+        sample_recipe(user, 'Salad', [leek])
+        sample_recipe(create_user('other@user.com'), 'Egg', [eggs])
+
+        res = rank(user_api_client, eggs, milk)
+
+        assert res.status_code == status.HTTP_200_OK
+        assert [(item['id'], item['coverage']) for item in res.data] == [
+            (omelette.id, 1.0), (pancakes.id, 0.667), (soup.id, 0.5),
+        ]
+
+    @pytest.mark.django_db
+    def test_follows_changes(self, user, user_api_client, pantry):
+        """Test recipes created and edited through the API are ranked"""
+        flour, eggs, milk, _ = pantry
+        omelette = sample_recipe(user, 'Omelette', [eggs])
+        assert len(rank(user_api_client, flour).data) == 0
+
+        res = user_api_client.post(RECIPES_URL, {
+            'title': 'Pancakes', 'time_minutes': 10, 'price': '2.00',
+            'ingredients': [flour.id, eggs.id], 'tags': [],
+        }, format='json')
+        user_api_client.patch(
+            reverse('recipe:recipe-detail', args=[omelette.id]),
+            {'ingredients': [eggs.id, milk.id]}, format='json',
+        )
+
+        assert [
+            (item['id'], item['coverage'])
+            for item in rank(user_api_client, flour, eggs).data
+        ] == [(res.data['id'], 1.0), (omelette.id, 0.5)]
+
+    @pytest.mark.django_db
+    def test_tags_filter(self, user, user_api_client, pantry):
+        """Test the tags filter still applies"""
+        flour = pantry[0]
+        bread = sample_recipe(user, 'Bread', [flour])
+        sample_recipe(user, 'Cake', [flour])
+        tag = bread.tags.create(user=user, name='Savoury')
+
+        res = rank(user_api_client, flour, tags=str(tag.id))
+
+        assert [item['id'] for item in res.data] == [bread.id]
+
+    @pytest.mark.django_db
+    def test_ingredients_required(self, user_api_client):
+        """Test coverage ranking needs the pantry's ingredients"""
+        res = user_api_client.get(RECIPES_URL, {'match': 'coverage'})
+
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
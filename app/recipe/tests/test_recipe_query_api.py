@@ -0,0 +1,219 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+import pytest
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredient
+
+from recipe.query import Field, QueryError, parse
+
+QUERY_URL = reverse('recipe:query')
+
+
+def create_user(email='test@user.com'):
+    return get_user_model().objects.create_user(
+        email=email, password='testpass', name='Test',
+    )
+
+
+def sample_recipe(user, title='Toast', tags=(), ingredients=()):
+    recipe = Recipe.objects.create(
+        user=user, title=title, time_minutes=5, price=1.5,
+    )
+    recipe.tags.add(*tags)
+    recipe.ingredients.add(*ingredients)
+    return recipe
+
+
+@pytest.fixture
+def user():
+    return create_user()
+
+
+@pytest.fixture
+def user_api_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+def run(client, query):
+    return client.post(QUERY_URL, {'query': query}, format='json')
+
+
+class TestParse:
+
+    def test_fields(self):
+        """Test fields, aliases, arguments and selections are parsed"""
+        fields = parse('''
+            query Screen {
+                first: recipes(tags: [1, 2], limit: 5, title: "a \\"b\\"") {
+                    id, tags { name }
+                }
+            }
+        ''')
+
+        assert fields == [Field(
+            'first', 'recipes',
+            {'tags': [1, 2], 'limit': 5, 'title': 'a "b"'},
+            [Field('id', 'id', {}, None),
+             Field('tags', 'tags', {}, [Field('name', 'name', {}, None)])],
+        )]
+
+    @pytest.mark.parametrize('query', [
+        '', '{', '{ }', '{ recipes { id }', '{ a } { b }', '{ a(b: ) }',
+        '{ a(b: [[1]]) }', '{ a % }',
+    ])
+    def test_invalid(self, query):
+        """Test malformed queries are refused"""
+        with pytest.raises(QueryError):
+            parse(query)
+
+    def test_depth_limit(self, settings):
+        """Test deep queries are refused before they are parsed in full"""
+        settings.QUERY_MAX_DEPTH = 3
+
+        with pytest.raises(QueryError):
+            parse('{ a { b { c { d } } } }')
+        parse('{ a { b { c } } }')
+
+    def test_field_limit(self, settings):
+        """Test queries selecting too many fields are refused"""
+        settings.QUERY_MAX_FIELDS = 3
+
+        with pytest.raises(QueryError):
+            parse('{ a { b c d } }')
+
+
+class TestQueryApi:
+
+    @pytest.mark.django_db
+    def test_auth_required(self):
+        """Test queries need an authenticated user"""
+        res = run(APIClient(), '{ me { email } }')
+
+        assert res.status_code == status.HTTP_401_UNAUTHORIZED
+
+    @pytest.mark.django_db
+    def test_nested(self, user, user_api_client):
+        """Test recipes are returned with the selected nested fields"""
+        tag = Tag.objects.create(user=user, name='Breakfast')
+        bread = Ingredient.objects.create(user=user, name='Bread')
+        recipe = sample_recipe(user, tags=[tag], ingredients=[bread])
+
+        res = run(user_api_client, '''{
+            recipes { id title price tags { name } ingredients { id } }
+            me { email }
+        }''')
+
+        assert res.status_code == status.HTTP_200_OK
+        assert res.json() == {'data': {
+            'recipes': [{
+                'id': recipe.id, 'title': 'Toast', 'price': '1.50',
+                'tags': [{'name': 'Breakfast'}],
+                'ingredients': [{'id': bread.id}],
+            }],
+            'me': {'email': 'test@user.com'},
+        }}
+
+    @pytest.mark.django_db
+    def test_queries_batched(self, user, user_api_client,
+                             django_assert_num_queries):
+        """Test each level runs one query whatever the number of rows"""
+        tags = [Tag.objects.create(user=user, name=f'Tag {i}')
+                for i in range(3)]
+        for i in range(10):
+            sample_recipe(user, title=f'Recipe {i}', tags=tags)
+
+        with django_assert_num_queries(4):
+            res = run(user_api_client, '''{
+                recipes { title user { name } tags { name recipes { id } } }
+            }''')
+
+        recipes = res.json()['data']['recipes']
+        assert len(recipes) == 10
+        assert all(len(recipe['tags']) == 3 for recipe in recipes)
+        assert len(recipes[0]['tags'][0]['recipes']) == 10
+        assert recipes[0]['user'] == {'name': 'Test'}
+
+    @pytest.mark.django_db
+    def test_arguments(self, user, user_api_client):
+        """Test recipes can be filtered and paged, under aliases"""
+        vegan = Tag.objects.create(user=user, name='Vegan')
+        sample_recipe(user, 'Salad', tags=[vegan])
+        sample_recipe(user, 'Soup', tags=[vegan])
+        sample_recipe(user, 'Steak')
+
+        res = run(user_api_client, f'''{{
+            vegan: recipes(tags: [{vegan.id}]) {{ title }}
+            second: recipes(limit: 1, offset: 1) {{ title }}
+        }}''')
+
+        data = res.json()['data']
+        assert data['vegan'] == [{'title': 'Soup'}, {'title': 'Salad'}]
+        assert data['second'] == [{'title': 'Soup'}]
+
+    @pytest.mark.django_db
+    def test_single_recipe(self, user, user_api_client):
+        """Test one recipe is looked up by id"""
+        recipe = sample_recipe(user)
+
+        res = run(user_api_client, f'''{{
+            recipe(id: {recipe.id}) {{ title }}
+            missing: recipe(id: {recipe.id + 1}) {{ title }}
+        }}''')
+
+        assert res.json()['data'] == {
+            'recipe': {'title': 'Toast'}, 'missing': None,
+        }
+
+    @pytest.mark.django_db
+    def test_other_users_hidden(self, user, user_api_client):
+        """Test only the user's own objects are returned"""
+        other = create_user('other@user.com')
+        other_recipe = sample_recipe(other)
+        Tag.objects.create(user=other, name='Hidden')
+        tag = Tag.objects.create(user=user, name='Mine')
+        other_recipe.tags.add(tag)
+
+        res = run(user_api_client, f'''{{
+            recipes {{ id }}
+            tags {{ name recipes {{ id }} }}
+            recipe(id: {other_recipe.id}) {{ id }}
+        }}''')
+
+        assert res.json()['data'] == {
+            'recipes': [],
+            'tags': [{'name': 'Mine', 'recipes': []}],
+            'recipe': None,
+        }
+
+    @pytest.mark.django_db
+    def test_get(self, user, user_api_client):
+        """Test queries can be sent in the query string"""
+        Tag.objects.create(user=user, name='Breakfast')
+
+        res = user_api_client.get(QUERY_URL, {'query': '{ tags { name } }'})
+
+        assert res.json() == {'data': {'tags': [{'name': 'Breakfast'}]}}
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize('query', [
+        '{ recipes { secret } }',
+        '{ recipes }',
+        '{ recipes { title { id } } }',
+        '{ users { id } }',
+        '{ recipes(limit: 0) { id } }',
+        '{ recipes(tags: 1) { id } }',
+        '{ recipe { id } }',
+        '{ recipes { id ',
+    ])
+    def test_errors(self, user_api_client, query):
+        """Test invalid queries get a 400 with a message"""
+        res = run(user_api_client, query)
+
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+        assert res.json()['errors'][0]['message']
@@ -0,0 +1,108 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+import pytest
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Ingredient
+from core.recommendations import build_recommendations
+
+COOKABLE_URL = reverse('recipe:recipe-cookable')
+
+
+def similar_url(recipe_id):
+    return reverse('recipe:recipe-similar', args=[recipe_id])
+
+
+def create_user(email='test@user.com'):
+    return get_user_model().objects.create_user(
+        email=email, password='testpass', name='Test',
+    )
+
+
+def sample_recipe(user, title, ingredients):
+    recipe = Recipe.objects.create(
+        user=user, title=title, time_minutes=5, price=1,
+    )
+    recipe.ingredients.add(*ingredients)
+    return recipe
+
+
+@pytest.fixture
+def user():
+    return create_user()
+
+
+@pytest.fixture
+def user_api_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.fixture
+def pantry(user):
+    return {
+        name: Ingredient.objects.create(user=user, name=name)
+        for name in ('Flour', 'Eggs', 'Milk', 'Leek')
+    }
+
+
+class TestRecommendationsApi:
+
+    @pytest.mark.django_db
+    def test_similar(self, user, user_api_client, pantry):
+        """Test similar recipes are listed best first with their score"""
+        flour, eggs, milk, leek = pantry.values()
+        pancakes = sample_recipe(user, 'Pancakes', [flour, eggs, milk])
+        crepes = sample_recipe(user, 'Crepes', [flour, eggs, milk, leek])
+        omelette = sample_recipe(user, 'Omelette', [eggs])
+        build_recommendations(user.pk)
+
+        res = user_api_client.get(similar_url(pancakes.id))
+
+        assert res.status_code == status.HTTP_200_OK
+        assert [(item['id'], item['score']) for item in res.data] == [
+            (crepes.id, 0.75), (omelette.id, 0.333),
+        ]
+        assert sorted(res.data[0]['ingredients']) == [
+            flour.id, eggs.id, milk.id, leek.id,
+        ]
+
+    @pytest.mark.django_db
+    def test_similar_other_users_recipe(self, user_api_client):
+        """Test another user's recipe has no neighbours to show"""
+        other = create_user('other@user.com')
+        recipe = sample_recipe(other, 'Secret', [])
+
+        res = user_api_client.get(similar_url(recipe.id))
+
+        assert res.status_code == status.HTTP_404_NOT_FOUND
+
+    @pytest.mark.django_db
+    def test_cookable(self, user, user_api_client, pantry):
+        """Test only recipes needing nothing else are returned"""
+        flour, eggs, milk, leek = pantry.values()
+        pancakes = sample_recipe(user, 'Pancakes', [flour, eggs, milk])
+        omelette = sample_recipe(user, 'Omelette', [eggs])
+        sample_recipe(user, 'Soup', [leek, milk])
+        sample_recipe(user, 'Water', [])
+        other = create_user('other@user.com')
+        sample_recipe(other, 'Boiled egg', [eggs])
+
+        res = user_api_client.get(
+            COOKABLE_URL, {'ingredients': f'{flour.id},{eggs.id},{milk.id}'}
+        )
+
+        assert res.status_code == status.HTTP_200_OK
+        assert [item['id'] for item in res.data] == [omelette.id, pancakes.id]
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize('params', [{}, {'ingredients': 'a,b'}])
+    def test_cookable_invalid(self, user_api_client, params):
+        """Test the ingredients must be given as ids"""
+        res = user_api_client.get(COOKABLE_URL, params)
+
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,185 @@
+import json
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+import pytest
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Ingredient
+
+SHOPPING_LIST_URL = reverse('recipe:shopping-list')
+
+
+def create_user(email='test@user.com'):
+    return get_user_model().objects.create_user(
+        email=email, password='testpass', name='Test',
+    )
+
+
+def sample_recipe(user, title, ingredients):
+    recipe = Recipe.objects.create(
+        user=user, title=title, time_minutes=5, price=1,
+    )
+    recipe.ingredients.add(*ingredients)
+    return recipe
+
+
+@pytest.fixture
+def user():
+    return create_user()
+
+
+@pytest.fixture
+def user_api_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.fixture
+def pantry(user):
+    return [
+        Ingredient.objects.create(user=user, name=name)
+        for name in ('Flour', 'Eggs', 'Milk')
+    ]
+
+
+def post(client, recipe_ids):
+    return client.post(
+        SHOPPING_LIST_URL, {'recipes': recipe_ids}, format='json'
+    )
+
+
+def asgi_post(user, path, data):
+    """POST data through the ASGI handler, return the messages sent"""
+    from app.asgi import application
+
+    token = Token.objects.create(user=user)
+    body = json.dumps(data).encode()
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+        'method': 'POST', 'scheme': 'http', 'path': path,
+        'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+        'headers': [
+            (b'host', b'testserver'),
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+            (b'authorization', f'Token {token.key}'.encode()),
+        ],
+        'client': ('127.0.0.1', 50000), 'server': ('testserver', 80),
+    }
+    sent = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': body}
+
+    async def send(message):
+        sent.append(message)
+
+    async_to_sync(application)(scope, receive, send)
+    return sent
+
+
+class TestShoppingListApi:
+
+    @pytest.mark.django_db
+    def test_auth_required(self):
+        """Test shopping lists need an authenticated user"""
+        res = post(APIClient(), [1])
+
+        assert res.status_code == status.HTTP_401_UNAUTHORIZED
+
+    @pytest.mark.django_db
+    def test_merged(self, user, user_api_client, pantry,
+                    django_assert_num_queries):
+        """Test ingredients are merged with counts and their recipes"""
+        flour, eggs, milk = pantry
+        pancakes = sample_recipe(user, 'Pancakes', [flour, eggs, milk])
+        omelette = sample_recipe(user, 'Omelette', [eggs])
+        secret = sample_recipe(create_user('other@user.com'), 'Secret', [])
+        secret.ingredients.add(milk)
+
+        with django_assert_num_queries(1):
+            res = post(user_api_client, [
+                omelette.id, pancakes.id, omelette.id, secret.id,
+            ])
+
+        assert res.status_code == status.HTTP_200_OK
+        assert res.json() == [
+            {'id': eggs.id, 'name': 'Eggs', 'count': 3,
+             'recipes': sorted([pancakes.id, omelette.id])},
+            {'id': flour.id, 'name': 'Flour', 'count': 1,
+             'recipes': [pancakes.id]},
+            {'id': milk.id, 'name': 'Milk', 'count': 1,
+             'recipes': [pancakes.id]},
+        ]
+
+    @pytest.mark.django_db
+    def test_streamed(self, settings, user, user_api_client, pantry):
+        """Test large plans are streamed in chunks with the same body"""
+        recipes = [
+            sample_recipe(user, f'Recipe {i}', pantry[:i % 3 + 1])
+            for i in range(6)
+        ]
+        plan = [recipe.id for recipe in recipes]
+        expected = post(user_api_client, plan).json()
+        settings.SHOPPING_LIST_STREAM_MIN = 2
+        settings.SHOPPING_LIST_CHUNK_SIZE = 2
+
+        res = post(user_api_client, plan)
+
+        assert res.streaming
+        chunks = list(res.streaming_content)
+        assert len(chunks) == 3
+        assert json.loads(b''.join(chunks)) == expected
+        assert [item['count'] for item in expected] == [4, 6, 2]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_streamed_asgi(self, settings, user, pantry):
+        """Test streamed lists are served by ASGI servers"""
+        recipes = [
+            sample_recipe(user, f'Recipe {i}', pantry[:i % 3 + 1])
+            for i in range(6)
+        ]
+        settings.SHOPPING_LIST_STREAM_MIN = 2
+        settings.SHOPPING_LIST_CHUNK_SIZE = 2
+
+        sent = asgi_post(
+            user, SHOPPING_LIST_URL,
+            {'recipes': [recipe.id for recipe in recipes]},
+        )
+
+        assert sent[0]['status'] == status.HTTP_200_OK
+        body = b''.join(message.get('body', b'') for message in sent[1:])
+        assert [item['count'] for item in json.loads(body)] == [4, 6, 2]
+
+    @pytest.mark.django_db
+    def test_streamed_empty(self, settings, user_api_client):
+        """Test a streamed plan without ingredients is an empty list"""
+        settings.SHOPPING_LIST_STREAM_MIN = 0
+
+        res = post(user_api_client, [1])
+
+        assert b''.join(res.streaming_content) == b'[]'
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize('recipe_ids', [[], [0], ['a']])
+    def test_invalid(self, user_api_client, recipe_ids):
+        """Test plans must list recipe ids"""
+        res = post(user_api_client, recipe_ids)
+
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+
+    @pytest.mark.django_db
+    def test_max_recipes(self, settings, user_api_client):
+        """Test plans are limited to SHOPPING_LIST_MAX_RECIPES"""
+        settings.SHOPPING_LIST_MAX_RECIPES = 2
+
+        res = post(user_api_client, [1, 2, 3])
+
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
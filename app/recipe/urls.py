@@ -1,16 +1,44 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
-from recipe import views
+from recipe import views, async_views
 
 router = DefaultRouter()
 router.register('tags', views.TagViewSet)
 router.register('ingredients', views.IngredientViewSet)
 router.register('recipies', views.RecipeViewSet)
+router.register('imports', views.RecipeImportViewSet)
 
 
 app_name = 'recipe'
 
 urlpatterns = [
-    path('', include(router.urls))
+    path('', include(router.urls)),
+    path('query/', views.RecipeQueryView.as_view(), name='query'),
+    path(
+        'shopping-list/',
+        views.ShoppingListView.as_view(),
+        name='shopping-list',
+    ),
+    path('public/<slug:slug>/', views.public_recipe, name='public-recipe'),
+    path(
+        'async/tags/',
+        async_views.tag_list,
+        name='async-tag-list',
+    ),
+    path(
+        'async/ingredients/',
+        async_views.ingredient_list,
+        name='async-ingredient-list',
+    ),
+    path(
+        'async/recipies/',
+        async_views.recipe_list,
+        name='async-recipe-list',
+    ),
+    path(
+        'async/recipies/<int:pk>/',
+        async_views.recipe_detail,
+        name='async-recipe-detail',
+    ),
 ]
@@ -1,15 +1,44 @@
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.views.decorators.http import require_safe
+
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework import viewsets, mixins, status
 from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
+
+from core import metrics
+from core.idempotency import idempotent
+from core.importing import start_import
+from core.pantry import get_index, invalidate_pantry
+from core.models import (
+    Recipe, RecipeSimilarity, Tag, Ingredient, RecipeImport
+)
+from core.renderers import FastJSONRenderer
+
+from recipe import serializers, queries, shopping
+from recipe.query import QueryError, execute
+from recipe.caching import (
+    cached_public_recipe, cached_recipe_detail, invalidate_public_recipes,
+    invalidate_recipes, slug_key,
+)
+
 
-from core.models import Recipe, Tag, Ingredient
+class FastListMixin:
+    """List objects through a read-only fast serializer"""
+    fast_serializer_class = None
 
-from recipe import serializers
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response(self.fast_serializer_class(queryset).data)
 
 
 class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
+                            FastListMixin,
                             mixins.ListModelMixin,
                             mixins.CreateModelMixin):
     """Base viewset for user owned recipe attributes"""
@@ -18,16 +47,9 @@ class BaseRecipeAttrViewSet(viewsets.GenericViewSet,
 
     def get_queryset(self):
         """Return objects for the current authenticated user only"""
-        assigned_only = bool(
-            int(self.request.query_params.get('assigned_only', 0))
+        return queries.filter_attributes(
+            self.queryset, self.request.query_params, self.request.user
         )
-        queryset = self.queryset
-        if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
-
-        return queryset.filter(
-            user=self.request.user
-        ).order_by('-name').distinct()
 
     def perform_create(self, serializer):
         """Create a new object"""
@@ -38,37 +60,69 @@ class TagViewSet(BaseRecipeAttrViewSet):
     """Manage tags in the database"""
     queryset = Tag.objects.all()
     serializer_class = serializers.TagSerializer
+    fast_serializer_class = serializers.FastTagSerializer
 
 
 class IngredientViewSet(BaseRecipeAttrViewSet):
     """Manage ingredients in the database"""
     queryset = Ingredient.objects.all()
     serializer_class = serializers.IngredientSerializer
+    fast_serializer_class = serializers.FastIngredientSerializer
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(FastListMixin, viewsets.ModelViewSet):
     """Manage recipes in the database"""
     serializer_class = serializers.RecipeSerializer
+    fast_serializer_class = serializers.FastRecipeSerializer
     queryset = Recipe.objects.all()
     authentication_classes = (TokenAuthentication, )
     permission_classes = (IsAuthenticated, )
-
-    def _params_to_ints(self, qs):
-        """convert a list of string IDs to a list of integers"""
-        return [int(str_id) for str_id in qs.split(",")]
+    # Set per action, see core.throttling.ScopedThrottle
+    throttle_scope = None
 
     def get_queryset(self):
         """retrieve recipes for the authenticated user"""
-        tags = self.request.query_params.get('tags')
-        ingredients = self.request.query_params.get('ingredients')
-        queryset = self.queryset
-        if tags:
-            tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
-        if ingredients:
-            ingredient_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
-        return queryset.filter(user=self.request.user).order_by('-id')
+        return queries.filter_recipes(
+            self.queryset, self.request.query_params, self.request.user
+        )
+
+    def list(self, request, *args, **kwargs):
+        """List recipes, ranked by pantry coverage with match=coverage"""
+        if request.query_params.get('match') != 'coverage':
+            return super().list(request, *args, **kwargs)
+        try:
+            ingredient_ids = queries.params_to_ints(
+                request.query_params['ingredients']
+            )
+        except (KeyError, ValueError):
+            raise ValidationError(
+                {'ingredients': 'Give comma separated ingredient ids.'}
+            )
+        ranked = get_index(request.user.pk).rank(ingredient_ids)
+        coverage = {
+            recipe_id: (position, have / needs)
+            for position, (recipe_id, have, needs) in enumerate(ranked)
+        }
+        params = request.query_params.copy()
+        del params['ingredients']
+        queryset = queries.filter_recipes(
+            self.queryset, params, request.user
+        ).filter(id__in=coverage)
+        data = self.fast_serializer_class(queryset).data
+        for item in data:
+            item['coverage'] = round(coverage[item['id']][1], 3)
+        data.sort(key=lambda item: coverage[item['id']][0])
+        return Response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        """Return a recipe, from the cache unless filters are given"""
+        if request.query_params:
+            return super().retrieve(request, *args, **kwargs)
+        try:
+            recipe_id = int(kwargs['pk'])
+        except ValueError:
+            raise Http404
+        return Response(cached_recipe_detail(request.user.pk, recipe_id))
 
     def get_serializer_class(self):
         """Return appropriate serializer class"""
@@ -76,13 +130,105 @@ class RecipeViewSet(viewsets.ModelViewSet):
             return serializers.RecipeDetailSerializer
         elif self.action == 'upload_image':
             return serializers.RecipeImageSerializer
+        elif self.action == 'duplicate_many':
+            return serializers.RecipeDuplicateSerializer
         return self.serializer_class
 
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        """Create a recipe, once per Idempotency-Key"""
+        return super().create(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         """create a new recipe"""
         serializer.save(user=self.request.user)
+        invalidate_pantry(self.request.user.pk)
+
+    def perform_update(self, serializer):
+        """Save a recipe, then drop its cached detail"""
+        recipe = serializer.save()
+        invalidate_recipes([(recipe.user_id, recipe.pk)])
+        invalidate_public_recipes([(recipe.pk, recipe.slug)])
+        invalidate_pantry(recipe.user_id)
+
+    def _duplicate(self, recipe_ids):
+        """Duplicate recipes and return the serialized copies"""
+        pairs = Recipe.objects.duplicate(self.request.user, recipe_ids)
+        invalidate_pantry(self.request.user.pk)
+        copies = Recipe.objects.filter(
+            id__in=[copy_id for _, copy_id in pairs]
+        ).order_by('id')
+        return self.fast_serializer_class(copies).data
+
+    @action(methods=["POST"], detail=True)
+    def duplicate(self, request, pk=None):
+        """Duplicate a recipe with its tags and ingredients"""
+        recipe = self.get_object()
+        data = self._duplicate([recipe.id])
+        return Response(data[0], status=status.HTTP_201_CREATED)
+
+    @action(methods=["POST"], detail=False, url_path='duplicate',
+            url_name='duplicate-many')
+    def duplicate_many(self, request):
+        """Duplicate a batch of recipes in one transaction"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = self._duplicate(serializer.validated_data['ids'])
+        return Response(data, status=status.HTTP_201_CREATED)
+
+    @action(methods=["GET"], detail=True)
+    def similar(self, request, pk=None):
+        """Return the recipes most like this one, best first
+
+        Reads the neighbours kept by core.recommendations, with their
+        score from 0 to 1.
+        """
+        recipe = self.get_object()
+        scores = dict(
+            RecipeSimilarity.objects.filter(recipe=recipe)
+            .values_list('similar_id', 'score')
+        )
+        data = self.fast_serializer_class(
+            Recipe.objects.filter(id__in=scores)
+        ).data
+        for item in data:
+            item['score'] = round(scores[item['id']], 3)
+        data.sort(key=lambda item: (-item['score'], -item['id']))
+        return Response(data)
+
+    @action(methods=["GET"], detail=False)
+    def cookable(self, request):
+        """Return the recipes cookable with only the given ingredients"""
+        try:
+            ingredient_ids = queries.params_to_ints(
+                request.query_params['ingredients']
+            )
+        except (KeyError, ValueError):
+            raise ValidationError(
+                {'ingredients': 'Give comma separated ingredient ids.'}
+            )
+        queryset = queries.cookable_recipes(
+            self.queryset, ingredient_ids, request.user
+        )
+        return Response(self.fast_serializer_class(queryset).data)
+
+    @action(methods=["POST"], detail=True)
+    def publish(self, request, pk=None):
+        """Make a recipe readable by anyone at its public URL"""
+        recipe = self.get_object()
+        recipe.publish()
+        return Response(cached_recipe_detail(request.user.pk, recipe.pk))
+
+    @action(methods=["POST"], detail=True)
+    def unpublish(self, request, pk=None):
+        """Make a public recipe private again, keeping its slug"""
+        recipe = self.get_object()
+        recipe.unpublish()
+        return Response(cached_recipe_detail(request.user.pk, recipe.pk))
 
-    @action(methods=["POST"], detail=True, url_path='upload-image')
+    @action(methods=["POST"], detail=True, url_path='upload-image',
+            throttle_scope='upload')
+    @idempotent
     def upload_image(self, request, pk=None):
         """Upload an image to a recipe"""
         recipe = self.get_object()
@@ -93,6 +239,7 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
         if serializer.is_valid():
             serializer.save()
+            metrics.IMAGE_UPLOAD_BYTES.observe(recipe.image.size)
             return Response(
                 serializer.data,
                 status=status.HTTP_200_OK
@@ -102,3 +249,111 @@ class RecipeViewSet(viewsets.ModelViewSet):
             serializer.errors,
             status=status.HTTP_400_BAD_REQUEST
         )
+
+
+class RecipeImportViewSet(mixins.CreateModelMixin,
+                          mixins.RetrieveModelMixin,
+                          mixins.ListModelMixin,
+                          viewsets.GenericViewSet):
+    """Upload recipe archives and follow their import"""
+    serializer_class = serializers.RecipeImportSerializer
+    queryset = RecipeImport.objects.all()
+    authentication_classes = (TokenAuthentication, )
+    permission_classes = (IsAuthenticated, )
+
+    def get_queryset(self):
+        """Return the authenticated user's imports, newest first"""
+        return self.queryset.filter(
+            user=self.request.user
+        ).order_by('-created_at')
+
+    def create(self, request, *args, **kwargs):
+        """Store the upload and import it in the background"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_import = start_import(
+            request.user,
+            serializer.validated_data['file'],
+            serializer.validated_data['format'],
+        )
+        serializer = self.get_serializer(recipe_import)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+
+class RecipeQueryView(APIView):
+    """Read recipes, tags and ingredients in the shape of a query
+
+    The query is sent as `query`, in the body of a POST or the query
+    string of a GET, see recipe.query.
+    """
+    authentication_classes = (TokenAuthentication, )
+    permission_classes = (IsAuthenticated, )
+
+    def get(self, request):
+        return self._execute(request, request.query_params.get('query'))
+
+    def post(self, request):
+        query = None
+        if isinstance(request.data, dict):
+            query = request.data.get('query')
+        return self._execute(request, query)
+
+    def _execute(self, request, query):
+        try:
+            data = execute(query, request)
+        except QueryError as exc:
+            return Response(
+                {'errors': [{'message': str(exc)}]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return Response({'data': data})
+
+
+class ShoppingListView(APIView):
+    """Merge the ingredients of the recipes of a meal plan
+
+    See recipe.shopping, large plans get a streamed response.
+    """
+    authentication_classes = (TokenAuthentication, )
+    permission_classes = (IsAuthenticated, )
+
+    def post(self, request):
+        serializer = serializers.ShoppingListSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = serializer.validated_data['recipes']
+        if len(set(recipe_ids)) > settings.SHOPPING_LIST_STREAM_MIN:
+            return shopping.streaming_shopping_list(request.user, recipe_ids)
+        return Response(shopping.shopping_list(request.user, recipe_ids))
+
+
+@require_safe
+def public_recipe(request, slug):
+    """Return a published recipe to anyone
+
+    A plain Django view: no authentication, throttling or content
+    negotiation runs, and the rendered response comes from a HotCache.
+    The CDN keeps it until a purge of one of its Surrogate-Key values,
+    see recipe.signals.
+    """
+    recipe = cached_public_recipe(slug)
+    if recipe is None:
+        response = HttpResponse(
+            FastJSONRenderer().render({'detail': 'Not found.'}),
+            content_type='application/json', status=status.HTTP_404_NOT_FOUND,
+        )
+        max_age = s_maxage = settings.PUBLIC_RECIPE_NOT_FOUND_MAX_AGE
+        keys = [slug_key(slug)]
+    else:
+        response = HttpResponse(
+            recipe['body'], content_type='application/json',
+        )
+        response['ETag'] = recipe['etag']
+        max_age = settings.PUBLIC_RECIPE_MAX_AGE
+        s_maxage = settings.PUBLIC_RECIPE_S_MAXAGE
+        keys = recipe['keys']
+    response['Cache-Control'] = f'public, max-age={max_age}, ' \
+        f's-maxage={s_maxage}'
+    response['Surrogate-Key'] = ' '.join(keys)
+    return get_conditional_response(
+        request, etag=response.get('ETag'), response=response,
+    )
@@ -3,6 +3,8 @@ from django.utils.translation import gettext_lazy as _
 
 from rest_framework import serializers
 
+from core.models import AccountDeletion
+
 
 class UserSerializer(serializers.ModelSerializer):
     """Serializer for the users object"""
@@ -50,3 +52,15 @@ class AuthTokenSerializer(serializers.Serializer):
 
         attrs['user'] = user
         return attrs
+
+
+class AccountDeletionSerializer(serializers.ModelSerializer):
+    """Serializer for reporting account deletion progress"""
+
+    class Meta:
+        model = AccountDeletion
+        fields = (
+            'id', 'status', 'totals', 'progress', 'files_deleted',
+            'created_at', 'updated_at'
+        )
+        read_only_fields = fields
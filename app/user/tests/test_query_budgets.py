@@ -0,0 +1,70 @@
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+import pytest
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+
+CREATE_USER_URL = reverse("user:create")
+TOKEN_URL = reverse("user:token")
+ME_URL = reverse("user:me")
+
+
+@pytest.fixture
+def user():
+    """A sample user for testing"""
+    return get_user_model().objects.create_user(
+        email='test@user.com', password='testspass', name='name'
+    )
+
+
+@pytest.fixture
+def token_client(user):
+    """A client authenticating with the user's token"""
+    token = Token.objects.create(user=user)
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+class TestUserQueryBudgets:
+    """Test the user endpoints stay within their query budgets"""
+
+    @pytest.mark.django_db
+    def test_create_user(self, query_budget):
+        """Test creating a user checks the email and inserts"""
+        payload = {'email': 'new@user.com', 'password': 'testpass',
+                   'name': 'name'}
+
+        with query_budget(2, rows=2):
+            res = APIClient().post(CREATE_USER_URL, payload)
+
+        assert res.status_code == status.HTTP_201_CREATED
+
+    @pytest.mark.django_db
+    def test_create_token(self, user, query_budget):
+        """Test logging in fetches the user and its token"""
+        payload = {'email': 'test@user.com', 'password': 'testspass'}
+
+        with query_budget(5, rows=3):
+            res = APIClient().post(TOKEN_URL, payload)
+
+        assert res.status_code == status.HTTP_200_OK
+
+    @pytest.mark.django_db
+    def test_retrieve_profile(self, token_client, query_budget):
+        """Test the profile only costs the token lookup"""
+        with query_budget(1, rows=1):
+            res = token_client.get(ME_URL)
+
+        assert res.status_code == status.HTTP_200_OK
+
+    @pytest.mark.django_db
+    def test_update_profile(self, token_client, query_budget):
+        """Test updating the profile is the token lookup and one update"""
+        with query_budget(2, rows=1):
+            res = token_client.patch(ME_URL, {'name': 'new name'})
+
+        assert res.status_code == status.HTTP_200_OK
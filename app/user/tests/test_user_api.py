@@ -162,3 +162,31 @@ class TestPrivateUserApi:
         assert user.name == payload['name']
         assert user.check_password(payload['password'])
         assert res.status_code == status.HTTP_200_OK
+
+    @pytest.mark.django_db
+    def test_delete_account(
+        self, user_api_client, user, settings,
+        django_capture_on_commit_callbacks
+    ):
+        """Test deleting the account runs in the background"""
+        settings.JOBS_ALWAYS_EAGER = True
+        with django_capture_on_commit_callbacks(execute=True):
+            res = user_api_client.delete(ME_URL)
+
+        assert res.status_code == status.HTTP_202_ACCEPTED
+        assert res.data['status'] == 'pending'
+        assert not get_user_model().objects.filter(id=user.id).exists()
+
+        res = APIClient().get(
+            reverse('user:deletion', args=[res.data['id']])
+        )
+        assert res.status_code == status.HTTP_200_OK
+        assert res.data['status'] == 'done'
+
+    @pytest.mark.django_db
+    def test_delete_account_deactivates_user(self, user_api_client, user):
+        """Test the user can't authenticate once deletion starts"""
+        user_api_client.delete(ME_URL)
+        user.refresh_from_db()
+
+        assert not user.is_active
@@ -1,22 +1,39 @@
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, authentication, permissions, status
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
 
-from user.serializers import UserSerializer, AuthTokenSerializer
+from core.deletion import start_account_deletion
+from core.idempotency import idempotent
+from core.models import AccountDeletion
+from user.serializers import (
+    UserSerializer,
+    AuthTokenSerializer,
+    AccountDeletionSerializer,
+)
 
 
 class CreateUserView(generics.CreateAPIView):
     """Create a new user in the system"""
     serializer_class = UserSerializer
+    throttle_scope = 'register'
+
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        """Create a user, once per Idempotency-Key"""
+        return super().create(request, *args, **kwargs)
 
 
 class CreateTokenView(ObtainAuthToken):
     """Create a new auth token for user"""
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    # ObtainAuthToken turns throttling off
+    throttle_classes = api_settings.DEFAULT_THROTTLE_CLASSES
+    throttle_scope = 'token'
 
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+class ManageUserView(generics.RetrieveUpdateDestroyAPIView):
     """Manage the authenticated user"""
     serializer_class = UserSerializer
     authentication_classes = (authentication.TokenAuthentication,)
@@ -25,3 +42,21 @@ class ManageUserView(generics.RetrieveUpdateAPIView):
     def get_object(self):
         """Retrieve and return authenticated user"""
         return self.request.user
+
+    def destroy(self, request, *args, **kwargs):
+        """Deactivate the user and delete the account in the background"""
+        deletion = start_account_deletion(self.get_object())
+        serializer = AccountDeletionSerializer(deletion)
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+
+class AccountDeletionView(generics.RetrieveAPIView):
+    """Report the progress of an account deletion
+
+    The deleted user can no longer authenticate, so the unguessable
+    deletion id is what grants access.
+    """
+    serializer_class = AccountDeletionSerializer
+    queryset = AccountDeletion.objects.all()
+    authentication_classes = ()
+    permission_classes = (permissions.AllowAny,)
@@ -0,0 +1,18 @@
+#!/bin/sh
+
+set -e
+
+python manage.py wait_for_db
+# The API only settings serve no static files
+if [ "$DJANGO_SETTINGS_MODULE" != "app.settings_api" ]; then
+    python manage.py collectstatic --noinput
+fi
+python manage.py migrate
+
+case "${GUNICORN_WORKER_CLASS:-gthread}" in
+    uvicorn) APPLICATION=app.asgi:application ;;
+    *) APPLICATION=app.wsgi:application ;;
+esac
+
+# exec so gunicorn receives SIGTERM directly and shuts down gracefully
+exec gunicorn -c python:app.gunicorn_conf "$APPLICATION"